@@ -3,19 +3,26 @@
 Job Curator Bot - Orquestrador Principal
 Curador de Vagas de Trabalho Remoto para M60/UDI
 
-Fluxo:
-1. Scraping: Busca vagas em múltiplas fontes
-2. Pré-filtro: Descarta vagas obviamente ruins (sem IA)
-3. Análise: Gemini analisa com critérios M60
-4. Link Resolver: Encontra link direto da empresa
-5. Queue: Adiciona à fila respeitando proporção 75/25
-6. Posting: Posta nos canais FREE e PAID
-7. Cleanup: Remove vagas expiradas
+Fluxo (estágios do pipeline.py sobre jobs.db, os mesmos do lote diário):
+1. fetch: Busca vagas em múltiplas fontes
+2. filter: Descarta vagas obviamente ruins (sem IA)
+3. resolve/enrich: Encontra link direto da empresa e completa os dados
+4. classify: Gemini analisa em lotes; aprovadas vão para a fila (75/25)
+5. post: Posta nos canais FREE e PAID
+6. Cleanup: Remove vagas expiradas
+
+No modo agendado (scheduler.py) cada fase é um job com a própria cadência:
+descoberta (1-3) a cada DISCOVERY_INTERVAL_MIN, análise (4) quando há vagas
+enriquecidas, posting (5) nos SCHEDULE_HOURS e link health no seu intervalo.
+
+Uso:
+    python app.py          # agendador
+    python app.py --once   # um ciclo completo e sai
 """
+import argparse
 import asyncio
+import fcntl
 import logging
-import time
-import schedule
 from datetime import datetime
 from pathlib import Path
 from dotenv import load_dotenv
@@ -34,167 +41,50 @@ logger = logging.getLogger('job-curator')
 # Imports internos
 from config import (
     SCHEDULE_HOURS,
-    SALARY_HIGH_THRESHOLD,
     JOBS_PER_DAY_FREE,
     JOBS_PER_DAY_PAID,
     DATA_DIR,
-    GEMINI_DELAY,
+    LINK_HEALTH_INTERVAL_HOURS,
+    DISCOVERY_INTERVAL_MIN,
+    ANALYSIS_POLL_MIN,
 )
 import database as db
-from scrapers import get_all_scrapers
-from job_analyzer import analyze_job, quick_reject_check, batch_analyze_jobs
-from link_resolver import resolve_direct_url, verify_url_is_active  # verify_url_is_active usado em run_posting()
-from telegram_poster import (
-    post_jobs_to_free_channel,
-    post_jobs_to_paid_channel,
-    format_daily_summary
-)
+import pipeline
+from link_health import sweep_link_health
+from scheduler import Job, Scheduler
+from telegram_sender import TelegramSender
 
+# Um agendador por vez (dois processos postariam a mesma fila)
+LOCK_PATH = DATA_DIR / "app.lock"
+# Critérios de aprovação do app: job_analyzer.analyze_job, vaga a vaga (não o lote diário)
+APP_ANALYZER = "job"
 
-async def run_discovery():
+
+async def run_pipeline():
     """
-    Fase 1: Descoberta de vagas
-    Busca em todas as fontes configuradas
+    Fases 1-4: descoberta, pré-filtro, link direto, enriquecimento e análise.
+    Estágios do pipeline (threads, fora do event loop); aprovadas já entram na fila.
     """
-    logger.info("=" * 60)
-    logger.info("FASE 1: DESCOBERTA DE VAGAS")
-    logger.info("=" * 60)
-    
-    all_jobs = []
-    scrapers = get_all_scrapers()
-    
-    for scraper in scrapers:
-        try:
-            jobs = scraper.run(limit=30)
-            all_jobs.extend(jobs)
-            logger.info(f"  {scraper.name}: {len(jobs)} vagas")
-        except Exception as e:
-            logger.error(f"  {scraper.name}: ERRO - {e}")
-    
-    # Salva no banco (ignora duplicadas)
-    new_count = 0
-    for job in all_jobs:
-        if not db.job_exists(job['id']):
-            if db.save_job(job):
-                new_count += 1
-    
-    logger.info(f"Total: {len(all_jobs)} vagas, {new_count} novas")
-    return new_count
+    return await asyncio.to_thread(pipeline.stream_stages, pipeline.CYCLE_STAGES, APP_ANALYZER)
 
 
-async def run_prefilter():
-    """
-    Fase 2: Pré-filtro (sem IA)
-    Remove vagas obviamente ruins antes de gastar tokens
-    """
-    logger.info("=" * 60)
-    logger.info("FASE 2: PRÉ-FILTRO")
-    logger.info("=" * 60)
-    
-    pending = db.get_pending_jobs(limit=100)
-    rejected = 0
-    
-    for job in pending:
-        reason = quick_reject_check(job)
-        if reason:
-            db.update_job_analysis(job['id'], {'motivo_rejeicao': reason}, 'rejected')
-            rejected += 1
-    
-    logger.info(f"Pré-filtradas: {rejected} vagas rejeitadas")
-    return rejected
+async def run_discovery():
+    """Fases 1-3: busca, pré-filtro, link direto e enriquecimento (param em 'enriched')"""
+    return await asyncio.to_thread(pipeline.stream_stages, pipeline.CYCLE_STAGES[:-1])
 
 
 async def run_analysis():
-    """
-    Fase 3: Análise com Gemini
-    Aplica critérios M60 completos
-    """
-    logger.info("=" * 60)
-    logger.info("FASE 3: ANÁLISE (GEMINI)")
-    logger.info("=" * 60)
-    
-    pending = db.get_pending_jobs(limit=15)  # Limite baixo para não estourar rate limit
-    
-    if not pending:
-        logger.info("Nenhuma vaga pendente para analisar")
-        return 0, 0
-    
-    # init_claude() removido - analyze_job usa Akira-Pipe (Gemini) internamente
-    approved = 0
-    rejected = 0
-    
-    for job in pending:
-        try:
-            result = analyze_job(job)
-            
-            if not result:
-                logger.warning(f"  Falha na análise: {job.get('title', 'N/A')[:40]}")
-                continue
-            
-            if result.get('aprovada'):
-                is_high_salary = result.get('is_high_salary', False)
-                db.update_job_analysis(job['id'], result, 'approved')
-                db.add_to_queue(job['id'], is_high_salary)
-                approved += 1
-                logger.info(f"  ✅ {job.get('title', 'N/A')[:40]}")
-            else:
-                db.update_job_analysis(job['id'], result, 'rejected')
-                rejected += 1
-                logger.info(f"  ❌ {job.get('title', 'N/A')[:40]} - {result.get('motivo_rejeicao', 'N/A')[:30]}")
-            
-            time.sleep(GEMINI_DELAY)  # Rate limiting - devagar
-            
-        except Exception as e:
-            logger.error(f"  Erro: {job.get('id')} - {e}")
-    
-    logger.info(f"Resultado: {approved} aprovadas, {rejected} rejeitadas")
-    return approved, rejected
+    """Fase 4: análise das vagas enriquecidas; aprovadas entram na fila"""
+    return await asyncio.to_thread(pipeline.stream_stages, ("classify",), APP_ANALYZER)
 
 
-async def run_link_resolver():
-    """
-    Fase 4: Resolução de Links
-    Encontra o link direto da empresa
-    """
-    logger.info("=" * 60)
-    logger.info("FASE 4: LINK RESOLVER")
-    logger.info("=" * 60)
-    
-    jobs = db.get_approved_jobs_without_direct_url(limit=20)
-    
-    if not jobs:
-        logger.info("Nenhuma vaga precisando de link resolver")
-        return 0, 0
-    
-    resolved = 0
-    failed = 0
-    
-    for job in jobs:
-        source_url = job.get('source_url')
-        if not source_url:
-            failed += 1
-            continue
-        
-        direct_url, status = resolve_direct_url(source_url)
-        
-        if direct_url:
-            db.update_job_direct_url(job['id'], direct_url)
-            resolved += 1
-            logger.info(f"  ✅ {job.get('title', 'N/A')[:40]}")
-        else:
-            # Remove da fila se não conseguir resolver o link
-            db.remove_from_queue(job['id'])
-            db.update_job_analysis(job['id'], {'link_error': status}, 'link_failed')
-            failed += 1
-            logger.warning(f"  ❌ {job.get('title', 'N/A')[:40]} - {status}")
-        
-        time.sleep(2)  # Rate limiting
-    
-    logger.info(f"Resultado: {resolved} resolvidos, {failed} falharam")
-    return resolved, failed
+def has_pending_analysis() -> bool:
+    """Há vagas enriquecidas esperando o classify?"""
+    enriched = db.get_stage_counts().get("enriched", {})
+    return any(n for status, n in enriched.items() if status != "rejected")
 
 
-async def run_posting():
+async def run_posting(sender: TelegramSender = None):
     """
     Fase 5: Posting nos canais
     Respeita limites e proporção 75/25
@@ -203,35 +93,7 @@ async def run_posting():
     logger.info("FASE 5: POSTING")
     logger.info("=" * 60)
     
-    # Limpa fila expirada
-    db.cleanup_expired_queue()
-    
-    # Verifica e reutiliza vagas não postadas (com validação de links vivos)
-    requeue_stats = db.verify_and_requeue_unused_jobs(
-        link_verifier_func=verify_url_is_active
-    )
-    logger.info(f"Reutilização: {requeue_stats['reused']} vagas OK, {requeue_stats['removed_dead_links']} links mortos removidos")
-    
-    # Busca vagas para o canal FREE
-    jobs_free = db.get_jobs_for_posting('free', JOBS_PER_DAY_FREE)
-    logger.info(f"Vagas para canal FREE: {len(jobs_free)}")
-    
-    # Busca vagas para o canal PAID
-    jobs_paid = db.get_jobs_for_posting('paid', JOBS_PER_DAY_PAID)
-    logger.info(f"Vagas para canal PAID: {len(jobs_paid)}")
-    
-    # Posta no FREE
-    posted_free = await post_jobs_to_free_channel(jobs_free)
-    for job in posted_free:
-        db.mark_as_posted(job['id'], 'free', job.get('posted_channel', ''), job.get('posted_message_id'))
-    
-    # Posta no PAID
-    posted_paid = await post_jobs_to_paid_channel(jobs_paid)
-    for job in posted_paid:
-        db.mark_as_posted(job['id'], 'paid', job.get('posted_channel', ''), job.get('posted_message_id'))
-    
-    logger.info(f"Postadas: FREE={len(posted_free)}, PAID={len(posted_paid)}")
-    return len(posted_free), len(posted_paid)
+    return await pipeline.post_queued_jobs(sender)
 
 
 async def run_full_cycle():
@@ -243,21 +105,14 @@ async def run_full_cycle():
     stats = {}
     
     try:
-        # Fase 1: Descoberta
-        stats['discovered'] = await run_discovery()
-        
-        # Fase 2: Pré-filtro
-        stats['prefiltered'] = await run_prefilter()
-        
-        # Fase 3: Análise
-        approved, rejected = await run_analysis()
-        stats['approved'] = approved
-        stats['rejected'] = rejected
-        
-        # Fase 4: Link Resolver
-        resolved, failed = await run_link_resolver()
-        stats['links_resolved'] = resolved
-        stats['links_failed'] = failed
+        # Fases 1-4: pipeline (fetch → filter → resolve → enrich → classify)
+        stages = await run_pipeline()
+        stats['discovered'] = stages.get('fetch', {}).get('advanced', 0)
+        stats['prefiltered'] = stages.get('filter', {}).get('rejected', 0)
+        stats['links_resolved'] = stages.get('resolve', {}).get('advanced', 0)
+        stats['links_failed'] = stages.get('resolve', {}).get('rejected', 0)
+        stats['approved'] = stages.get('classify', {}).get('advanced', 0)
+        stats['rejected'] = stages.get('classify', {}).get('rejected', 0)
         
         # Fase 5: Posting
         posted_free, posted_paid = await run_posting()
@@ -292,12 +147,35 @@ async def verify_queue_links():
     """
     logger.info("Verificando links na fila...")
     
-    # Implementação futura: verificar links e remover inativos
-    pass
+    # Checagens de rede rodam em threads para não travar o event loop
+    return await asyncio.to_thread(sweep_link_health)
+
+
+def build_jobs(sender: TelegramSender) -> list:
+    """Fases do agendador, cada uma com a própria cadência"""
+    async def posting():
+        posted_free, posted_paid = await run_posting(sender)
+        return {"posted_free": posted_free, "posted_paid": posted_paid, **db.get_queue_stats()}
+
+    return [
+        Job("discovery", run_discovery, every=DISCOVERY_INTERVAL_MIN * 60),
+        Job("analysis", run_analysis, every=ANALYSIS_POLL_MIN * 60, when=has_pending_analysis),
+        Job("posting", posting, at=SCHEDULE_HOURS),
+        Job("link_health", verify_queue_links, every=LINK_HEALTH_INTERVAL_HOURS * 3600),
+    ]
+
+
+async def serve():
+    """Agendador: um event loop e um TelegramSender para todas as fases"""
+    async with TelegramSender() as sender:
+        await Scheduler(build_jobs(sender)).run()
 
 
 def main():
     """Função principal com agendamento"""
+    parser = argparse.ArgumentParser(description="Job Curator Bot")
+    parser.add_argument("--once", action="store_true", help="roda um ciclo completo e sai")
+    args = parser.parse_args()
     
     logger.info("🚀 Job Curator Bot iniciado!")
     logger.info(f"📂 Data dir: {DATA_DIR}")
@@ -307,22 +185,28 @@ def main():
     # Garante que o diretório de dados existe
     DATA_DIR.mkdir(parents=True, exist_ok=True)
     
-    # Agenda execuções
-    for hour in SCHEDULE_HOURS:
-        schedule.every().day.at(hour).do(
-            lambda: asyncio.run(run_full_cycle())
-        )
-        logger.info(f"  Agendado para {hour}")
+    if args.once:
+        asyncio.run(run_full_cycle())
+        return
     
-    # NÃO executa imediatamente - espera o horário agendado
-    # Isso evita estourar rate limit ao reiniciar
-    logger.info("Aguardando próximo horário agendado (sem ciclo inicial)...")
+    lock = open(LOCK_PATH, "w")
+    try:
+        fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        logger.error(f"Outro agendador já está rodando ({LOCK_PATH})")
+        raise SystemExit(1)
+    
+    # Posting só nos horários agendados: reiniciar não posta fora de hora
+    # (evita estourar rate limit); descoberta e análise retomam pela última execução
+    logger.info(f"  Posting em {SCHEDULE_HOURS}")
+    logger.info(f"  Descoberta a cada {DISCOVERY_INTERVAL_MIN} min, análise a cada {ANALYSIS_POLL_MIN} min se houver pendentes")
+    logger.info(f"  Link health a cada {LINK_HEALTH_INTERVAL_HOURS}h")
     
-    # Loop de agendamento
     logger.info("Entrando em modo de agendamento...")
-    while True:
-        schedule.run_pending()
-        time.sleep(60)
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        logger.info("Encerrado")
 
 
 if __name__ == "__main__":
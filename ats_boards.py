@@ -0,0 +1,383 @@
+"""
+Job Curator Bot - ATS Boards
+Busca a listagem completa de um board de ATS (Greenhouse, Lever, Ashby,
+SmartRecruiters, Workable, Recruitee) em UMA chamada e reaproveita para
+todas as vagas do mesmo board.
+
+Cache em dois níveis:
+- memória (durante a execução)
+- disco em data/ats_cache/ com TTL (ATS_CACHE_TTL_HOURS); vencido o TTL,
+  a revalidação usa GET condicional (ETag/Last-Modified)
+"""
+import json
+import os
+import re
+import threading
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Optional, Tuple
+
+import requests
+
+from config import DATA_DIR, REQUEST_TIMEOUT, USER_AGENT
+
+logger = logging.getLogger(__name__)
+
+ATS_CACHE_DIR = DATA_DIR / "ats_cache"
+ATS_CACHE_TTL_HOURS = float(os.environ.get("ATS_CACHE_TTL_HOURS", "6"))
+ATS_FETCH_WORKERS = int(os.environ.get("ATS_FETCH_WORKERS", "4"))
+
+HEADERS = {
+    "User-Agent": USER_AGENT,
+    "Accept": "application/json",
+}
+
+# (provider, slug) -> {job_key: {...}} ou None (board indisponível)
+_BOARDS: Dict[Tuple[str, str], Optional[dict]] = {}
+_BOARDS_LOCK = threading.Lock()
+_STATS = {"http": 0, "not_modified": 0, "disk": 0, "memory": 0}
+
+
+def parse_ats_url(url: str) -> Optional[Tuple[str, str, str]]:
+    """
+    Identifica board e vaga a partir de uma URL de ATS.
+
+    Returns:
+        (provider, slug, job_key) ou None se não for Greenhouse/Lever
+    """
+    u = url or ""
+    m = re.search(r"greenhouse\.io/([^/?#]+)/jobs/(\d+)", u)
+    if m and m.group(1) != "embed":
+        return "greenhouse", m.group(1).lower(), m.group(2)
+    m = re.search(r"jobs\.lever\.co/([^/?#]+)/([a-z0-9-]+)", u, re.IGNORECASE)
+    if m and m.group(2).lower() != "apply":
+        return "lever", m.group(1).lower(), m.group(2).lower()
+    return None
+
+
+def _parse_greenhouse(data) -> Optional[dict]:
+    if not isinstance(data, dict):
+        return None
+    jobs = {}
+    for item in data.get("jobs") or []:
+        location = item.get("location")
+        jobs[str(item.get("id"))] = {
+            "title": item.get("title") or "",
+            "company": item.get("company_name") or "",
+            "location": location.get("name") if isinstance(location, dict) else "",
+            "content": item.get("content") or "",
+            "url": item.get("absolute_url") or "",
+            "posted_at": item.get("updated_at"),
+        }
+    return jobs
+
+
+def _parse_lever(data) -> Optional[dict]:
+    if not isinstance(data, list):
+        return None
+    jobs = {}
+    for item in data:
+        jobs[str(item.get("id") or "").lower()] = {
+            "title": item.get("text") or "",
+            "company": "",
+            "location": (item.get("categories") or {}).get("location") or "",
+            "content": item.get("description") or "",
+            "url": item.get("hostedUrl") or "",
+            "posted_at": item.get("createdAt"),
+        }
+    return jobs
+
+
+def _parse_ashby(data) -> Optional[dict]:
+    if not isinstance(data, dict):
+        return None
+    jobs = {}
+    for item in data.get("jobs") or []:
+        if item.get("isListed") is False:
+            continue
+        jobs[str(item.get("id") or "").lower()] = {
+            "title": item.get("title") or "",
+            "company": "",
+            "location": item.get("location") or ("Remote" if item.get("isRemote") else ""),
+            "content": item.get("descriptionHtml") or item.get("descriptionPlain") or "",
+            "url": item.get("jobUrl") or "",
+            "posted_at": item.get("publishedAt"),
+        }
+    return jobs
+
+
+def _parse_smartrecruiters(data) -> Optional[dict]:
+    if not isinstance(data, dict):
+        return None
+    jobs = {}
+    for item in data.get("content") or []:
+        loc = item.get("location") or {}
+        parts = [loc.get("city"), loc.get("region"), (loc.get("country") or "").upper()]
+        location = ", ".join(p for p in parts if p)
+        if loc.get("remote"):
+            location = f"Remote, {location}" if location else "Remote"
+        company = item.get("company") or {}
+        identifier = company.get("identifier") or ""
+        job_id = str(item.get("id") or "")
+        jobs[job_id] = {
+            "title": item.get("name") or "",
+            "company": company.get("name") or "",
+            "location": location,
+            # a listagem não traz descrição; o LLM usa título/local
+            "content": "",
+            "url": f"https://jobs.smartrecruiters.com/{identifier}/{job_id}" if identifier else "",
+            "posted_at": item.get("releasedDate"),
+        }
+    return jobs
+
+
+def _parse_workable(data) -> Optional[dict]:
+    if not isinstance(data, dict):
+        return None
+    jobs = {}
+    for item in data.get("jobs") or []:
+        parts = [item.get("city"), item.get("state"), item.get("country")]
+        location = ", ".join(p for p in parts if p)
+        if item.get("telecommuting"):
+            location = f"Remote, {location}" if location else "Remote"
+        jobs[str(item.get("shortcode") or "").lower()] = {
+            "title": item.get("title") or "",
+            "company": data.get("name") or "",
+            "location": location,
+            "content": item.get("description") or "",
+            "url": item.get("url") or item.get("shortlink") or "",
+            "posted_at": item.get("published_on") or item.get("created_at"),
+        }
+    return jobs
+
+
+def _parse_recruitee(data) -> Optional[dict]:
+    if not isinstance(data, dict):
+        return None
+    jobs = {}
+    for item in data.get("offers") or []:
+        location = item.get("location") or item.get("country") or ""
+        if item.get("remote"):
+            location = f"Remote, {location}" if location else "Remote"
+        jobs[str(item.get("slug") or item.get("id") or "").lower()] = {
+            "title": item.get("title") or "",
+            "company": item.get("company_name") or "",
+            "location": location,
+            "content": item.get("description") or "",
+            "url": item.get("careers_url") or "",
+            "posted_at": item.get("published_at") or item.get("created_at"),
+        }
+    return jobs
+
+
+# provider -> (URL da API pública do board, parser da resposta)
+PROVIDERS = {
+    "greenhouse": ("https://boards-api.greenhouse.io/v1/boards/{slug}/jobs?content=true", _parse_greenhouse),
+    "lever": ("https://api.lever.co/v0/postings/{slug}?mode=json", _parse_lever),
+    "ashby": ("https://api.ashbyhq.com/posting-api/job-board/{slug}", _parse_ashby),
+    "smartrecruiters": ("https://api.smartrecruiters.com/v1/companies/{slug}/postings?limit=100", _parse_smartrecruiters),
+    "workable": ("https://apply.workable.com/api/v1/widget/accounts/{slug}?details=true", _parse_workable),
+    "recruitee": ("https://{slug}.recruitee.com/api/offers/", _parse_recruitee),
+}
+
+# Padrões para identificar o board a partir de uma URL de carreiras
+_BOARD_PATTERNS = [
+    ("greenhouse", r"(?:boards|job-boards)(?:-api)?\.greenhouse\.io/(?:v1/boards/)?([^/?#]+)"),
+    ("greenhouse", r"greenhouse\.io/embed/job_board\?for=([^&#]+)"),
+    ("lever", r"jobs\.lever\.co/([^/?#]+)"),
+    ("ashby", r"jobs\.ashbyhq\.com/([^/?#]+)"),
+    ("smartrecruiters", r"(?:jobs|careers)\.smartrecruiters\.com/([^/?#]+)"),
+    ("workable", r"apply\.workable\.com/([^/?#]+)"),
+    ("workable", r"^(?:https?://)?([a-z0-9-]+)\.workable\.com"),
+    ("recruitee", r"^(?:https?://)?([a-z0-9-]+)\.recruitee\.com"),
+]
+
+
+def detect_ats(careers_url: str) -> Optional[Tuple[str, str]]:
+    """
+    Detecta (provider, slug) do board a partir de uma URL de carreiras.
+    Ex: "https://boards.greenhouse.io/stripe" → ("greenhouse", "stripe")
+    """
+    u = (careers_url or "").strip().lower()
+    if not u:
+        return None
+    for provider, pattern in _BOARD_PATTERNS:
+        m = re.search(pattern, u)
+        if m:
+            slug = m.group(1).strip()
+            if slug and slug not in ("embed", "api", "www", "apply", "jobs", "v1"):
+                return provider, slug
+    return None
+
+
+def load_company_boards(path=None) -> Dict[str, list]:
+    """
+    Lê data/companies_database.json e retorna os boards conhecidos.
+    Usa os campos explícitos `ats`/`ats_slug` ou detecta pelo `careers_url`.
+
+    Returns:
+        {provider: [(slug, nome_empresa), ...]}
+    """
+    path = path or (DATA_DIR / "companies_database.json")
+    try:
+        data = json.loads(path.read_text())
+    except Exception:
+        return {}
+    items = data.get("companies") if isinstance(data, dict) else data
+    boards: Dict[str, list] = {}
+    seen = set()
+    for c in items or []:
+        if not isinstance(c, dict):
+            continue
+        if c.get("ats") in PROVIDERS and c.get("ats_slug"):
+            found = (c["ats"], str(c["ats_slug"]).lower())
+        else:
+            found = detect_ats(c.get("careers_url") or "")
+        if not found or found in seen:
+            continue
+        seen.add(found)
+        boards.setdefault(found[0], []).append((found[1], (c.get("name") or "").strip()))
+    return boards
+
+
+def _cache_path(provider: str, slug: str):
+    safe = re.sub(r"[^a-z0-9_.-]", "_", slug.lower())
+    return ATS_CACHE_DIR / f"{provider}-{safe}.json"
+
+
+def _load_from_disk(provider: str, slug: str) -> Optional[dict]:
+    """Registro do cache em disco (pode estar vencido; o chamador checa o TTL)"""
+    path = _cache_path(provider, slug)
+    if not path.exists():
+        return None
+    try:
+        return json.loads(path.read_text())
+    except Exception:
+        return None
+
+
+def _save_to_disk(provider: str, slug: str, record: dict) -> None:
+    try:
+        ATS_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        path = _cache_path(provider, slug)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(record, ensure_ascii=False))
+        tmp.replace(path)
+    except OSError as e:
+        logger.warning(f"Erro ao salvar cache do board {provider}/{slug}: {e}")
+
+
+def _fetch_board(provider: str, slug: str, cached: Optional[dict]) -> Optional[dict]:
+    """
+    Busca o board na API pública com GET condicional (ETag/Last-Modified).
+    Em 304 reaproveita as vagas do cache em disco.
+
+    Returns:
+        registro {fetched_at, etag, last_modified, jobs} ou None
+    """
+    url_tpl, parser = PROVIDERS[provider]
+    headers = dict(HEADERS)
+    if cached and cached.get("jobs") is not None:
+        if cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+    r = requests.get(url_tpl.format(slug=slug), headers=headers, timeout=REQUEST_TIMEOUT)
+    _STATS["http"] += 1
+    if r.status_code == 304 and cached:
+        _STATS["not_modified"] += 1
+        return dict(cached, fetched_at=time.time())
+    if not r.ok:
+        return None
+    jobs = parser(r.json())
+    if jobs is None:
+        return None
+    return {
+        "fetched_at": time.time(),
+        "etag": r.headers.get("ETag"),
+        "last_modified": r.headers.get("Last-Modified"),
+        "jobs": jobs,
+    }
+
+
+def get_board(provider: str, slug: str) -> Optional[dict]:
+    """
+    Retorna todas as vagas de um board ({job_key: dados}).
+    Memória → disco (dentro do TTL) → API (condicional). None se o board não estiver disponível.
+    """
+    key = (provider, slug.lower())
+    with _BOARDS_LOCK:
+        if key in _BOARDS:
+            _STATS["memory"] += 1
+            return _BOARDS[key]
+
+    if provider not in PROVIDERS:
+        return None
+    cached = _load_from_disk(*key)
+    fresh = cached and time.time() - float(cached.get("fetched_at", 0)) <= ATS_CACHE_TTL_HOURS * 3600
+    if fresh and cached.get("jobs") is not None:
+        _STATS["disk"] += 1
+        jobs = cached["jobs"]
+    else:
+        try:
+            record = _fetch_board(*key, cached)
+        except Exception as e:
+            logger.warning(f"Erro ao buscar board {provider}/{slug}: {e}")
+            record = None
+        jobs = record["jobs"] if record else None
+        if record:
+            _save_to_disk(*key, record)
+
+    with _BOARDS_LOCK:
+        _BOARDS[key] = jobs
+    return jobs
+
+
+def get_boards(boards: Iterable[Tuple[str, str]], max_workers: int = ATS_FETCH_WORKERS) -> Dict[Tuple[str, str], Optional[dict]]:
+    """Busca vários boards em paralelo. Retorna {(provider, slug): vagas ou None}"""
+    boards = list(dict.fromkeys(boards))
+    if not boards:
+        return {}
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        results = list(pool.map(lambda b: get_board(*b), boards))
+    return dict(zip(boards, results))
+
+
+def lookup_job(url: str) -> Tuple[bool, Optional[dict]]:
+    """
+    Busca os dados de uma vaga no board correspondente.
+
+    Returns:
+        (board_ok, dados): board_ok=False quando o board não pôde ser obtido
+        (o chamador pode tentar a API por vaga); dados=None se a vaga não está no board.
+    """
+    parsed = parse_ats_url(url)
+    if not parsed:
+        return False, None
+    provider, slug, job_key = parsed
+    board = get_board(provider, slug)
+    if board is None:
+        return False, None
+    return True, board.get(job_key)
+
+
+def prefetch_boards(urls: Iterable[str], max_workers: int = ATS_FETCH_WORKERS) -> int:
+    """
+    Agrupa URLs por board e busca cada board uma única vez (em paralelo).
+
+    Returns:
+        int: número de boards distintos
+    """
+    boards = set()
+    for url in urls:
+        parsed = parse_ats_url(url)
+        if parsed:
+            boards.add(parsed[:2])
+    get_boards(boards, max_workers=max_workers)
+    return len(boards)
+
+
+def cache_stats() -> dict:
+    """Contadores de acesso (http/not_modified/disk/memory) da execução atual"""
+    return dict(_STATS)
@@ -0,0 +1,268 @@
+"""
+Job Curator Bot - Brave Search Client
+Cliente do Brave Search com:
+- rate limit guiado pelos headers da API (X-RateLimit-Limit/Remaining/Reset)
+- número limitado de requests simultâneos
+- contagem de orçamento (BRAVE_BUDGET) thread-safe
+- teto diário (BRAVE_DAILY_BUDGET) somado entre execuções e processos em jobs.db
+- cache de respostas do planner (brave_planner)
+- modos offline: gravação (BRAVE_RECORD_DIR), replay (BRAVE_REPLAY_DIR) e dry-run (BRAVE_DRY_RUN=1)
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+import requests
+
+import brave_planner
+
+logger = logging.getLogger(__name__)
+
+BRAVE_ENDPOINT = "https://api.search.brave.com/res/v1/web/search"
+BRAVE_RATE_PER_SEC = float(os.environ.get("BRAVE_RATE_PER_SEC", "1"))
+BRAVE_CONCURRENCY = int(os.environ.get("BRAVE_CONCURRENCY", "4"))
+# Teto de requests pagos por dia (0 = sem teto); BRAVE_BUDGET vale por execução
+BRAVE_DAILY_BUDGET = int(os.environ.get("BRAVE_DAILY_BUDGET", "120"))
+
+
+def brave_token() -> str:
+    return (
+        os.environ.get("BRAVE_API_KEY") or
+        os.environ.get("BRAVE_SEARCH_API_KEY") or
+        os.environ.get("BRAVE_SUBSCRIPTION_TOKEN") or
+        ""
+    )
+
+
+def _parse_rate_header(value: Optional[str]) -> List[float]:
+    """'1, 15000' → [1.0, 15000.0] (janela por segundo, janela mensal)"""
+    out = []
+    for part in (value or "").split(","):
+        try:
+            out.append(float(part.strip()))
+        except ValueError:
+            continue
+    return out
+
+
+class RateLimiter:
+    """
+    Espaça as chamadas em 1/rate segundos (thread-safe).
+    O ritmo é ajustado pelos headers de rate limit de cada resposta.
+    """
+
+    def __init__(self, rate_per_sec: float):
+        self._lock = threading.Lock()
+        self._next = 0.0
+        self.interval = 1.0 / max(rate_per_sec, 0.01)
+
+    def acquire(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+    def block_for(self, seconds: float) -> None:
+        """Ninguém chama a API antes de `seconds` a partir de agora"""
+        with self._lock:
+            self._next = max(self._next, time.monotonic() + max(0.0, seconds))
+
+    def update_from_headers(self, headers) -> None:
+        limit = _parse_rate_header(headers.get("X-RateLimit-Limit"))
+        remaining = _parse_rate_header(headers.get("X-RateLimit-Remaining"))
+        reset = _parse_rate_header(headers.get("X-RateLimit-Reset"))
+        if limit and limit[0] > 0:
+            with self._lock:
+                self.interval = 1.0 / limit[0]
+        if remaining and reset and remaining[0] <= 0:
+            self.block_for(reset[0] or self.interval)
+
+
+class BraveClient:
+    """Cliente thread-safe do Brave Search (um por execução)"""
+
+    def __init__(self, token: Optional[str] = None, budget: int = 60,
+                 max_concurrency: int = BRAVE_CONCURRENCY,
+                 rate_per_sec: float = BRAVE_RATE_PER_SEC,
+                 replay_dir: Optional[str] = None, record_dir: Optional[str] = None,
+                 dry_run: Optional[bool] = None, use_cache: bool = True,
+                 daily_budget: int = BRAVE_DAILY_BUDGET):
+        self.token = token if token is not None else brave_token()
+        self.budget = budget
+        self.daily_budget = daily_budget
+        self.max_concurrency = max(1, max_concurrency)
+        replay_dir = replay_dir or os.environ.get("BRAVE_REPLAY_DIR")
+        record_dir = record_dir or os.environ.get("BRAVE_RECORD_DIR")
+        self.replay_dir = Path(replay_dir) if replay_dir else None
+        self.record_dir = Path(record_dir) if record_dir else None
+        if dry_run is None:
+            dry_run = os.environ.get("BRAVE_DRY_RUN", "") in ("1", "true", "yes")
+        self.dry_run = dry_run
+        self.use_cache = use_cache and not self.replay_dir and not dry_run
+
+        self.limiter = RateLimiter(rate_per_sec)
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.max_concurrency)
+        self._session = requests.Session()
+        self.requests = 0
+        self.quota_exceeded = False
+        self.daily_exceeded = False
+
+    # ------------------------------------------------------------------
+    # Orçamento
+    # ------------------------------------------------------------------
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.token) or bool(self.replay_dir) or self.dry_run
+
+    def exhausted(self) -> bool:
+        with self._lock:
+            return self.quota_exceeded or self.daily_exceeded or self.requests >= self.budget
+
+    def _reserve(self) -> bool:
+        """Reserva 1 request do orçamento da execução e do teto diário (atômico)"""
+        with self._lock:
+            if self.quota_exceeded or self.daily_exceeded or self.requests >= self.budget:
+                return False
+            self.requests += 1
+        # dry-run e replay não gastam cota de verdade
+        if self.daily_budget <= 0 or self.dry_run or self.replay_dir:
+            return True
+        if brave_planner.reserve_daily(self.daily_budget):
+            return True
+        with self._lock:
+            self.requests -= 1
+            if not self.daily_exceeded:
+                logger.warning(f"Brave: teto diário de {self.daily_budget} requests atingido")
+            self.daily_exceeded = True
+        return False
+
+    # ------------------------------------------------------------------
+    # Gravação / replay
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _record_key(query: str, count: int, offset: int) -> str:
+        return hashlib.sha1(f"{query}|{count}|{offset}".encode()).hexdigest()
+
+    def _replay(self, query: str, count: int, offset: int) -> list:
+        path = self.replay_dir / f"{self._record_key(query, count, offset)}.json"
+        if not path.exists():
+            logger.debug(f"Replay sem gravação para: {query}")
+            return []
+        try:
+            return json.loads(path.read_text()).get("results") or []
+        except Exception:
+            return []
+
+    def _record(self, query: str, count: int, offset: int, results: list) -> None:
+        try:
+            self.record_dir.mkdir(parents=True, exist_ok=True)
+            path = self.record_dir / f"{self._record_key(query, count, offset)}.json"
+            path.write_text(json.dumps(
+                {"query": query, "count": count, "offset": offset, "results": results},
+                ensure_ascii=False,
+            ))
+        except OSError as e:
+            logger.warning(f"Erro ao gravar resposta do Brave: {e}")
+
+    # ------------------------------------------------------------------
+    # Busca
+    # ------------------------------------------------------------------
+
+    def search(self, query: str, count: int = 10, offset: int = 0) -> list:
+        """Uma busca (cache → orçamento → rate limit → API). Retorna results da web."""
+        if not self.enabled:
+            return []
+        if self.use_cache:
+            cached = brave_planner.get_cached(query, count, offset)
+            if cached is not None:
+                return cached
+        if not self._reserve():
+            return []
+        if self.dry_run:
+            logger.info(f"[dry-run] Brave: {query}")
+            return []
+        if self.replay_dir:
+            return self._replay(query, count, offset)
+
+        with self._slots:
+            results = self._call_api(query, count, offset)
+        if results is None:
+            return []
+        brave_planner.record_request(query, len(results))
+        if self.use_cache:
+            brave_planner.put_cache(query, count, offset, results)
+        if self.record_dir:
+            self._record(query, count, offset, results)
+        return results
+
+    def _call_api(self, query: str, count: int, offset: int, retry: bool = True) -> Optional[list]:
+        headers = {"X-Subscription-Token": self.token, "Accept": "application/json"}
+        params = {
+            "q": query,
+            "count": count,
+            "offset": offset,
+            "search_lang": "en",
+            "safesearch": "moderate",
+        }
+        self.limiter.acquire()
+        try:
+            r = self._session.get(BRAVE_ENDPOINT, headers=headers, params=params, timeout=20)
+        except requests.exceptions.RequestException as e:
+            logger.warning(f"Erro no Brave ({query[:60]}): {e}")
+            return None
+        self.limiter.update_from_headers(r.headers)
+
+        if r.status_code == 429:
+            remaining = _parse_rate_header(r.headers.get("X-RateLimit-Remaining"))
+            # cota mensal esgotada (ou sem headers): para de gastar
+            if len(remaining) < 2 or remaining[1] <= 0:
+                with self._lock:
+                    self.quota_exceeded = True
+                return None
+            # só estourou a janela por segundo: espera o reset e tenta de novo
+            if retry:
+                return self._call_api(query, count, offset, retry=False)
+            return None
+        if not r.ok:
+            brave_planner.record_request(query, 0)
+            return None
+        try:
+            data = r.json()
+        except ValueError:
+            return None
+        return data.get("web", {}).get("results", []) if isinstance(data, dict) else []
+
+    def search_many(self, queries: Iterable[str], count: int = 10) -> Iterator[Tuple[str, list]]:
+        """
+        Executa várias buscas em paralelo (até max_concurrency em voo) e entrega
+        (query, results) na ordem das queries. Parar de iterar cancela o que falta.
+        """
+        pending = deque()
+        queries = iter(queries)
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as pool:
+            try:
+                while True:
+                    while len(pending) < self.max_concurrency * 2 and not self.exhausted():
+                        q = next(queries, None)
+                        if q is None:
+                            break
+                        pending.append((q, pool.submit(self.search, q, count)))
+                    if not pending:
+                        break
+                    q, future = pending.popleft()
+                    yield q, future.result()
+            finally:
+                for _q, future in pending:
+                    future.cancel()
@@ -0,0 +1,243 @@
+"""
+Job Curator Bot - Brave Query Planner
+Escolhe as queries do Brave pelo rendimento histórico e guarda as respostas
+brutas em cache, para que o mesmo BRAVE_BUDGET renda mais vagas aprovadas.
+
+Funil registrado por query em jobs.db (brave_query_stats):
+requests → results → kept → approved → posted
+"""
+import json
+import logging
+import math
+import os
+import random
+import re
+import threading
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional
+
+import database as db
+
+logger = logging.getLogger(__name__)
+
+BRAVE_CACHE_TTL_HOURS = float(os.environ.get("BRAVE_CACHE_TTL_HOURS", "24"))
+BRAVE_EXPLORE_RATIO = float(os.environ.get("BRAVE_EXPLORE_RATIO", "0.25"))
+
+# Suavização (prior) para queries com pouco histórico:
+# uma query nova "vale" PRIOR_YIELD vagas aprovadas em PRIOR_REQUESTS requests.
+PRIOR_YIELD = 0.5
+PRIOR_REQUESTS = 2.0
+# Peso dos estágios do funil no rendimento esperado
+KEPT_WEIGHT = 0.2
+POSTED_WEIGHT = 1.0
+
+_LOCK = threading.Lock()
+# Link da vaga num post de telegram_posts.txt (prepare_daily_batch.format_post)
+POST_LINK_RE = re.compile(r"APLICAR:\s*(\S+)")
+
+
+def get_cached(query: str, count: int, offset: int = 0) -> Optional[list]:
+    """Resposta em cache (dentro do TTL) ou None"""
+    if BRAVE_CACHE_TTL_HOURS <= 0:
+        return None
+    cutoff = (datetime.now() - timedelta(hours=BRAVE_CACHE_TTL_HOURS)).isoformat()
+    with db.get_connection() as conn:
+        row = conn.execute('''
+            SELECT response FROM brave_cache
+            WHERE query = ? AND count = ? AND offset = ? AND fetched_at >= ?
+        ''', (query, count, offset, cutoff)).fetchone()
+    if not row:
+        return None
+    try:
+        return json.loads(row['response'])
+    except Exception:
+        return None
+
+
+def put_cache(query: str, count: int, offset: int, results: list) -> None:
+    with _LOCK, db.get_connection() as conn:
+        conn.execute('''
+            INSERT OR REPLACE INTO brave_cache (query, count, offset, response, fetched_at)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (query, count, offset, json.dumps(results), datetime.now().isoformat()))
+        conn.execute('DELETE FROM brave_cache WHERE fetched_at < ?', (
+            (datetime.now() - timedelta(hours=max(BRAVE_CACHE_TTL_HOURS, 1) * 7)).isoformat(),
+        ))
+        conn.commit()
+
+
+def record_request(query: str, n_results: int) -> None:
+    """Registra uma chamada paga ao Brave e quantos resultados voltaram"""
+    with _LOCK, db.get_connection() as conn:
+        conn.execute('''
+            INSERT INTO brave_query_stats (query, requests, results, last_run_at)
+            VALUES (?, 1, ?, ?)
+            ON CONFLICT(query) DO UPDATE SET
+                requests = requests + 1,
+                results = results + excluded.results,
+                last_run_at = excluded.last_run_at
+        ''', (query, n_results, datetime.now().isoformat()))
+        conn.commit()
+
+
+def reserve_daily(limit: int) -> bool:
+    """Reserva 1 request no gasto do dia (atômico entre processos); False se já chegou a `limit`"""
+    with _LOCK, db.get_connection() as conn:
+        row = conn.execute('''
+            INSERT INTO brave_daily_spend (day, requests) VALUES (?, 1)
+            ON CONFLICT(day) DO UPDATE SET requests = requests + 1 WHERE requests < ?
+            RETURNING requests
+        ''', (datetime.now().date().isoformat(), limit)).fetchone()
+        conn.commit()
+    return row is not None
+
+
+def daily_spent() -> int:
+    """Requests pagos ao Brave hoje"""
+    with db.get_connection() as conn:
+        row = conn.execute('SELECT requests FROM brave_daily_spend WHERE day = ?',
+                           (datetime.now().date().isoformat(),)).fetchone()
+    return row['requests'] if row else 0
+
+
+def record_outcome(stage: str, queries: Iterable[str]) -> None:
+    """
+    Soma 1 no estágio do funil para cada vaga (query de origem).
+
+    Args:
+        stage: 'kept' | 'approved' | 'posted'
+        queries: query de origem de cada vaga (repetições contam várias vezes)
+    """
+    if stage not in ('kept', 'approved', 'posted'):
+        raise ValueError(f"Estágio inválido: {stage}")
+    counts = {}
+    for q in queries:
+        if q:
+            counts[q] = counts.get(q, 0) + 1
+    if not counts:
+        return
+    with _LOCK, db.get_connection() as conn:
+        conn.executemany(f'''
+            INSERT INTO brave_query_stats (query, {stage}) VALUES (?, ?)
+            ON CONFLICT(query) DO UPDATE SET {stage} = {stage} + excluded.{stage}
+        ''', list(counts.items()))
+        conn.commit()
+
+
+def record_posted(urls: Iterable[str]) -> int:
+    """
+    Soma 'posted' para a query de origem das vagas realmente postadas (pelo
+    link direto em jobs). Cada vaga conta uma vez só, mesmo postada em mais
+    de um canal ou fila.
+
+    Returns:
+        vagas contadas agora
+    """
+    queries = []
+    with _LOCK, db.get_connection() as conn:
+        for url in {u for u in urls if u}:
+            queries += [row[0] for row in conn.execute('''
+                UPDATE jobs SET raw_data = json_set(raw_data, '$.brave_posted', 1)
+                WHERE direct_url = ? AND json_valid(raw_data)
+                  AND json_extract(raw_data, '$.brave_posted') IS NULL
+                RETURNING json_extract(raw_data, '$.brave_query')
+            ''', (url,)).fetchall()]
+        conn.commit()
+    record_outcome('posted', queries)
+    return len(queries)
+
+
+def record_posted_text(text: str) -> int:
+    """Como record_posted, pelo link 'APLICAR:' de um post de texto (post_next*)"""
+    return record_posted(POST_LINK_RE.findall(text or ""))
+
+
+def _load_stats(queries: List[str]) -> dict:
+    stats = {}
+    with db.get_connection() as conn:
+        for start in range(0, len(queries), 500):
+            chunk = queries[start:start + 500]
+            marks = ",".join("?" * len(chunk))
+            for row in conn.execute(
+                f'SELECT * FROM brave_query_stats WHERE query IN ({marks})', chunk
+            ):
+                stats[row['query']] = dict(row)
+    return stats
+
+
+def _cached_queries(queries: List[str]) -> set:
+    if BRAVE_CACHE_TTL_HOURS <= 0:
+        return set()
+    cutoff = (datetime.now() - timedelta(hours=BRAVE_CACHE_TTL_HOURS)).isoformat()
+    found = set()
+    with db.get_connection() as conn:
+        for start in range(0, len(queries), 500):
+            chunk = queries[start:start + 500]
+            marks = ",".join("?" * len(chunk))
+            for row in conn.execute(
+                f'SELECT query FROM brave_cache WHERE fetched_at >= ? AND offset = 0 AND query IN ({marks})',
+                [cutoff] + chunk,
+            ):
+                found.add(row['query'])
+    return found
+
+
+def expected_yield(stat: Optional[dict]) -> float:
+    """Vagas aprovadas esperadas por request (com prior para pouco histórico)"""
+    stat = stat or {}
+    value = (
+        (stat.get('approved') or 0)
+        + KEPT_WEIGHT * (stat.get('kept') or 0)
+        + POSTED_WEIGHT * (stat.get('posted') or 0)
+    )
+    return (value + PRIOR_YIELD) / ((stat.get('requests') or 0) + PRIOR_REQUESTS)
+
+
+def plan_queries(candidates: List[str], limit: int,
+                 explore_ratio: float = BRAVE_EXPLORE_RATIO) -> List[str]:
+    """
+    Escolhe até `limit` queries:
+    - (1 - explore_ratio) pelas maiores médias de rendimento por request
+    - explore_ratio por exploração (prioriza nunca executadas / há mais tempo sem rodar)
+
+    Queries com resposta em cache não gastam orçamento e entram sempre.
+    Registra as decisões no log (logger do módulo).
+    """
+    candidates = list(dict.fromkeys(q for q in candidates if q))
+    if limit <= 0 or not candidates:
+        return []
+
+    cached_set = _cached_queries(candidates)
+    cached = [q for q in candidates if q in cached_set]
+    rest = [q for q in candidates if q not in cached_set]
+    stats = _load_stats(rest)
+
+    n_explore = min(len(rest), int(math.ceil(limit * max(0.0, min(1.0, explore_ratio)))))
+    n_exploit = max(0, limit - n_explore)
+
+    # só explora o histórico de queries que rendem ao menos o esperado de uma query nova
+    baseline = expected_yield(None)
+    ranked = sorted(rest, key=lambda q: expected_yield(stats.get(q)), reverse=True)
+    exploit = [
+        q for q in ranked
+        if (stats.get(q) or {}).get('requests') and expected_yield(stats.get(q)) >= baseline
+    ][:n_exploit]
+
+    # exploração: nunca executadas primeiro, depois as mais antigas (sorteio estável no dia)
+    rng = random.Random(datetime.utcnow().strftime("%Y-%m-%d"))
+    remaining = [q for q in rest if q not in set(exploit)]
+    rng.shuffle(remaining)
+    remaining.sort(key=lambda q: (stats.get(q) or {}).get('last_run_at') or "")
+    explore = remaining[:limit - len(exploit)]
+
+    logger.info(
+        f"Planner Brave: {len(candidates)} candidatas, {len(cached)} em cache, "
+        f"{len(exploit)} por rendimento, {len(explore)} exploração"
+    )
+    for q in exploit[:5]:
+        s = stats.get(q) or {}
+        logger.info(
+            f"  ↑ {expected_yield(s):.2f}/req "
+            f"({s.get('approved', 0)} aprov., {s.get('kept', 0)} mantidas, {s.get('requests', 0)} req) {q}"
+        )
+    return cached + exploit + explore
@@ -0,0 +1,269 @@
+"""
+Job Curator Bot - Company Registry
+Registro único de empresas em jobs.db (tabela companies), no lugar de ler
+empresas_cache.json e companies_database.json inteiros em cada processo.
+
+- Chave normalizada como prepare_daily_batch._company_key, sem acentos e sem
+  sufixos societários: "Stripe, Inc." / "STRIPE" / "Stripe Inc" → "stripe".
+- Busca: chave exata → prefixo de palavras inteiras ("Stripe Payments" ~
+  "stripe", mas "Metabase" ≠ "meta") → trigramas (Jaccard ≥ FUZZY_MIN_SCORE e
+  tamanhos parecidos), com LRU na frente.
+- Os dois JSON continuam sendo editados à mão: são reimportados quando o mtime
+  muda (conferido a cada RELOAD_CHECK_SECONDS), sem reiniciar o processo.
+- Descrição: empresas_cache.json tem prioridade sobre companies_database.json.
+
+Uso:
+- telegram_poster.get_empresa_descricao, prepare_daily_batch.load_companies_db
+- Standalone: python3 company_registry.py [--sync] [--lookup NOME]
+"""
+import argparse
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import database as db
+from config import DATA_DIR
+from job_keys import company_key
+
+# Fontes importadas (nome, caminho); a primeira tem prioridade na descrição
+SOURCES = (
+    ("empresas_cache", DATA_DIR / "empresas_cache.json"),
+    ("companies_database", DATA_DIR / "companies_database.json"),
+)
+
+RELOAD_CHECK_SECONDS = float(os.environ.get("COMPANY_REGISTRY_RELOAD_SECONDS", "5"))
+FUZZY_MIN_SCORE = 0.7
+FUZZY_MIN_LEN_RATIO = 0.8  # nome menor com pelo menos 80% do tamanho do maior
+PREFIX_MIN_LEN = 4
+LRU_SIZE = 4096
+
+_LOCK = threading.RLock()
+_index = None
+_checked_at = 0.0
+
+
+def registry_key(name: Optional[str]) -> str:
+    """'Stripe, Inc.' → 'stripe' (job_keys.company_key sem espaços)"""
+    return company_key(name).replace(" ", "")
+
+
+def _trigrams(key: str) -> set:
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+# =============================================================================
+# IMPORTAÇÃO DOS JSON
+# =============================================================================
+
+def _read_source(source: str, path: Path) -> List[dict]:
+    """Linhas {key, name, description, country, careers_url, sector} de uma fonte"""
+    try:
+        data = json.loads(path.read_text(encoding="utf-8") or "{}")
+    except (OSError, ValueError):
+        return []
+    rows = []
+    if source == "empresas_cache":
+        # {"nome_lowercase": "descrição"}
+        for name, desc in data.items():
+            if name.startswith("_") or not isinstance(desc, str):
+                continue
+            rows.append({"name": name, "description": desc})
+    else:
+        items = data.get("companies") if isinstance(data, dict) else data
+        for item in items or []:
+            if isinstance(item, dict) and item.get("name"):
+                rows.append({
+                    "name": item["name"],
+                    "description": item.get("desc") or item.get("description"),
+                    "country": item.get("country"),
+                    "careers_url": item.get("careers_url"),
+                    "sector": item.get("sector"),
+                    "data": json.dumps(item, ensure_ascii=False),
+                })
+    for row in rows:
+        row["key"] = registry_key(row["name"])
+    return [row for row in rows if row["key"]]
+
+
+def sync(force: bool = False) -> int:
+    """
+    Reimporta as fontes cujo mtime mudou desde a última importação e marca os
+    renders da fila para refazer a descrição da empresa.
+
+    Returns:
+        fontes reimportadas
+    """
+    changed = 0
+    with db.get_connection() as conn:
+        known = {row["source"]: row["mtime"] for row in conn.execute("SELECT source, mtime FROM company_sources")}
+        for priority, (source, path) in enumerate(SOURCES):
+            path = Path(path)
+            if not path.exists():
+                continue
+            mtime = path.stat().st_mtime
+            if not force and known.get(source) == mtime:
+                continue
+            rows = _read_source(source, path)
+            now = datetime.now().isoformat()
+            conn.execute("DELETE FROM companies WHERE source = ?", (source,))
+            conn.executemany('''
+                INSERT INTO companies
+                    (key, source, priority, name, description, country, careers_url, sector, data, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', [(r["key"], source, priority, r["name"], r.get("description"), r.get("country"),
+                   r.get("careers_url"), r.get("sector"), r.get("data"), now) for r in rows])
+            conn.execute("INSERT OR REPLACE INTO company_sources (source, mtime) VALUES (?, ?)", (source, mtime))
+            changed += 1
+        if changed:
+            # descrições gravadas nos renders da fila: buscadas de novo na próxima postagem
+            conn.execute("UPDATE job_queue SET company_desc = NULL")
+        conn.commit()
+    return changed
+
+
+# =============================================================================
+# ÍNDICE EM MEMÓRIA
+# =============================================================================
+
+class _Index:
+    """Chaves e trigramas do registro (montado a partir de jobs.db)"""
+
+    def __init__(self):
+        with db.get_connection() as conn:
+            self.keys = sorted({row["key"] for row in conn.execute("SELECT DISTINCT key FROM companies")})
+        self.trigrams = defaultdict(set)
+        for key in self.keys:
+            for tri in _trigrams(key):
+                self.trigrams[tri].add(key)
+        self.key_set = set(self.keys)
+
+    def match(self, words: str) -> Optional[str]:
+        """Chave registrada mais próxima de `words` (company_key, com espaços)"""
+        key = words.replace(" ", "")
+        if not key:
+            return None
+        if key in self.key_set:
+            return key
+        # "stripe payments" → "stripe"; "metabase" → "meta" não (palavra cortada)
+        parts = words.split()
+        for n in range(len(parts) - 1, 0, -1):
+            prefix = "".join(parts[:n])
+            if len(prefix) >= PREFIX_MIN_LEN and prefix in self.key_set:
+                return prefix
+        grams = _trigrams(key)
+        scores = defaultdict(int)
+        for tri in grams:
+            for candidate in self.trigrams.get(tri, ()):
+                scores[candidate] += 1
+        best, best_score = None, 0.0
+        for candidate, shared in scores.items():
+            if min(len(key), len(candidate)) < FUZZY_MIN_LEN_RATIO * max(len(key), len(candidate)):
+                continue
+            score = shared / (len(grams) + len(_trigrams(candidate)) - shared)
+            if score > best_score:
+                best, best_score = candidate, score
+        return best if best_score >= FUZZY_MIN_SCORE else None
+
+
+def _sources_changed() -> bool:
+    with db.get_connection() as conn:
+        known = {row["source"]: row["mtime"] for row in conn.execute("SELECT source, mtime FROM company_sources")}
+    return any(Path(p).exists() and Path(p).stat().st_mtime != known.get(s) for s, p in SOURCES)
+
+
+def _get_index() -> _Index:
+    """Índice atual; reimporta e remonta se algum JSON mudou (no máximo a cada RELOAD_CHECK_SECONDS)"""
+    global _index, _checked_at
+    with _LOCK:
+        now = time.monotonic()
+        if _index is None or now - _checked_at >= RELOAD_CHECK_SECONDS:
+            _checked_at = now
+            if _index is None or _sources_changed():
+                sync()
+                _index = _Index()
+                _lookup_key.cache_clear()
+        return _index
+
+
+@lru_cache(maxsize=LRU_SIZE)
+def _lookup_key(words: str) -> Optional[tuple]:
+    match = _index.match(words) if _index else None
+    if not match:
+        return None
+    with db.get_connection() as conn:
+        rows = conn.execute(
+            "SELECT * FROM companies WHERE key = ? ORDER BY priority, rowid", (match,)
+        ).fetchall()
+    if not rows:
+        return None
+    merged = {}
+    # primeira fonte com valor ganha (empresas_cache antes de companies_database)
+    for row in rows:  # linhas repetidas da mesma fonte ficam na ordem do arquivo
+        for col in ("name", "description", "country", "careers_url", "sector"):
+            if not merged.get(col) and row[col]:
+                merged[col] = row[col]
+    merged["key"] = match
+    return tuple(sorted(merged.items()))
+
+
+# =============================================================================
+# CONSULTA
+# =============================================================================
+
+def lookup(name: Optional[str]) -> Optional[dict]:
+    """Empresa registrada para o nome (exato, prefixo ou aproximado), ou None"""
+    words = company_key(name)
+    if not words:
+        return None
+    _get_index()
+    found = _lookup_key(words)
+    return dict(found) if found else None
+
+
+def describe(name: Optional[str]) -> str:
+    """Descrição em português da empresa ('' se não houver)"""
+    found = lookup(name)
+    return (found or {}).get("description") or ""
+
+
+def companies(source: str = "companies_database") -> List[dict]:
+    """Empresas de uma fonte como no JSON original (todas as chaves de cada item, na mesma ordem)"""
+    _get_index()
+    with db.get_connection() as conn:
+        rows = conn.execute(
+            "SELECT name, country, careers_url, sector, description, data FROM companies WHERE source = ? ORDER BY rowid",
+            (source,),
+        ).fetchall()
+    return [json.loads(r["data"]) if r["data"] else {
+        "name": r["name"], "country": r["country"], "careers_url": r["careers_url"],
+        "sector": r["sector"], "desc": r["description"],
+    } for r in rows]
+
+
+def stats() -> Dict[str, int]:
+    with db.get_connection() as conn:
+        rows = conn.execute("SELECT source, COUNT(*) AS n FROM companies GROUP BY source").fetchall()
+    return {row["source"]: row["n"] for row in rows}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Registro de empresas (descrições e careers)")
+    parser.add_argument("--sync", action="store_true", help="reimporta os JSON de empresas")
+    parser.add_argument("--lookup", help="busca uma empresa pelo nome")
+    args = parser.parse_args()
+    if args.sync:
+        print(f"Fontes importadas: {sync(force=True)}")
+    if args.lookup:
+        print(f"{args.lookup} ({registry_key(args.lookup)}): {lookup(args.lookup)}")
+    print(f"Registro: {stats()}")
+
+
+if __name__ == "__main__":
+    main()
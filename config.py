@@ -30,6 +30,12 @@ CLAUDE_API_KEY = os.environ.get('ANTHROPIC_API_KEY')
 JOBS_PER_DAY_FREE = 5       # Vagas no canal gratuito (3-5 conforme spec)
 JOBS_PER_DAY_PAID = 30      # Vagas no canal pago (ATUALIZADO: era 20, agora 30)
 
+# Canais extras (temáticos/regionais), postados em paralelo com FREE e PAID.
+# Formato: "tipo=@canal:limite[:VAR_DO_TOKEN]" separados por vírgula
+# Ex: "eu=@VagasRemotasEU:10,dev=@VagasRemotasDev:15:TELEGRAM_TOKEN_DEV"
+# Sem VAR_DO_TOKEN usa TELEGRAM_TOKEN_PAID.
+TELEGRAM_EXTRA_CHANNELS = os.environ.get('TELEGRAM_EXTRA_CHANNELS', '')
+
 # =============================================================================
 # MIX DE SALÁRIO (Regra 75/25)
 # =============================================================================
@@ -40,7 +46,9 @@ SALARY_LOW_PERCENTAGE = 0.25    # 25% podem ser < $4k (mas cumprindo outros requ
 # =============================================================================
 # HORÁRIOS DE EXECUÇÃO
 # =============================================================================
-SCHEDULE_HOURS = ['03:00', '09:00', '15:00']  # 3x ao dia, começando de madrugada
+SCHEDULE_HOURS = ['03:00', '09:00', '15:00']  # 3x ao dia, começando de madrugada (posting)
+DISCOVERY_INTERVAL_MIN = int(os.environ.get('DISCOVERY_INTERVAL_MIN', '120'))  # fetch → enrich
+ANALYSIS_POLL_MIN = int(os.environ.get('ANALYSIS_POLL_MIN', '10'))            # classify, se há enriquecidas
 
 # =============================================================================
 # FILTROS GEOGRÁFICOS
@@ -130,6 +138,21 @@ REQUEST_TIMEOUT = 30  # segundos
 REQUEST_DELAY = 5     # segundos entre requests (rate limiting - devagar)
 USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
 
+# =============================================================================
+# LINK HEALTH (varredura periódica de links da fila e postados)
+# =============================================================================
+LINK_HEALTH_INTERVAL_HOURS = int(os.environ.get('LINK_HEALTH_INTERVAL_HOURS', '4'))
+LINK_HEALTH_STALE_HOURS = int(os.environ.get('LINK_HEALTH_STALE_HOURS', '12'))   # revalida após N horas
+LINK_HEALTH_POSTED_DAYS = int(os.environ.get('LINK_HEALTH_POSTED_DAYS', '7'))    # postadas recentes também
+LINK_HEALTH_WORKERS = int(os.environ.get('LINK_HEALTH_WORKERS', '8'))            # checagens simultâneas
+LINK_HEALTH_BATCH = int(os.environ.get('LINK_HEALTH_BATCH', '200'))
+
+# =============================================================================
+# DEDUPE DE VAGAS (mesma vaga vinda de fontes diferentes)
+# =============================================================================
+JOB_CLUSTER_DAYS = int(os.environ.get('JOB_CLUSTER_DAYS', '30'))                  # janela para agrupar quase-duplicatas
+JOB_CLUSTER_MAX_DISTANCE = int(os.environ.get('JOB_CLUSTER_MAX_DISTANCE', '3'))   # bits de diferença no SimHash do título
+
 # =============================================================================
 # GEMINI
 # =============================================================================
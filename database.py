@@ -4,15 +4,23 @@ Gerencia vagas, fila, histórico e reaproveitamento
 """
 import sqlite3
 import json
+import time
 from datetime import datetime, timedelta
 from pathlib import Path
 from contextlib import contextmanager
 import logging
 
-from config import DATABASE_PATH, DATA_DIR
+from config import DATABASE_PATH, DATA_DIR, JOB_CLUSTER_DAYS, JOB_CLUSTER_MAX_DISTANCE
+from job_keys import canonical_url, company_key, hamming, stable_id, title_simhash
 
 logger = logging.getLogger(__name__)
 
+# Versão do esquema (PRAGMA user_version) para migrações que rodam uma vez só
+SCHEMA_VERSION = 1
+
+# Espera por lock de escrita (vários processos do pipeline no mesmo banco)
+BUSY_TIMEOUT_SECONDS = 30
+
 
 def init_database():
     """Inicializa o banco de dados com as tabelas necessárias"""
@@ -71,20 +79,210 @@ def init_database():
             )
         ''')
         
+        # Estatísticas por query do Brave (planner por rendimento)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS brave_query_stats (
+                query TEXT PRIMARY KEY,
+                requests INTEGER DEFAULT 0,
+                results INTEGER DEFAULT 0,
+                kept INTEGER DEFAULT 0,
+                approved INTEGER DEFAULT 0,
+                posted INTEGER DEFAULT 0,
+                last_run_at TIMESTAMP
+            )
+        ''')
+        
+        # Cache das respostas brutas do Brave (por query/count/offset)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS brave_cache (
+                query TEXT NOT NULL,
+                count INTEGER NOT NULL,
+                offset INTEGER NOT NULL,
+                response TEXT NOT NULL,
+                fetched_at TIMESTAMP NOT NULL,
+                PRIMARY KEY (query, count, offset)
+            )
+        ''')
+        
+        # Requests pagos ao Brave por dia (teto BRAVE_DAILY_BUDGET, entre processos)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS brave_daily_spend (
+                day TEXT PRIMARY KEY,
+                requests INTEGER DEFAULT 0
+            )
+        ''')
+        
+        # Índice de dedupe: links e empresas já postados (dedupe_index.py)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS dedupe_index (
+                kind TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT,
+                source TEXT,
+                first_seen TIMESTAMP,
+                last_seen TIMESTAMP,
+                PRIMARY KEY (kind, key)
+            ) WITHOUT ROWID
+        ''')
+        # Pool/posts importados antes como postados: viram 'queued' (não bloqueiam o enrich)
+        queued_sources = ('batch_pool', 'batch_pool.json', 'telegram_posts.txt')
+        cursor.execute('''
+            INSERT OR IGNORE INTO dedupe_index (kind, key, value, source, first_seen, last_seen)
+            SELECT 'queued', key, value, source, first_seen, last_seen FROM dedupe_index
+            WHERE kind = 'url' AND source IN (?, ?, ?)
+        ''', queued_sources)
+        cursor.execute("DELETE FROM dedupe_index WHERE kind IN ('url', 'company') AND source IN (?, ?, ?)",
+                       queued_sources)
+        
+        # Registro de empresas: empresas_cache.json + companies_database.json (company_registry.py)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS companies (
+                key TEXT NOT NULL,
+                source TEXT NOT NULL,
+                priority INTEGER DEFAULT 0,
+                name TEXT,
+                description TEXT,
+                country TEXT,
+                careers_url TEXT,
+                sector TEXT,
+                data TEXT,
+                updated_at TIMESTAMP
+            )
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS company_sources (
+                source TEXT PRIMARY KEY,
+                mtime REAL
+            )
+        ''')
+        
+        # Última execução de cada job do agendador (scheduler.py / app.py)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS scheduler_runs (
+                job TEXT PRIMARY KEY,
+                last_started TIMESTAMP,
+                last_finished TIMESTAMP,
+                last_status TEXT,
+                last_error TEXT,
+                last_seconds REAL,
+                last_stats TEXT,
+                runs INTEGER DEFAULT 0
+            )
+        ''')
+        
         # Índices para performance
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status)')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_jobs_category ON jobs(category)')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_queue_priority ON job_queue(priority DESC)')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_posted_channel ON posted_jobs(channel_type, channel_id)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_companies_key ON companies(key, priority)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_companies_source ON companies(source)')
+        
+        # Colunas adicionadas depois da criação inicial (bancos antigos)
+        _ensure_columns(cursor, 'jobs', {
+            'last_checked': 'TIMESTAMP',
+            'last_status': 'TEXT',
+            'link_failures': 'INTEGER DEFAULT 0',
+            'stage': 'TEXT',
+            'stage_updated_at': 'TIMESTAMP',
+            'canonical_url': 'TEXT',
+            'company_key': 'TEXT',
+            'title_simhash': 'INTEGER',
+            'cluster_id': 'TEXT',
+            # lease do pipeline: processo que está com a vaga e até quando (unix)
+            'claimed_by': 'TEXT',
+            'lease_expires_at': 'REAL',
+        })
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_jobs_last_checked ON jobs(last_checked)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_jobs_stage ON jobs(stage, status)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_jobs_source_url ON jobs(source_url)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_jobs_canonical_url ON jobs(canonical_url)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_jobs_direct_url ON jobs(direct_url)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_jobs_company_key ON jobs(company_key, discovered_at)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_jobs_claimed ON jobs(claimed_by) WHERE claimed_by IS NOT NULL')
+        _backfill_job_keys(cursor)
+        # Texto do post renderizado na entrada da fila (message_render)
+        _ensure_columns(cursor, 'job_queue', {
+            'rendered': 'TEXT',
+            'render_hash': 'TEXT',
+            'render_version': 'INTEGER',
+            'company_desc': 'TEXT',  # descrição usada no render (NULL = buscar no registro)
+        })
+        # Resultado da entrega no Telegram (telegram_sender)
+        _ensure_columns(cursor, 'posted_jobs', {
+            'attempts': 'INTEGER',
+            'latency_ms': 'INTEGER',
+            'throttled_ms': 'INTEGER',
+            'parse_mode': 'TEXT',
+        })
+        
+        version = cursor.execute('PRAGMA user_version').fetchone()[0]
+        if version < 1:
+            _migrate_stable_ids(cursor)
+        if version < SCHEMA_VERSION:
+            cursor.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
         
         conn.commit()
         logger.info(f"Database inicializado: {DATABASE_PATH}")
 
 
+def _ensure_columns(cursor, table: str, columns: dict):
+    """Adiciona colunas que ainda não existem (migração simples, idempotente)"""
+    cursor.execute(f'PRAGMA table_info({table})')
+    existing = {row[1] for row in cursor.fetchall()}
+    for name, ddl in columns.items():
+        if name not in existing:
+            cursor.execute(f'ALTER TABLE {table} ADD COLUMN {name} {ddl}')
+
+
+def _backfill_job_keys(cursor):
+    """Preenche URL canônica, empresa normalizada e SimHash do título em linhas antigas"""
+    cursor.execute('''
+        SELECT id, title, company, source_url FROM jobs
+        WHERE canonical_url IS NULL AND source_url IS NOT NULL
+    ''')
+    rows = cursor.fetchall()
+    if not rows:
+        return
+    cursor.executemany(
+        'UPDATE jobs SET canonical_url = ?, company_key = ?, title_simhash = ? WHERE id = ?',
+        [(canonical_url(r[3]), company_key(r[2]) or None, title_simhash(r[1]), r[0]) for r in rows],
+    )
+    logger.info(f"Chaves de vaga preenchidas em {len(rows)} linhas antigas")
+
+
+def _migrate_stable_ids(cursor):
+    """
+    Troca ids antigos (hash() do Python, md5 por fonte, prefixos) pelo id estável
+    da URL canônica, atualizando fila, postadas e grupos de duplicatas.
+    Se outra linha já tem o id novo (a mesma vaga por outra fonte), mantém o antigo.
+    """
+    cursor.execute('SELECT id, source_url, canonical_url FROM jobs')
+    rows = cursor.fetchall()
+    existing = {r[0] for r in rows}
+    renames = []
+    for old_id, source_url, canonical in rows:
+        url = canonical or source_url
+        if not url:
+            continue
+        new_id = stable_id(url)
+        if new_id == old_id or new_id in existing:
+            continue
+        existing.add(new_id)
+        renames.append((new_id, old_id))
+    if not renames:
+        return
+    cursor.executemany('UPDATE jobs SET id = ? WHERE id = ?', renames)
+    cursor.executemany('UPDATE job_queue SET job_id = ? WHERE job_id = ?', renames)
+    cursor.executemany('UPDATE posted_jobs SET job_id = ? WHERE job_id = ?', renames)
+    cursor.executemany('UPDATE jobs SET cluster_id = ? WHERE cluster_id = ?', renames)
+    logger.info(f"Ids estáveis: {len(renames)} vagas migradas de {len(rows)}")
+
+
 @contextmanager
 def get_connection():
     """Context manager para conexão com o banco"""
-    conn = sqlite3.connect(DATABASE_PATH)
+    conn = sqlite3.connect(DATABASE_PATH, timeout=BUSY_TIMEOUT_SECONDS)
     conn.row_factory = sqlite3.Row
     try:
         yield conn
@@ -200,8 +398,14 @@ def get_approved_jobs_without_direct_url(limit: int = 50) -> list:
 # QUEUE MANAGEMENT
 # =============================================================================
 
-def add_to_queue(job_id: str, is_high_salary: bool, expires_hours: int = 72):
-    """Adiciona vaga à fila de posting"""
+def add_to_queue(job_id: str, is_high_salary: bool, expires_hours: int = 72, render: dict = None):
+    """
+    Adiciona vaga à fila de posting
+
+    Args:
+        render: texto já renderizado (message_render.render_record)
+    """
+    render = render or {}
     with get_connection() as conn:
         cursor = conn.cursor()
         expires_at = datetime.now() + timedelta(hours=expires_hours)
@@ -210,14 +414,28 @@ def add_to_queue(job_id: str, is_high_salary: bool, expires_hours: int = 72):
         try:
             cursor.execute('''
                 INSERT OR REPLACE INTO job_queue 
-                (job_id, priority, is_high_salary, expires_at)
-                VALUES (?, ?, ?, ?)
-            ''', (job_id, priority, is_high_salary, expires_at.isoformat()))
+                (job_id, priority, is_high_salary, expires_at, rendered, render_hash, render_version, company_desc)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (job_id, priority, is_high_salary, expires_at.isoformat(), render.get('rendered'),
+                  render.get('render_hash'), render.get('render_version'), render.get('company_desc')))
             conn.commit()
         except Exception as e:
             logger.error(f"Erro ao adicionar à fila: {e}")
 
 
+def save_renders(renders: dict):
+    """Grava renders refeitos (versão do template ou vaga mudou). renders: {job_id: render_record}"""
+    if not renders:
+        return
+    with get_connection() as conn:
+        conn.executemany('''
+            UPDATE job_queue SET rendered = ?, render_hash = ?, render_version = ?, company_desc = ?
+            WHERE job_id = ?
+        ''', [(r['rendered'], r['render_hash'], r['render_version'], r.get('company_desc'), job_id)
+              for job_id, r in renders.items()])
+        conn.commit()
+
+
 def get_jobs_for_posting(channel_type: str, limit: int, 
                          high_salary_ratio: float = 0.75) -> list:
     """
@@ -234,11 +452,13 @@ def get_jobs_for_posting(channel_type: str, limit: int,
         
         # Vagas high salary (> $4k)
         cursor.execute('''
-            SELECT j.*, q.is_high_salary FROM job_queue q
+            SELECT j.*, q.is_high_salary, q.rendered, q.render_hash, q.render_version,
+                   q.company_desc FROM job_queue q
             JOIN jobs j ON q.job_id = j.id
             WHERE q.is_high_salary = 1
             AND q.expires_at > datetime('now')
             AND j.direct_url IS NOT NULL AND j.direct_url != ''
+            AND COALESCE(j.last_status, '') != 'dead'
             AND q.job_id NOT IN (
                 SELECT job_id FROM posted_jobs 
                 WHERE channel_type = ?
@@ -250,11 +470,13 @@ def get_jobs_for_posting(channel_type: str, limit: int,
         
         # Vagas low salary (resto)
         cursor.execute('''
-            SELECT j.*, q.is_high_salary FROM job_queue q
+            SELECT j.*, q.is_high_salary, q.rendered, q.render_hash, q.render_version,
+                   q.company_desc FROM job_queue q
             JOIN jobs j ON q.job_id = j.id
             WHERE q.is_high_salary = 0
             AND q.expires_at > datetime('now')
             AND j.direct_url IS NOT NULL AND j.direct_url != ''
+            AND COALESCE(j.last_status, '') != 'dead'
             AND q.job_id NOT IN (
                 SELECT job_id FROM posted_jobs 
                 WHERE channel_type = ?
@@ -269,22 +491,38 @@ def get_jobs_for_posting(channel_type: str, limit: int,
         return all_jobs
 
 
-def mark_as_posted(job_id: str, channel_type: str, channel_id: str, message_id: str = None):
-    """Marca vaga como postada"""
-    with get_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute('''
-            INSERT INTO posted_jobs (job_id, channel_type, channel_id, message_id)
-            VALUES (?, ?, ?, ?)
-        ''', (job_id, channel_type, channel_id, message_id))
-        conn.commit()
+def mark_as_posted(job_id: str, channel_type: str, channel_id: str, message_id: str = None,
+                   delivery: dict = None):
+    """
+    Marca vaga como postada.
+
+    Args:
+        delivery: resultado do telegram_sender (tentativas, latência, espera por limite)
+    """
+    mark_many_as_posted([(job_id, channel_type, channel_id, message_id, delivery)])
 
 
-def remove_from_queue(job_id: str):
-    """Remove vaga da fila"""
+def mark_many_as_posted(rows: list):
+    """
+    Marca várias vagas como postadas num único INSERT (uma transação).
+
+    Args:
+        rows: [(job_id, channel_type, channel_id, message_id, delivery), ...]
+    """
+    values = []
+    for job_id, channel_type, channel_id, message_id, delivery in rows:
+        delivery = delivery or {}
+        values.append((job_id, channel_type, channel_id, message_id,
+                       delivery.get('attempts'), delivery.get('latency_ms'),
+                       delivery.get('throttled_ms'), delivery.get('parse_mode')))
+    if not values:
+        return
     with get_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute('DELETE FROM job_queue WHERE job_id = ?', (job_id,))
+        conn.executemany('''
+            INSERT INTO posted_jobs (job_id, channel_type, channel_id, message_id,
+                                     attempts, latency_ms, throttled_ms, parse_mode)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', values)
         conn.commit()
 
 
@@ -327,29 +565,21 @@ def get_queue_stats() -> dict:
         }
 
 
-def verify_and_requeue_unused_jobs(link_verifier_func=None):
+def verify_and_requeue_unused_jobs():
     """
     Verifica vagas que não foram postadas hoje mas estão na fila.
-    Se o link ainda estiver ativo, reutiliza a vaga.
-    Se o link estiver morto (404), remove da fila.
-    
-    Args:
-        link_verifier_func: Função que verifica se um link está ativo
-                           (pode ser verify_url_is_active do link_resolver)
+    Usa o estado de saúde já calculado pelo link_health (sem I/O de rede):
+    se o link foi marcado como morto, remove da fila; senão, reutiliza a vaga.
     
     Returns:
         dict: {reused: int, removed_dead_links: int}
     """
-    from datetime import timedelta
-    
     with get_connection() as conn:
         cursor = conn.cursor()
         
         # Busca vagas na fila que NÃO foram postadas hoje
-        yesterday = (datetime.now() - timedelta(days=1)).date()
-        
         cursor.execute('''
-            SELECT DISTINCT q.job_id, j.direct_url, j.title
+            SELECT DISTINCT q.job_id, j.title, j.last_status
             FROM job_queue q
             JOIN jobs j ON q.job_id = j.id
             WHERE NOT EXISTS (
@@ -362,38 +592,476 @@ def verify_and_requeue_unused_jobs(link_verifier_func=None):
         ''')
         
         unused = cursor.fetchall()
-        reused = 0
-        removed = 0
+        dead_ids = []
+        alive_ids = []
         
         for job in unused:
-            job_id = job[0]
-            direct_url = job[1]
-            title = job[2]
-            
-            # Se temos verificador de link, verifica se ainda está ativo
-            if link_verifier_func and direct_url:
-                is_active = link_verifier_func(direct_url)
-                if not is_active:
-                    # Link morto - remove da fila
-                    logger.warning(f"Link morto - removendo vaga: {title[:40]}")
-                    remove_from_queue(job_id)
-                    removed += 1
-                    continue
-            
-            # Link está ok - requeue com nova data de expiração
-            expires_at = datetime.now() + timedelta(hours=72)
-            cursor.execute('''
-                UPDATE job_queue 
-                SET queued_at = datetime('now'), expires_at = ?
-                WHERE job_id = ?
-            ''', (expires_at.isoformat(), job_id))
-            
-            reused += 1
+            title = job['title'] or ''
+            if job['last_status'] == 'dead':
+                logger.warning(f"Link morto - removendo vaga: {title[:40]}")
+                dead_ids.append((job['job_id'],))
+                continue
+            alive_ids.append(job['job_id'])
             logger.info(f"Reutilizando vaga: {title[:40]}")
         
+        if dead_ids:
+            cursor.executemany('DELETE FROM job_queue WHERE job_id = ?', dead_ids)
+        
+        # Link ok (ou ainda não verificado) - requeue com nova data de expiração
+        expires_at = (datetime.now() + timedelta(hours=72)).isoformat()
+        cursor.executemany('''
+            UPDATE job_queue 
+            SET queued_at = datetime('now'), expires_at = ?
+            WHERE job_id = ?
+        ''', [(expires_at, job_id) for job_id in alive_ids])
+        
         conn.commit()
         
-        return {'reused': reused, 'removed_dead_links': removed}
+        return {'reused': len(alive_ids), 'removed_dead_links': len(dead_ids)}
+
+
+# =============================================================================
+# LINK HEALTH
+# =============================================================================
+
+def get_jobs_for_link_check(stale_hours: int = 12, posted_days: int = 7,
+                            limit: int = 200) -> list:
+    """
+    Retorna vagas cujo link precisa ser (re)verificado:
+    - vagas na fila (não expiradas)
+    - vagas postadas nos últimos `posted_days` dias
+    que nunca foram verificadas ou cuja última verificação tem mais de `stale_hours`.
+    """
+    stale_before = (datetime.now() - timedelta(hours=stale_hours)).isoformat()
+    posted_since = (datetime.now() - timedelta(days=posted_days)).strftime('%Y-%m-%d %H:%M:%S')
+    
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT j.id, j.title, j.direct_url, j.last_status, j.link_failures
+            FROM jobs j
+            WHERE j.direct_url IS NOT NULL AND j.direct_url != ''
+            AND (j.last_checked IS NULL OR j.last_checked < ?)
+            AND (
+                EXISTS (
+                    SELECT 1 FROM job_queue q
+                    WHERE q.job_id = j.id AND q.expires_at > datetime('now')
+                )
+                OR EXISTS (
+                    SELECT 1 FROM posted_jobs p
+                    WHERE p.job_id = j.id AND p.posted_at >= ?
+                )
+            )
+            ORDER BY j.last_checked IS NOT NULL, j.last_checked ASC
+            LIMIT ?
+        ''', (stale_before, posted_since, limit))
+        return [dict(row) for row in cursor.fetchall()]
+
+
+def update_link_health(results: list) -> int:
+    """
+    Grava o resultado de uma varredura de links.
+    
+    Args:
+        results: lista de (job_id, status) com status em 'alive' | 'dead' | 'error'
+    
+    Returns:
+        int: vagas removidas da fila por link morto
+    """
+    if not results:
+        return 0
+    
+    now = datetime.now().isoformat()
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.executemany('''
+            UPDATE jobs
+            SET last_checked = ?, last_status = ?,
+                link_failures = CASE WHEN ? = 'error'
+                                     THEN COALESCE(link_failures, 0) + 1
+                                     ELSE 0 END
+            WHERE id = ?
+        ''', [(now, status, status, job_id) for job_id, status in results])
+        
+        # Vagas fechadas saem da fila antes de expirar
+        dead = [(job_id,) for job_id, status in results if status == 'dead']
+        removed = 0
+        if dead:
+            cursor.executemany('DELETE FROM job_queue WHERE job_id = ?', dead)
+            removed = cursor.rowcount
+        conn.commit()
+        return removed
+
+
+# =============================================================================
+# PIPELINE (estágios)
+# =============================================================================
+
+# Colunas de jobs que os estágios podem atualizar
+STAGE_COLUMNS = (
+    'title', 'company', 'description', 'location', 'direct_url', 'category',
+    'accepts_international', 'analysis_result', 'analyzed_at', 'status', 'raw_data',
+)
+
+
+def _known_rows(cursor, column: str, values: list, select: str = None) -> list:
+    """Linhas de jobs com `column` em `values` (consulta em blocos de 500)"""
+    rows = []
+    values = list(dict.fromkeys(v for v in values if v))
+    for start in range(0, len(values), 500):
+        chunk = values[start:start + 500]
+        marks = ','.join('?' * len(chunk))
+        cursor.execute(f'SELECT {select or column} FROM jobs WHERE {column} IN ({marks})', chunk)
+        rows.extend(cursor.fetchall())
+    return rows
+
+
+def save_fetched_jobs(jobs: list) -> list:
+    """
+    Grava vagas coletadas no estágio 'fetched'.
+    
+    - Pula ids, source_urls e URLs canônicas já conhecidos.
+    - Quase-duplicatas (mesma empresa, título com SimHash a até
+      JOB_CLUSTER_MAX_DISTANCE bits, nos últimos JOB_CLUSTER_DAYS dias) entram
+      já rejeitadas ('duplicada'), com cluster_id apontando para a primeira vaga
+      do grupo: cada grupo é resolvido, enriquecido e analisado uma vez só.
+    
+    Returns:
+        list: ids das vagas novas que seguem no pipeline (na ordem recebida)
+    """
+    if not jobs:
+        return []
+    for job in jobs:
+        job['canonical_url'] = canonical_url(job.get('source_url'))
+        job['company_key'] = company_key(job.get('company'))
+        job['title_simhash'] = title_simhash(job.get('title'))
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        known = {row[0] for row in _known_rows(cursor, 'source_url', [j.get('source_url') for j in jobs])}
+        known.update(row[0] for row in _known_rows(cursor, 'canonical_url', [j['canonical_url'] for j in jobs]))
+        known.update(row[0] for row in _known_rows(cursor, 'direct_url', [j['canonical_url'] for j in jobs]))
+        known_ids = {row[0] for row in _known_rows(cursor, 'id', [j.get('id') for j in jobs])}
+        
+        # títulos recentes por empresa (representantes de cada grupo)
+        cutoff = (datetime.now() - timedelta(days=JOB_CLUSTER_DAYS)).isoformat(sep=' ')
+        clusters = {}
+        for row in _known_rows(cursor, 'company_key', [j['company_key'] for j in jobs],
+                               select='id, company_key, title_simhash, cluster_id, status, analyzed_at, discovered_at'):
+            if row['title_simhash'] is None or row['discovered_at'] < cutoff:
+                continue
+            # rejeitadas antes da análise não representam o grupo (ex: geo, link quebrado)
+            if row['status'] == 'rejected' and not row['analyzed_at'] and not row['cluster_id']:
+                continue
+            clusters.setdefault(row['company_key'], []).append(
+                (row['title_simhash'], row['cluster_id'] or row['id']))
+        
+        rows, new_ids = [], []
+        duplicates = 0
+        now = datetime.now().isoformat()
+        for job in jobs:
+            url = job.get('source_url')
+            if (url and url in known) or job['canonical_url'] in known or job['id'] in known_ids:
+                continue
+            known.update(u for u in (url, job['canonical_url']) if u)
+            known_ids.add(job['id'])
+            
+            cluster_id = None
+            if job['company_key'] and job['title_simhash'] is not None:
+                members = clusters.setdefault(job['company_key'], [])
+                for simhash, rep in members:
+                    if hamming(simhash, job['title_simhash']) <= JOB_CLUSTER_MAX_DISTANCE:
+                        cluster_id = rep
+                        break
+                if cluster_id is None:
+                    members.append((job['title_simhash'], job['id']))
+            
+            if cluster_id:
+                duplicates += 1
+                status, analysis = 'rejected', json.dumps({'motivo_rejeicao': 'duplicada'})
+            else:
+                status, analysis = 'pending', None
+                new_ids.append(job['id'])
+            rows.append((
+                job['id'],
+                job.get('title') or 'N/A',
+                job.get('company'),
+                job.get('description'),
+                url,
+                job.get('direct_url'),
+                job.get('location'),
+                json.dumps(job.get('raw_data', {})),
+                status,
+                analysis,
+                'fetched',
+                now,
+                job['canonical_url'] or None,
+                job['company_key'] or None,
+                job['title_simhash'],
+                cluster_id,
+            ))
+        cursor.executemany('''
+            INSERT OR IGNORE INTO jobs
+            (id, title, company, description, source_url, direct_url, location,
+             raw_data, status, analysis_result, stage, stage_updated_at,
+             canonical_url, company_key, title_simhash, cluster_id)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', rows)
+        conn.commit()
+        if duplicates:
+            logger.info(f"Quase-duplicatas agrupadas: {duplicates}")
+        return new_ids
+
+
+def find_job_by_url(url: str, exclude_id: str = None) -> str:
+    """
+    Id de outra vaga (não rejeitada) com a mesma URL canônica (fonte ou link direto).
+    
+    Returns:
+        str: id da vaga ou '' se não houver
+    """
+    key = canonical_url(url)
+    if not key:
+        return ''
+    with get_connection() as conn:
+        row = conn.execute('''
+            SELECT id FROM jobs
+            WHERE (canonical_url = ? OR direct_url = ?) AND id != ?
+              AND (status != 'rejected' OR analyzed_at IS NOT NULL)
+            LIMIT 1
+        ''', (key, key, exclude_id or '')).fetchone()
+    return row['id'] if row else ''
+
+
+def get_jobs_at_stage(stage: str, limit: int = 200, status: str = None,
+                      newest_first: bool = False, unposted: bool = False) -> list:
+    """
+    Vagas paradas em um estágio (exceto rejeitadas).
+    
+    Args:
+        status: só vagas com esse status
+        newest_first: mais recentes primeiro (padrão: mais antigas)
+        unposted: ignora vagas já postadas em algum canal
+    """
+    where = ['stage = ?']
+    params = [stage]
+    if status:
+        where.append('status = ?')
+        params.append(status)
+    else:
+        where.append("status != 'rejected'")
+    if unposted:
+        where.append('NOT EXISTS (SELECT 1 FROM posted_jobs p WHERE p.job_id = jobs.id)')
+    order = 'DESC' if newest_first else 'ASC'
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f'''
+            SELECT * FROM jobs WHERE {' AND '.join(where)}
+            ORDER BY discovered_at {order} LIMIT ?
+        ''', params + [limit])
+        return [dict(row) for row in cursor.fetchall()]
+
+
+def advance_jobs(stage: str, updates: list, owner: str = None, hold: bool = False,
+                 lease_seconds: float = 0, from_stage: str = None) -> int:
+    """
+    Move vagas para `stage`, gravando os campos alterados pelo estágio.
+    
+    Args:
+        stage: estágio de destino
+        updates: lista de (job_id, {coluna: valor}) — colunas em STAGE_COLUMNS
+        owner: lease de quem processou (claim_jobs); só grava vagas que ainda
+            estão com esse lease — se venceu e outro processo pegou (ou já
+            avançou) a vaga, a escrita atrasada é descartada
+        hold: mantém o lease por mais `lease_seconds` (a vaga segue no fluxo
+            do mesmo processo); senão libera
+        from_stage: estágio em que a vaga foi pega; com `owner`, só grava se
+            ela ainda estiver nele
+    
+    Returns:
+        vagas gravadas
+    """
+    if not updates:
+        return 0
+    now = datetime.now().isoformat()
+    lease_sets, lease_where, lease = '', '', []
+    if owner:
+        lease_sets = ', claimed_by = ?, lease_expires_at = ?'
+        lease_where = ' AND claimed_by = ?' + (' AND stage = ?' if from_stage else '')
+        lease = [owner, time.time() + lease_seconds] if hold else [None, None]
+    guard = ([owner] + ([from_stage] if from_stage else [])) if owner else []
+    saved = 0
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        for job_id, fields in updates:
+            fields = {k: v for k, v in (fields or {}).items() if k in STAGE_COLUMNS}
+            sets = ''.join(f'{k} = ?, ' for k in fields)
+            cursor.execute(
+                f'UPDATE jobs SET {sets}stage = ?, stage_updated_at = ?{lease_sets} WHERE id = ?{lease_where}',
+                list(fields.values()) + [stage, now] + lease + [job_id] + guard,
+            )
+            saved += cursor.rowcount
+        conn.commit()
+    if saved < len(updates):
+        logger.warning(f"{len(updates) - saved} vagas não gravadas em '{stage}': lease com outro processo")
+    return saved
+
+
+def reject_jobs(rejections: list, owner: str = None, from_stage: str = None) -> int:
+    """
+    Rejeita vagas em qualquer estágio (ficam paradas onde foram rejeitadas).
+    
+    Args:
+        rejections: lista de (job_id, motivo)
+        owner, from_stage: como em advance_jobs (libera o lease)
+    """
+    if not rejections:
+        return 0
+    now = datetime.now().isoformat()
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        if owner:
+            # só as vagas que ainda são deste processo
+            stage_where = ' AND stage = ?' if from_stage else ''
+            rejections = [(job_id, reason) for job_id, reason in rejections if cursor.execute(
+                f'UPDATE jobs SET claimed_by = NULL, lease_expires_at = NULL'
+                f' WHERE id = ? AND claimed_by = ?{stage_where}',
+                [job_id, owner] + ([from_stage] if from_stage else []),
+            ).rowcount]
+        cursor.executemany('''
+            UPDATE jobs SET status = 'rejected', analysis_result = ?, stage_updated_at = ?
+            WHERE id = ?
+        ''', [(json.dumps({'motivo_rejeicao': reason}), now, job_id) for job_id, reason in rejections])
+        cursor.executemany('DELETE FROM job_queue WHERE job_id = ?', [(job_id,) for job_id, _ in rejections])
+        conn.commit()
+        return len(rejections)
+
+
+# =============================================================================
+# LEASES DO PIPELINE (vários processos sobre os mesmos estágios)
+# =============================================================================
+
+def claim_jobs(stage: str, owner: str, limit: int, lease_seconds: float,
+               newest_first: bool = False) -> list:
+    """
+    Pega até `limit` vagas paradas em `stage` (exceto rejeitadas) livres ou com
+    lease vencido (processo que caiu), numa transação só: dois processos nunca
+    recebem a mesma vaga.
+
+    Returns:
+        linhas das vagas, na ordem de get_jobs_at_stage
+    """
+    now = time.time()
+    order = 'DESC' if newest_first else 'ASC'
+    with get_connection() as conn:
+        conn.execute('BEGIN IMMEDIATE')
+        reclaimed = conn.execute('''
+            SELECT COUNT(*) FROM jobs
+            WHERE stage = ? AND status != 'rejected' AND claimed_by IS NOT NULL AND lease_expires_at < ?
+        ''', (stage, now)).fetchone()[0]
+        rows = conn.execute(f'''
+            UPDATE jobs SET claimed_by = ?, lease_expires_at = ?
+            WHERE id IN (
+                SELECT id FROM jobs
+                WHERE stage = ? AND status != 'rejected'
+                  AND (claimed_by IS NULL OR lease_expires_at < ?)
+                ORDER BY discovered_at {order} LIMIT ?
+            )
+            RETURNING *
+        ''', (owner, now + lease_seconds, stage, now, limit)).fetchall()
+        conn.commit()
+    if reclaimed:
+        logger.info(f"[{stage}] {reclaimed} vagas com lease vencido retomadas")
+    return sorted(rows, key=lambda r: r['discovered_at'] or '', reverse=newest_first)
+
+
+def lease_jobs(job_ids: list, owner: str, lease_seconds: float) -> list:
+    """Pega vagas específicas (ex: recém-coletadas) se estiverem livres; retorna os ids obtidos"""
+    if not job_ids:
+        return []
+    now = time.time()
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        leased = [job_id for job_id in job_ids if cursor.execute('''
+            UPDATE jobs SET claimed_by = ?, lease_expires_at = ?
+            WHERE id = ? AND (claimed_by IS NULL OR claimed_by = ? OR lease_expires_at < ?)
+        ''', (owner, now + lease_seconds, job_id, owner, now)).rowcount]
+        conn.commit()
+        return leased
+
+
+def renew_leases(owner: str, lease_seconds: float) -> int:
+    """Estende todos os leases do processo (heartbeat)"""
+    with get_connection() as conn:
+        cursor = conn.execute('UPDATE jobs SET lease_expires_at = ? WHERE claimed_by = ?',
+                              (time.time() + lease_seconds, owner))
+        conn.commit()
+        return cursor.rowcount
+
+
+def release_jobs(owner: str) -> int:
+    """Devolve as vagas do processo que não terminaram (ficam para a próxima execução)"""
+    with get_connection() as conn:
+        cursor = conn.execute('UPDATE jobs SET claimed_by = NULL, lease_expires_at = NULL WHERE claimed_by = ?',
+                              (owner,))
+        conn.commit()
+        return cursor.rowcount
+
+
+def get_lease_counts() -> dict:
+    """{estágio: {'active': n, 'expired': n}} das vagas com lease"""
+    now = time.time()
+    with get_connection() as conn:
+        rows = conn.execute('''
+            SELECT stage, SUM(lease_expires_at >= ?) AS active, SUM(lease_expires_at < ?) AS expired
+            FROM jobs WHERE claimed_by IS NOT NULL GROUP BY stage
+        ''', (now, now)).fetchall()
+    return {row['stage']: {'active': row['active'], 'expired': row['expired']} for row in rows}
+
+
+def get_stage_counts() -> dict:
+    """{estágio: {status: n}} das vagas do pipeline"""
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT stage, status, COUNT(*) AS n FROM jobs
+            WHERE stage IS NOT NULL GROUP BY stage, status
+        ''')
+        counts = {}
+        for row in cursor.fetchall():
+            counts.setdefault(row['stage'], {})[row['status']] = row['n']
+        return counts
+
+
+# =============================================================================
+# AGENDADOR
+# =============================================================================
+
+def get_scheduler_runs() -> dict:
+    """{job: última execução} do agendador"""
+    with get_connection() as conn:
+        rows = conn.execute('SELECT * FROM scheduler_runs').fetchall()
+    return {row['job']: dict(row) for row in rows}
+
+
+def save_scheduler_run(job: str, started_at: str, finished_at: str = None, status: str = 'running',
+                       error: str = None, seconds: float = None, stats: dict = None):
+    """Grava início (status 'running') ou fim ('ok'/'error') de uma execução"""
+    with get_connection() as conn:
+        conn.execute('''
+            INSERT INTO scheduler_runs (job, last_started, last_finished, last_status, last_error,
+                                        last_seconds, last_stats, runs)
+            VALUES (?, ?, ?, ?, ?, ?, ?, 0)
+            ON CONFLICT(job) DO UPDATE SET
+                last_started = excluded.last_started,
+                last_finished = excluded.last_finished,
+                last_status = excluded.last_status,
+                last_error = excluded.last_error,
+                last_seconds = excluded.last_seconds,
+                last_stats = excluded.last_stats,
+                runs = runs + (excluded.last_status != 'running')
+        ''', (job, started_at, finished_at, status, error, seconds,
+              json.dumps(stats, default=str) if stats is not None else None))
+        conn.commit()
 
 
 # Inicializa o banco ao importar
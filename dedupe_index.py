@@ -0,0 +1,275 @@
+"""
+Job Curator Bot - Dedupe Index
+Índice único de "já postado / já no pool" em jobs.db (tabela dedupe_index),
+no lugar dos arquivos lidos inteiros a cada execução:
+posted_urls.txt, posted_companies.txt, telegram_posts.txt e batch_pool.json.
+
+- kind 'url' / 'company': postados (o estágio enrich rejeita)
+- kind 'queued': links que só entraram no pool/posts (weekly_collect.sh não
+  repete no pool; não bloqueiam o enrich: o post pode nunca sair)
+
+- Chaves normalizadas (job_keys): URL canônica sem esquema, empresa sem
+  acentos, pontuação e sufixos societários (Inc, LLC, GmbH...).
+- Consulta O(1) pela chave primária (kind, key).
+- Empresas expiram depois de DEDUPE_COMPANY_DAYS dias (podem voltar a ser postadas);
+  URLs não expiram.
+- Os arquivos antigos são importados uma vez e de novo só se mudarem (mtime).
+
+Uso:
+- pipeline (estágio enrich), pipeline.post_queued_jobs, weekly_collect.sh
+- Standalone: python3 dedupe_index.py [--migrate] [--url URL] [--company NOME]
+"""
+import argparse
+import json
+import os
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Iterable, List, Optional, Set
+
+import database as db
+from config import DATA_DIR
+from job_keys import company_key, url_key
+
+DEDUPE_COMPANY_DAYS = int(os.environ.get("DEDUPE_COMPANY_DAYS", "30"))
+
+# Arquivos antigos importados para o índice (kind, caminho)
+LEGACY_FILES = (
+    ("url", DATA_DIR / "posted_urls.txt"),
+    ("company", DATA_DIR / "posted_companies.txt"),
+    ("posts", DATA_DIR / "telegram_posts.txt"),
+    ("pool", DATA_DIR / "batch_pool.json"),
+)
+URL_KINDS = ("url", "queued")
+
+POST_SEPARATOR = "\n\n---\n\n"
+
+_LOCK = threading.Lock()
+
+
+def _key(kind: str, value: str) -> str:
+    return url_key(value) if kind in URL_KINDS else company_key(value)
+
+
+# =============================================================================
+# CONSULTA / REGISTRO
+# =============================================================================
+
+def _company_cutoff(days: Optional[int]) -> str:
+    days = DEDUPE_COMPANY_DAYS if days is None else days
+    return (datetime.now() - timedelta(days=days)).isoformat()
+
+
+def seen_url(url: Optional[str]) -> bool:
+    key = url_key(url)
+    if not key:
+        return False
+    with db.get_connection() as conn:
+        row = conn.execute(
+            "SELECT 1 FROM dedupe_index WHERE kind = 'url' AND key = ?", (key,)
+        ).fetchone()
+    return row is not None
+
+
+def seen_company(name: Optional[str], days: Optional[int] = None) -> bool:
+    """Empresa postada nos últimos `days` dias (padrão DEDUPE_COMPANY_DAYS)"""
+    key = company_key(name)
+    if not key:
+        return False
+    with db.get_connection() as conn:
+        row = conn.execute(
+            "SELECT 1 FROM dedupe_index WHERE kind = 'company' AND key = ? AND last_seen >= ?",
+            (key, _company_cutoff(days)),
+        ).fetchone()
+    return row is not None
+
+
+def seen_urls(urls: Iterable[str]) -> Set[str]:
+    """Das URLs dadas, as que já estão no índice (valores originais)"""
+    by_key = {}
+    for url in urls:
+        key = url_key(url)
+        if key:
+            by_key.setdefault(key, []).append(url)
+    found = set()
+    keys = list(by_key)
+    with db.get_connection() as conn:
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            marks = ",".join("?" * len(chunk))
+            for row in conn.execute(
+                f"SELECT key FROM dedupe_index WHERE kind = 'url' AND key IN ({marks})", chunk
+            ):
+                found.update(by_key[row["key"]])
+    return found
+
+
+def add(kind: str, values: Iterable[str], source: str = "",
+        seen_at: Optional[str] = None) -> List[str]:
+    """
+    Registra URLs ou empresas no índice (empresas já conhecidas renovam last_seen).
+
+    Args:
+        kind: 'url' | 'company' (postados) | 'queued' (links só enfileirados)
+        source: origem do registro (arquivo, canal, pool...)
+        seen_at: data ISO do registro (padrão: agora)
+
+    Returns:
+        valores que ainda não estavam no índice (na ordem recebida)
+    """
+    if kind not in ("url", "company", "queued"):
+        raise ValueError(f"Tipo inválido: {kind}")
+    seen_at = seen_at or datetime.now().isoformat()
+    entries = {}
+    for value in values:
+        key = _key(kind, value)
+        if key and key not in entries:
+            entries[key] = value
+    if not entries:
+        return []
+    keys = list(entries)
+    with _LOCK, db.get_connection() as conn:
+        known = set()
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            marks = ",".join("?" * len(chunk))
+            known.update(row["key"] for row in conn.execute(
+                f"SELECT key FROM dedupe_index WHERE kind = ? AND key IN ({marks})", [kind] + chunk
+            ))
+        conn.executemany('''
+            INSERT INTO dedupe_index (kind, key, value, source, first_seen, last_seen)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(kind, key) DO UPDATE SET
+                last_seen = MAX(last_seen, excluded.last_seen)
+        ''', [(kind, key, value, source, seen_at, seen_at) for key, value in entries.items()])
+        conn.commit()
+    return [value for key, value in entries.items() if key not in known]
+
+
+def add_job(job: dict, source: str = "") -> bool:
+    """Registra link e empresa de uma vaga postada. True se o link era novo."""
+    return bool(add_jobs([job], source))
+
+
+def add_jobs(jobs: Iterable[dict], source: str = "") -> List[str]:
+    """Registra links e empresas de várias vagas postadas. Retorna os links novos."""
+    jobs = list(jobs)
+    urls = [job.get("direct_url") or job.get("source_url") for job in jobs]
+    new = add("url", [u for u in urls if u], source)
+    add("company", [job["company"] for job in jobs if job.get("company")], source)
+    return new
+
+
+def expire() -> int:
+    """Remove empresas fora da janela de DEDUPE_COMPANY_DAYS"""
+    with _LOCK, db.get_connection() as conn:
+        cursor = conn.execute(
+            "DELETE FROM dedupe_index WHERE kind = 'company' AND last_seen < ?",
+            (_company_cutoff(None),),
+        )
+        conn.commit()
+        return cursor.rowcount
+
+
+def stats() -> dict:
+    with db.get_connection() as conn:
+        rows = conn.execute("SELECT kind, COUNT(*) AS n FROM dedupe_index GROUP BY kind").fetchall()
+    return {row["kind"]: row["n"] for row in rows}
+
+
+# =============================================================================
+# MIGRAÇÃO DOS ARQUIVOS ANTIGOS
+# =============================================================================
+
+def post_links(text: str) -> List[str]:
+    """Links 'APLICAR:' de um arquivo de posts (telegram_posts.txt)"""
+    links = []
+    for block in text.split(POST_SEPARATOR):
+        for line in block.splitlines():
+            if line.startswith("APLICAR:"):
+                links.append(line.replace("APLICAR:", "").strip())
+                break
+    return links
+
+
+def _read_legacy(kind: str, path: Path) -> dict:
+    """{'url': [...], 'company': [...]} de um arquivo de postados; {'queued': [...]} do pool/posts"""
+    text = path.read_text(errors="ignore")
+    if kind in ("url", "company"):
+        return {kind: [line.strip() for line in text.splitlines() if line.strip()]}
+    if kind == "posts":
+        return {"queued": post_links(text)}
+    try:
+        items = json.loads(text or "{}").get("items") or []
+    except (ValueError, AttributeError):
+        items = []
+    return {"queued": [i.get("direct_url") for i in items if isinstance(i, dict) and i.get("direct_url")]}
+
+
+def migrate_legacy(files=LEGACY_FILES, force: bool = False) -> int:
+    """
+    Importa os arquivos antigos (uma vez por versão do arquivo, pelo mtime).
+    A data do registro é o mtime do arquivo, então empresas antigas expiram normalmente.
+
+    Returns:
+        registros novos no índice
+    """
+    added = 0
+    for kind, path in files:
+        path = Path(path)
+        if not path.exists():
+            continue
+        mtime = str(path.stat().st_mtime)
+        with db.get_connection() as conn:
+            row = conn.execute(
+                "SELECT value FROM dedupe_index WHERE kind = 'file' AND key = ?", (str(path),)
+            ).fetchone()
+        if row and row["value"] == mtime and not force:
+            continue
+        seen_at = datetime.fromtimestamp(path.stat().st_mtime).isoformat()
+        for value_kind, values in _read_legacy(kind, path).items():
+            added += len(add(value_kind, values, source=path.name, seen_at=seen_at))
+        mark_imported([path])
+    return added
+
+
+def mark_imported(paths: Iterable[Path]) -> None:
+    """
+    Marca a versão atual dos arquivos como já importada (sem ler o conteúdo).
+    Para quem acabou de gravar no arquivo o que já registrou no índice.
+    """
+    now = datetime.now().isoformat()
+    rows = []
+    for path in map(Path, paths):
+        if path.exists():
+            mtime = path.stat().st_mtime
+            rows.append((str(path), str(mtime), path.name, datetime.fromtimestamp(mtime).isoformat(), now))
+    if not rows:
+        return
+    with _LOCK, db.get_connection() as conn:
+        conn.executemany('''
+            INSERT OR REPLACE INTO dedupe_index (kind, key, value, source, first_seen, last_seen)
+            VALUES ('file', ?, ?, ?, ?, ?)
+        ''', rows)
+        conn.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Índice de dedupe (links e empresas já postados)")
+    parser.add_argument("--migrate", action="store_true", help="importa os arquivos antigos de histórico")
+    parser.add_argument("--force", action="store_true", help="reimporta mesmo sem mudança nos arquivos")
+    parser.add_argument("--url", help="confere se um link já foi postado")
+    parser.add_argument("--company", help="confere se uma empresa foi postada recentemente")
+    args = parser.parse_args()
+    if args.migrate:
+        print(f"Importados: {migrate_legacy(force=args.force)}")
+        print(f"Empresas expiradas removidas: {expire()}")
+    if args.url:
+        print(f"{args.url}: {'já postado' if seen_url(args.url) else 'novo'} ({url_key(args.url)})")
+    if args.company:
+        print(f"{args.company}: {'recente' if seen_company(args.company) else 'livre'} ({company_key(args.company)})")
+    print(f"Índice: {stats()}")
+
+
+if __name__ == "__main__":
+    main()
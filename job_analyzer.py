@@ -225,7 +225,7 @@ def analyze_job(job: dict, client=None) -> Optional[dict]:
                     'job_id': job.get('id'),
                     'analyzed': False,
                     'aprovada': False,
-                    'motivo_rejeicao': f'Akira-Pipe Error: {error_output.get('error', 'Unknown')}'
+                    'motivo_rejeicao': f'Akira-Pipe Error: {error_output.get("error", "Unknown")}'
                 }
             except json.JSONDecodeError:
                 return {
@@ -243,7 +243,7 @@ def analyze_job(job: dict, client=None) -> Optional[dict]:
                 'job_id': job.get('id'),
                 'analyzed': False,
                 'aprovada': False,
-                'motivo_rejeicao': f'Akira-Pipe Failed: {pipeline_result.get('error', 'Unknown')}'
+                'motivo_rejeicao': f'Akira-Pipe Failed: {pipeline_result.get("error", "Unknown")}'
             }
         
         result = pipeline_result.get('result')
@@ -331,7 +331,7 @@ def batch_analyze_jobs_single_call(jobs: list, client=None) -> list:
                     'job_id': job.get('id'),
                     'analyzed': False,
                     'aprovada': False,
-                    'motivo_rejeicao': f'Akira-Pipe Batch Error: {error_output.get('error', 'Unknown')}'
+                    'motivo_rejeicao': f'Akira-Pipe Batch Error: {error_output.get("error", "Unknown")}'
                 } for job in jobs] # Retorna erro para todas as vagas no batch
             except json.JSONDecodeError:
                 return [{
@@ -349,7 +349,7 @@ def batch_analyze_jobs_single_call(jobs: list, client=None) -> list:
                 'job_id': job.get('id'),
                 'analyzed': False,
                 'aprovada': False,
-                'motivo_rejeicao': f'Akira-Pipe Batch Failed: {pipeline_result.get('error', 'Unknown')}'
+                'motivo_rejeicao': f'Akira-Pipe Batch Failed: {pipeline_result.get("error", "Unknown")}'
             } for job in jobs]
 
         results = pipeline_result.get('result')
@@ -0,0 +1,198 @@
+"""
+Job Curator Bot - Chaves de vaga
+Identidade de uma vaga independente da fonte por onde ela chegou:
+- canonical_url: URL canônica (ATS em forma única, sem parâmetros de rastreio)
+- company_key: nome da empresa normalizado
+- title_simhash: SimHash de 64 bits do título, para agrupar quase-duplicatas
+  ("Senior Backend Engineer (Remote)" ≈ "Senior Backend Engineer - Remote")
+- stable_id: id da vaga (BLAKE2b de 64 bits da URL canônica), igual em toda
+  execução e em toda fonte; hash() do Python muda a cada processo
+
+Sem dependências do banco: usado por database.py, dedupe_index.py e pipeline.py.
+"""
+import hashlib
+import re
+import unicodedata
+from typing import Iterable, List, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# Parâmetros de rastreio/origem removidos da URL: nomes exatos ("ref" sai,
+# "reference"/"refId" ficam: identificam a vaga) e prefixos (só utm_*)
+TRACKING_PARAMS = frozenset({
+    "gh_src", "ref", "source", "src", "lever-source", "lever-origin", "lever-via",
+    "trk", "referrer", "fbclid", "gclid", "mc_cid", "mc_eid",
+})
+TRACKING_PREFIXES = ("utm_",)
+
+COMPANY_SUFFIXES = {
+    "inc", "llc", "ltd", "limited", "gmbh", "corp", "corporation", "co", "company",
+    "sa", "ag", "bv", "plc", "srl", "ltda", "pty", "oy", "ab", "as",
+}
+
+# Palavras que não distinguem uma vaga de outra no título
+TITLE_STOPWORDS = {
+    "remote", "remoto", "worldwide", "anywhere", "global", "fully", "100",
+    "the", "a", "an", "of", "and", "for", "to", "in", "at", "with",
+    "m", "f", "d", "w", "x", "h",
+}
+
+SIMHASH_BITS = 64
+
+
+# =============================================================================
+# URL
+# =============================================================================
+
+def _ats_path(host: str, path: str, query: dict) -> Optional[tuple]:
+    """(host, path, query) canônicos para URLs de ATS conhecidas, ou None"""
+    parts = [p for p in path.split("/") if p]
+
+    if host.endswith("greenhouse.io"):
+        # job-boards.greenhouse.io / boards.eu.greenhouse.io / embed → boards.greenhouse.io/{slug}/jobs/{id}
+        if parts[:2] == ["embed", "job_app"] and query.get("for") and query.get("token"):
+            return "boards.greenhouse.io", f"/{query['for'].lower()}/jobs/{query['token']}", {}
+        if len(parts) >= 3 and parts[1] == "jobs" and parts[2].isdigit():
+            return "boards.greenhouse.io", f"/{parts[0].lower()}/jobs/{parts[2]}", {}
+        if len(parts) == 1 and parts[0] != "embed":
+            return "boards.greenhouse.io", f"/{parts[0].lower()}", {}
+        return None
+
+    if host in ("jobs.lever.co", "jobs.eu.lever.co"):
+        # /{slug}/{uuid}/apply → /{slug}/{uuid}
+        if len(parts) >= 2:
+            return host, f"/{parts[0].lower()}/{parts[1].lower()}", {}
+        return None
+
+    if host == "jobs.ashbyhq.com":
+        # /{slug}/{uuid}/application → /{slug}/{uuid}
+        if len(parts) >= 2:
+            return host, f"/{parts[0].lower()}/{parts[1].lower()}", {}
+        return None
+
+    if host == "apply.workable.com":
+        # /{slug}/j/{id}/apply → /{slug}/j/{id}
+        if len(parts) >= 3 and parts[1] == "j":
+            return host, f"/{parts[0].lower()}/j/{parts[2].upper()}", {}
+        return None
+
+    if host.endswith(".recruitee.com") and "o" in parts:
+        # /o/{vaga}/c/new → /o/{vaga}
+        i = parts.index("o")
+        if len(parts) > i + 1:
+            return host, f"/o/{parts[i + 1].lower()}", {}
+
+    return None
+
+
+def _is_tracking(key: str) -> bool:
+    """'utm_source', 'ref', 'lever-source[]' → True; 'reference', 'sourceId' → False"""
+    key = key.lower()
+    if key.endswith("[]"):
+        key = key[:-2]
+    return key in TRACKING_PARAMS or key.startswith(TRACKING_PREFIXES)
+
+
+def canonical_url(url: Optional[str]) -> str:
+    """
+    Forma canônica de uma URL de vaga (https, host minúsculo sem www, sem fragmento,
+    sem barra final e sem parâmetros de rastreio; ATS conhecidos em forma única).
+
+    Ex: https://job-boards.greenhouse.io/Acme/jobs/123?gh_src=x → https://boards.greenhouse.io/acme/jobs/123
+        https://jobs.lever.co/acme/abc-123/apply → https://jobs.lever.co/acme/abc-123
+    """
+    url = (url or "").strip()
+    if not url:
+        return ""
+    if "://" not in url:
+        url = "https://" + url
+    try:
+        parts = urlsplit(url)
+    except ValueError:
+        return url
+    host = (parts.hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    if not host:
+        return url
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if not _is_tracking(k)]
+    path = re.sub(r"/{2,}", "/", parts.path).rstrip("/")
+
+    ats = _ats_path(host, path, dict(query))
+    if ats:
+        host, path, query = ats[0], ats[1], sorted(ats[2].items())
+    else:
+        query = sorted(query)
+    return urlunsplit(("https", host, path, urlencode(query), ""))
+
+
+def url_key(url: Optional[str]) -> str:
+    """URL canônica sem o esquema (chave de dedupe)"""
+    return canonical_url(url).split("://", 1)[-1]
+
+
+def looks_like_url(value: Optional[str]) -> bool:
+    return bool(re.match(r"^(https?://|www\.)", (value or "").strip(), re.IGNORECASE))
+
+
+def stable_id(value: Optional[str]) -> str:
+    """
+    Id de vaga determinístico e compacto: BLAKE2b de 64 bits (16 hex) da URL canônica.
+    Valores que não são URL (ex: 'remoteok:123') entram como estão.
+    """
+    value = (value or "").strip()
+    key = canonical_url(value) if looks_like_url(value) else value
+    return hashlib.blake2b(key.encode(), digest_size=8).hexdigest()
+
+
+# =============================================================================
+# EMPRESA / TÍTULO
+# =============================================================================
+
+def _ascii_words(text: Optional[str]) -> List[str]:
+    text = unicodedata.normalize("NFKD", text or "").encode("ascii", "ignore").decode()
+    return re.sub(r"[^a-z0-9]+", " ", text.lower()).split()
+
+
+def company_key(name: Optional[str]) -> str:
+    """'Acme, Inc.' / 'ACME Inc' / 'Ácme' → 'acme'"""
+    words = _ascii_words(name)
+    while len(words) > 1 and words[-1] in COMPANY_SUFFIXES:
+        words.pop()
+    return " ".join(words)
+
+
+def title_tokens(title: Optional[str]) -> List[str]:
+    """Palavras e pares de palavras do título (sem termos genéricos como 'remote')"""
+    words = [w for w in _ascii_words(title) if w not in TITLE_STOPWORDS]
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+def _hash64(token: str) -> int:
+    return int.from_bytes(hashlib.blake2b(token.encode(), digest_size=8).digest(), "big")
+
+
+def simhash(tokens: Iterable[str]) -> int:
+    """SimHash de 64 bits (determinístico entre processos)"""
+    weights = [0] * SIMHASH_BITS
+    for token in tokens:
+        h = _hash64(token)
+        for bit in range(SIMHASH_BITS):
+            weights[bit] += 1 if (h >> bit) & 1 else -1
+    value = 0
+    for bit, weight in enumerate(weights):
+        if weight > 0:
+            value |= 1 << bit
+    return value
+
+
+def title_simhash(title: Optional[str]) -> Optional[int]:
+    """SimHash do título como inteiro com sinal (cabe em INTEGER do SQLite)"""
+    tokens = title_tokens(title)
+    if not tokens:
+        return None
+    value = simhash(tokens)
+    return value - (1 << SIMHASH_BITS) if value >= 1 << (SIMHASH_BITS - 1) else value
+
+
+def hamming(a: int, b: int) -> int:
+    return bin((a ^ b) & ((1 << SIMHASH_BITS) - 1)).count("1")
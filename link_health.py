@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Job Curator Bot - Link Health
+Varre periodicamente os links das vagas na fila e das postadas recentemente,
+grava last_checked/last_status e tira da fila as vagas encerradas.
+
+O posting só lê o estado pré-calculado; nenhuma checagem de rede acontece
+no caminho crítico da postagem.
+
+Uso:
+- Via app.py (job link_health do scheduler.py, a cada LINK_HEALTH_INTERVAL_HOURS)
+- Standalone: python3 link_health.py
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from config import (
+    LINK_HEALTH_STALE_HOURS,
+    LINK_HEALTH_POSTED_DAYS,
+    LINK_HEALTH_WORKERS,
+    LINK_HEALTH_BATCH,
+)
+import database as db
+from link_resolver import check_url_health
+
+logger = logging.getLogger(__name__)
+
+
+def sweep_link_health(limit: int = LINK_HEALTH_BATCH,
+                      max_workers: int = LINK_HEALTH_WORKERS) -> dict:
+    """
+    Executa uma varredura de links.
+    
+    As checagens rodam em paralelo, sem conexão com o banco aberta;
+    o resultado é gravado de uma vez no final.
+    
+    Returns:
+        dict: {checked, alive, dead, error, removed_from_queue}
+    """
+    jobs = db.get_jobs_for_link_check(
+        stale_hours=LINK_HEALTH_STALE_HOURS,
+        posted_days=LINK_HEALTH_POSTED_DAYS,
+        limit=limit,
+    )
+    stats = {'checked': 0, 'alive': 0, 'dead': 0, 'error': 0, 'removed_from_queue': 0}
+    if not jobs:
+        logger.info("Link health: nenhum link para verificar")
+        return stats
+    
+    logger.info(f"Link health: verificando {len(jobs)} links ({max_workers} em paralelo)")
+    
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        statuses = list(pool.map(lambda j: check_url_health(j['direct_url']), jobs))
+    
+    results = []
+    for job, status in zip(jobs, statuses):
+        results.append((job['id'], status))
+        stats[status] += 1
+        if status == 'dead':
+            logger.warning(f"  ❌ Link morto: {(job.get('title') or 'N/A')[:40]}")
+    
+    stats['checked'] = len(results)
+    stats['removed_from_queue'] = db.update_link_health(results)
+    logger.info(
+        f"Link health: {stats['alive']} ok, {stats['dead']} mortos, "
+        f"{stats['error']} erros, {stats['removed_from_queue']} removidos da fila"
+    )
+    return stats
+
+
+def main():
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s [%(levelname)s] %(name)s: %(message)s',
+        datefmt='%Y-%m-%d %H:%M:%S'
+    )
+    sweep_link_health()
+
+
+if __name__ == "__main__":
+    main()
@@ -206,6 +206,60 @@ def verify_url_is_active(url: str) -> bool:
             return False
 
 
+def _looks_closed(original_url: str, final_url: str) -> bool:
+    """Detecta redirects típicos de vaga encerrada nos ATS (voltam para o board)"""
+    final = (final_url or '').lower()
+    if 'greenhouse.io' in final and 'error=true' in final:
+        return True
+    if 'lever.co' in final:
+        orig_parts = [p for p in urlparse(original_url.lower()).path.split('/') if p]
+        final_parts = [p for p in urlparse(final).path.split('/') if p]
+        # jobs.lever.co/empresa/<id> → jobs.lever.co/empresa
+        if len(orig_parts) >= 2 and len(final_parts) < 2:
+            return True
+    return False
+
+
+def check_url_health(url: str) -> str:
+    """
+    Verifica o estado de um link de vaga.
+    
+    Returns:
+        str: 'alive' (ativo), 'dead' (404/410 ou vaga encerrada) ou
+             'error' (falha transitória ou inconclusiva: timeout, 5xx, 429,
+             401/403 de proteção anti-bot e outros 4xx)
+    """
+    try:
+        response = requests.head(
+            url,
+            headers=HEADERS,
+            timeout=REQUEST_TIMEOUT,
+            allow_redirects=True
+        )
+        # Alguns ATS não suportam HEAD
+        if response.status_code in (403, 405):
+            response = requests.get(
+                url,
+                headers=HEADERS,
+                timeout=REQUEST_TIMEOUT,
+                allow_redirects=True,
+                stream=True
+            )
+            response.close()
+    except requests.exceptions.RequestException as e:
+        logger.debug(f"Erro ao verificar {url}: {e}")
+        return 'error'
+    
+    if response.status_code in (404, 410):
+        return 'dead'
+    if response.status_code >= 400:
+        # 401/403 (páginas com proteção anti-bot), 429, 5xx: não dá para saber se fechou
+        return 'error'
+    if _looks_closed(url, response.url):
+        return 'dead'
+    return 'alive'
+
+
 def resolve_direct_url(source_url: str) -> Tuple[Optional[str], str]:
     """
     Resolve uma URL de agregador para o link direto da empresa.
@@ -0,0 +1,551 @@
+"""
+Vagas Remotas - Member Store
+Membros pagantes e convites do canal PAGO em SQLite (data/paid_access.db), no
+lugar de paid_members.json / paid_invites.json lidos e regravados inteiros a
+cada webhook.
+
+- Consulta por email, telegram_id ou payment_id pelos índices (O(1) com qualquer
+  número de assinantes).
+- Leitura-alteração-escrita numa transação (BEGIN IMMEDIATE): webhooks
+  simultâneos não perdem atualizações. WAL: leituras não esperam escritas.
+- Os JSON antigos são importados uma vez (PRAGMA user_version) e ficam como backup.
+- Pool de convites criados antes da compra: o webhook só pega um link livre.
+- Fila durável de tarefas dos webhooks (tasks): convite/cancelamento são
+  gravados e o webhook responde na hora; um worker executa depois. Uma tarefa
+  por (tipo, payment_id): reenvio do mesmo evento não duplica.
+
+Uso:
+- paid_access_bot.py
+- Standalone: python3 member_store.py [--migrate] [--member EMAIL]
+"""
+import argparse
+import json
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+
+DATA_DIR = Path(os.environ.get("DATA_DIR", Path(__file__).parent / "data"))
+STORE_PATH = Path(os.environ.get("PAID_ACCESS_DB", DATA_DIR / "paid_access.db"))
+LEGACY_MEMBERS = DATA_DIR / "paid_members.json"
+LEGACY_INVITES = DATA_DIR / "paid_invites.json"
+
+# Versão do esquema (PRAGMA user_version); 1 = JSON antigos importados
+SCHEMA_VERSION = 1
+
+# Campos de paid_members.json
+LEGACY_FIELDS = (
+    "email", "telegram_id", "payment_id", "platform", "status",
+    "joined_at", "expires_at", "linked_at", "cancelled_at",
+)
+MEMBER_FIELDS = LEGACY_FIELDS + ("removed_at", "kick_attempts", "kick_error")
+
+_initialized = set()
+
+
+@contextmanager
+def get_connection():
+    """Conexão com o store (cria o esquema e importa os JSON na primeira vez)"""
+    conn = sqlite3.connect(STORE_PATH, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    # WAL + NORMAL: commit sem fsync a cada transação (só uma queda de energia perde as últimas)
+    conn.execute("PRAGMA synchronous=NORMAL")
+    try:
+        if str(STORE_PATH) not in _initialized:
+            init_store(conn)
+            _initialized.add(str(STORE_PATH))
+        yield conn
+    finally:
+        conn.close()
+
+
+@contextmanager
+def transaction():
+    """Conexão com BEGIN IMMEDIATE: um escritor por vez, commit no fim ou rollback"""
+    with get_connection() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+
+def init_store(conn: sqlite3.Connection):
+    """Cria tabelas e índices; importa paid_members.json / paid_invites.json uma vez"""
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript('''
+        CREATE TABLE IF NOT EXISTS members (
+            email_key TEXT PRIMARY KEY,
+            email TEXT NOT NULL,
+            telegram_id INTEGER,
+            payment_id TEXT,
+            platform TEXT,
+            status TEXT DEFAULT 'active',
+            joined_at TIMESTAMP,
+            expires_at TIMESTAMP,
+            linked_at TIMESTAMP,
+            cancelled_at TIMESTAMP,
+            removed_at TIMESTAMP,
+            kick_attempts INTEGER DEFAULT 0,
+            kick_error TEXT
+        );
+        CREATE TABLE IF NOT EXISTS invites (
+            invite_link TEXT PRIMARY KEY,
+            email_key TEXT,
+            payment_id TEXT,
+            created_at TIMESTAMP,
+            used INTEGER DEFAULT 0,
+            expires_at REAL,
+            claimed_at TIMESTAMP
+        );
+        CREATE TABLE IF NOT EXISTS tasks (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT NOT NULL,
+            payment_id TEXT NOT NULL,
+            payload TEXT,
+            status TEXT DEFAULT 'pending',
+            attempts INTEGER DEFAULT 0,
+            last_error TEXT,
+            result TEXT,
+            next_attempt_at REAL,
+            created_at TIMESTAMP,
+            updated_at TIMESTAMP,
+            UNIQUE (kind, payment_id)
+        );
+        CREATE TABLE IF NOT EXISTS reconcile_runs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            started_at TIMESTAMP,
+            finished_at TIMESTAMP,
+            status TEXT,
+            report TEXT
+        );
+    ''')
+    # Remoção do grupo (reconcile_members): stores criados antes dessas colunas
+    _ensure_columns(conn, "members", {
+        "removed_at": "TIMESTAMP",
+        "kick_attempts": "INTEGER DEFAULT 0",
+        "kick_error": "TEXT",
+    })
+    # Pool de convites: link sem dono (email_key NULL) até ser pego numa compra
+    _ensure_columns(conn, "invites", {
+        "expires_at": "REAL",
+        "claimed_at": "TIMESTAMP",
+    })
+    conn.executescript('''
+        CREATE INDEX IF NOT EXISTS idx_members_telegram ON members(telegram_id);
+        CREATE INDEX IF NOT EXISTS idx_members_payment ON members(payment_id);
+        CREATE INDEX IF NOT EXISTS idx_invites_email ON invites(email_key);
+        CREATE INDEX IF NOT EXISTS idx_invites_payment ON invites(payment_id);
+        CREATE INDEX IF NOT EXISTS idx_invites_pool ON invites(expires_at) WHERE email_key IS NULL;
+        CREATE INDEX IF NOT EXISTS idx_tasks_pending ON tasks(status, next_attempt_at);
+        -- só quem ainda está no grupo: a reconciliação não lê os já removidos
+        CREATE INDEX IF NOT EXISTS idx_members_expiry ON members(status, expires_at) WHERE removed_at IS NULL;
+        CREATE INDEX IF NOT EXISTS idx_members_to_remove ON members(status, email_key) WHERE removed_at IS NULL;
+    ''')
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        if conn.execute("PRAGMA user_version").fetchone()[0] < 1:
+            _import_legacy(conn)
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def _ensure_columns(conn: sqlite3.Connection, table: str, columns: dict):
+    """Adiciona colunas que ainda não existem (migração simples, idempotente)"""
+    existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+    for name, ddl in columns.items():
+        if name not in existing:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {ddl}")
+
+
+def _read_json(path: Path) -> dict:
+    try:
+        data = json.loads(path.read_text())
+    except (OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def _import_legacy(conn: sqlite3.Connection):
+    """paid_members.json {email: membro} e paid_invites.json {link: convite} → tabelas"""
+    members = _read_json(LEGACY_MEMBERS)
+    conn.executemany(f'''
+        INSERT OR IGNORE INTO members (email_key, {", ".join(LEGACY_FIELDS)})
+        VALUES (?, {", ".join("?" for _ in LEGACY_FIELDS)})
+    ''', [
+        (key.lower(), *(m.get(f) if f != "email" else m.get("email") or key for f in LEGACY_FIELDS))
+        for key, m in members.items() if isinstance(m, dict)
+    ])
+    invites = _read_json(LEGACY_INVITES)
+    conn.executemany('''
+        INSERT OR IGNORE INTO invites (invite_link, email_key, payment_id, created_at, used)
+        VALUES (?, ?, ?, ?, ?)
+    ''', [
+        (link, (i.get("email") or "").lower(), i.get("payment_id"), i.get("created_at"), int(bool(i.get("used"))))
+        for link, i in invites.items() if isinstance(i, dict)
+    ])
+    if members or invites:
+        print(f"📦 Importados {len(members)} membros e {len(invites)} convites dos JSON antigos")
+
+
+def _member(row: Optional[sqlite3.Row]) -> Optional[dict]:
+    return {f: row[f] for f in MEMBER_FIELDS} if row else None
+
+
+# =============================================================================
+# MEMBROS
+# =============================================================================
+
+def get_member(email: str = None, telegram_id: int = None, payment_id: str = None) -> Optional[dict]:
+    """Membro pelo email, telegram_id ou payment_id (o primeiro informado)"""
+    if email:
+        where, value = "email_key = ?", email.lower()
+    elif telegram_id:
+        where, value = "telegram_id = ?", telegram_id
+    elif payment_id:
+        where, value = "payment_id = ?", payment_id
+    else:
+        return None
+    with get_connection() as conn:
+        row = conn.execute(f"SELECT * FROM members WHERE {where} LIMIT 1", (value,)).fetchone()
+    return _member(row)
+
+
+def upsert_member(email: str, telegram_id: int = None, payment_id: str = None,
+                  platform: str = "manual") -> dict:
+    """Grava membro ativo (substitui o registro anterior do mesmo email)"""
+    with transaction() as conn:
+        return _upsert_member(conn, email, telegram_id, payment_id, platform)
+
+
+def _upsert_member(conn: sqlite3.Connection, email: str, telegram_id: Optional[int],
+                   payment_id: Optional[str], platform: str) -> dict:
+    member = {
+        "email": email,
+        "telegram_id": telegram_id,
+        "payment_id": payment_id,
+        "platform": platform,
+        "status": "active",
+        "joined_at": datetime.now().isoformat(),
+        "expires_at": None,  # None = vitalício, ou data de expiração
+    }
+    conn.execute('''
+        INSERT OR REPLACE INTO members
+            (email_key, email, telegram_id, payment_id, platform, status, joined_at, expires_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ''', (email.lower(), *member.values()))
+    return member
+
+
+def cancel_member(email: str) -> Optional[dict]:
+    """
+    Marca o membro como cancelado.
+
+    Returns:
+        membro antes da alteração (com telegram_id para remover do grupo), ou None
+    """
+    with transaction() as conn:
+        row = conn.execute("SELECT * FROM members WHERE email_key = ?", (email.lower(),)).fetchone()
+        if not row:
+            return None
+        conn.execute(
+            "UPDATE members SET status = 'cancelled', cancelled_at = ? WHERE email_key = ?",
+            (datetime.now().isoformat(), email.lower()),
+        )
+    return _member(row)
+
+
+def link_telegram(email: str, telegram_id: int) -> bool:
+    """Vincula telegram_id ao email"""
+    with transaction() as conn:
+        cursor = conn.execute(
+            "UPDATE members SET telegram_id = ?, linked_at = ? WHERE email_key = ?",
+            (telegram_id, datetime.now().isoformat(), email.lower()),
+        )
+    return cursor.rowcount > 0
+
+
+def expire_members(now: Optional[str] = None) -> int:
+    """Ativos com expires_at vencido passam a 'expired'; retorna quantos"""
+    now = now or datetime.now().isoformat()
+    with transaction() as conn:
+        cursor = conn.execute(
+            "UPDATE members SET status = 'expired' WHERE status = 'active' AND expires_at <= ? AND removed_at IS NULL",
+            (now,),
+        )
+    return cursor.rowcount
+
+
+def members_to_remove(after: str = "", limit: int = 500, max_attempts: int = 5) -> List[dict]:
+    """
+    Expirados/cancelados ainda no grupo (removed_at NULL), em ordem de email a
+    partir de `after` (paginação por chave), pelo índice parcial idx_members_to_remove.
+    """
+    with get_connection() as conn:
+        rows = conn.execute('''
+            SELECT * FROM members
+            WHERE removed_at IS NULL AND status IN ('expired', 'cancelled')
+              AND kick_attempts < ? AND email_key > ?
+            ORDER BY email_key LIMIT ?
+        ''', (max_attempts, after, limit)).fetchall()
+    return [dict(_member(row), email_key=row["email_key"]) for row in rows]
+
+
+def mark_removed(email_keys: List[str]):
+    """Membros já fora do grupo (não voltam para members_to_remove)"""
+    now = datetime.now().isoformat()
+    with transaction() as conn:
+        conn.executemany(
+            "UPDATE members SET removed_at = ?, kick_error = NULL WHERE email_key = ?",
+            [(now, key) for key in email_keys],
+        )
+
+
+def record_kick_failures(failures: dict):
+    """{email_key: erro} das remoções que falharam (tentadas de novo na próxima reconciliação)"""
+    with transaction() as conn:
+        conn.executemany(
+            "UPDATE members SET kick_attempts = kick_attempts + 1, kick_error = ? WHERE email_key = ?",
+            [(error[:500], key) for key, error in failures.items()],
+        )
+
+
+def save_reconcile_run(run_id: Optional[int], status: str, report: dict) -> int:
+    """Cria (run_id None) ou atualiza o registro de uma reconciliação; retorna o id"""
+    now = datetime.now().isoformat()
+    with transaction() as conn:
+        if run_id is None:
+            cursor = conn.execute(
+                "INSERT INTO reconcile_runs (started_at, status, report) VALUES (?, ?, ?)",
+                (now, status, json.dumps(report)),
+            )
+            return cursor.lastrowid
+        conn.execute(
+            "UPDATE reconcile_runs SET status = ?, report = ?, finished_at = ? WHERE id = ?",
+            (status, json.dumps(report), now if status != "running" else None, run_id),
+        )
+    return run_id
+
+
+def list_members() -> List[dict]:
+    with get_connection() as conn:
+        rows = conn.execute("SELECT * FROM members ORDER BY rowid").fetchall()
+    return [_member(row) for row in rows]
+
+
+def count_members(status: str = None) -> int:
+    with get_connection() as conn:
+        if status:
+            return conn.execute("SELECT COUNT(*) FROM members WHERE status = ?", (status,)).fetchone()[0]
+        return conn.execute("SELECT COUNT(*) FROM members").fetchone()[0]
+
+
+# =============================================================================
+# CONVITES
+# =============================================================================
+
+def add_invite(invite_link: str, email: str, payment_id: str = None):
+    """Registra convite pendente"""
+    with transaction() as conn:
+        conn.execute('''
+            INSERT OR REPLACE INTO invites (invite_link, email_key, payment_id, created_at, used)
+            VALUES (?, ?, ?, ?, 0)
+        ''', (invite_link, email.lower(), payment_id, datetime.now().isoformat()))
+
+
+def get_invites(email: str = None, payment_id: str = None) -> List[dict]:
+    """Convites de um email ou pagamento, do mais recente ao mais antigo"""
+    where, value = ("email_key = ?", email.lower()) if email else ("payment_id = ?", payment_id)
+    with get_connection() as conn:
+        rows = conn.execute(
+            f"SELECT * FROM invites WHERE {where} ORDER BY COALESCE(claimed_at, created_at) DESC", (value,)
+        ).fetchall()
+    return [dict(row) for row in rows]
+
+
+# =============================================================================
+# POOL DE CONVITES (criados antes da compra)
+# =============================================================================
+
+def add_pool_invites(links: List[tuple]):
+    """Links criados pelo worker do pool: [(invite_link, expira_em_unix), ...], sem dono"""
+    now = datetime.now().isoformat()
+    with transaction() as conn:
+        conn.executemany('''
+            INSERT OR IGNORE INTO invites (invite_link, email_key, created_at, used, expires_at)
+            VALUES (?, NULL, ?, 0, ?)
+        ''', [(link, now, expires_at) for link, expires_at in links])
+
+
+def pool_size(min_expires_at: float) -> int:
+    """Links livres no pool que ainda valem até `min_expires_at`"""
+    with get_connection() as conn:
+        return conn.execute(
+            "SELECT COUNT(*) FROM invites WHERE email_key IS NULL AND expires_at >= ?", (min_expires_at,)
+        ).fetchone()[0]
+
+
+def _claim_pool_invite(conn: sqlite3.Connection, email: str, payment_id: Optional[str],
+                       min_expires_at: float) -> Optional[str]:
+    row = conn.execute('''
+        UPDATE invites SET email_key = ?, payment_id = ?, claimed_at = ?
+        WHERE invite_link = (
+            SELECT invite_link FROM invites
+            WHERE email_key IS NULL AND expires_at >= ?
+            ORDER BY expires_at LIMIT 1
+        )
+        RETURNING invite_link
+    ''', (email.lower(), payment_id, datetime.now().isoformat(), min_expires_at)).fetchone()
+    return row["invite_link"] if row else None
+
+
+def claim_pool_invite(email: str, payment_id: Optional[str], min_expires_at: float) -> Optional[str]:
+    """Pega um link livre do pool para o comprador (atômico), ou None se o pool está vazio"""
+    with transaction() as conn:
+        return _claim_pool_invite(conn, email, payment_id, min_expires_at)
+
+
+def stale_pool_invites(min_expires_at: float) -> List[str]:
+    """Links livres que vencem antes de `min_expires_at` (não servem mais para um comprador)"""
+    with get_connection() as conn:
+        rows = conn.execute(
+            "SELECT invite_link FROM invites WHERE email_key IS NULL AND expires_at < ?", (min_expires_at,)
+        ).fetchall()
+    return [row["invite_link"] for row in rows]
+
+
+def delete_pool_invites(links: List[str]):
+    with transaction() as conn:
+        conn.executemany(
+            "DELETE FROM invites WHERE invite_link = ? AND email_key IS NULL", [(link,) for link in links]
+        )
+
+
+def record_purchase(email: str, payment_id: str, platform: str, min_expires_at: float) -> dict:
+    """
+    Compra recebida no webhook, numa transação só: membro ativo + link do pool
+    (tarefa já concluída) ou, com o pool vazio, tarefa de convite pendente.
+    Evento repetido (mesmo payment_id) não altera nada.
+
+    Returns:
+        {'created': bool, 'invite_link': str ou None}
+    """
+    now = datetime.now().isoformat()
+    payload = json.dumps({"email": email, "payment_id": payment_id, "platform": platform})
+    with transaction() as conn:
+        if conn.execute("SELECT 1 FROM tasks WHERE kind = 'invite' AND payment_id = ?", (payment_id,)).fetchone():
+            return {"created": False, "invite_link": None}
+        _upsert_member(conn, email, None, payment_id, platform)
+        invite_link = _claim_pool_invite(conn, email, payment_id, min_expires_at)
+        conn.execute('''
+            INSERT INTO tasks (kind, payment_id, payload, status, attempts, result, next_attempt_at, created_at, updated_at)
+            VALUES ('invite', ?, ?, ?, 0, ?, 0, ?, ?)
+        ''', (payment_id, payload, "done" if invite_link else "pending",
+              json.dumps({"invite_link": invite_link}) if invite_link else None, now, now))
+    return {"created": True, "invite_link": invite_link}
+
+
+# =============================================================================
+# FILA DE TAREFAS (webhooks)
+# =============================================================================
+
+def enqueue_task(kind: str, payment_id: str, payload: dict) -> bool:
+    """
+    Grava tarefa pendente.
+
+    Returns:
+        False se já existia tarefa desse tipo para o payment_id (evento repetido)
+    """
+    now = datetime.now().isoformat()
+    with transaction() as conn:
+        cursor = conn.execute('''
+            INSERT OR IGNORE INTO tasks (kind, payment_id, payload, status, next_attempt_at, created_at, updated_at)
+            VALUES (?, ?, ?, 'pending', 0, ?, ?)
+        ''', (kind, payment_id, json.dumps(payload), now, now))
+    return cursor.rowcount > 0
+
+
+def _task(row: Optional[sqlite3.Row]) -> Optional[dict]:
+    if not row:
+        return None
+    task = dict(row)
+    task["payload"] = json.loads(task["payload"] or "{}")
+    return task
+
+
+def claim_task() -> Optional[dict]:
+    """Pega a tarefa pendente mais antiga já liberada (pending → running, atômico)"""
+    with transaction() as conn:
+        row = conn.execute('''
+            UPDATE tasks SET status = 'running', attempts = attempts + 1, updated_at = ?
+            WHERE id = (
+                SELECT id FROM tasks WHERE status = 'pending' AND next_attempt_at <= ?
+                ORDER BY id LIMIT 1
+            )
+            RETURNING *
+        ''', (datetime.now().isoformat(), time.time())).fetchone()
+    return _task(row)
+
+
+def finish_task(task_id: int, result: Optional[dict] = None):
+    with transaction() as conn:
+        conn.execute(
+            "UPDATE tasks SET status = 'done', result = ?, last_error = NULL, updated_at = ? WHERE id = ?",
+            (json.dumps(result) if result is not None else None, datetime.now().isoformat(), task_id),
+        )
+
+
+def retry_task(task_id: int, error: str, delay: float, max_attempts: int) -> str:
+    """
+    Devolve a tarefa para a fila daqui a `delay` s, ou marca 'failed' após max_attempts.
+
+    Returns:
+        novo status
+    """
+    with transaction() as conn:
+        attempts = conn.execute("SELECT attempts FROM tasks WHERE id = ?", (task_id,)).fetchone()[0]
+        status = "failed" if attempts >= max_attempts else "pending"
+        conn.execute(
+            "UPDATE tasks SET status = ?, last_error = ?, next_attempt_at = ?, updated_at = ? WHERE id = ?",
+            (status, error[:500], time.time() + delay, datetime.now().isoformat(), task_id),
+        )
+    return status
+
+
+def requeue_running() -> int:
+    """Tarefas que ficaram 'running' (processo morreu no meio) voltam para a fila"""
+    with transaction() as conn:
+        cursor = conn.execute(
+            "UPDATE tasks SET status = 'pending', updated_at = ? WHERE status = 'running'",
+            (datetime.now().isoformat(),),
+        )
+    return cursor.rowcount
+
+
+def task_stats() -> dict:
+    with get_connection() as conn:
+        rows = conn.execute("SELECT status, COUNT(*) AS n FROM tasks GROUP BY status").fetchall()
+    return {row["status"]: row["n"] for row in rows}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Store de membros/convites do canal PAGO")
+    parser.add_argument("--migrate", action="store_true", help="cria o store e importa os JSON antigos")
+    parser.add_argument("--member", metavar="EMAIL", help="mostra um membro")
+    args = parser.parse_args()
+    if args.member:
+        print(get_member(email=args.member))
+    print(f"{STORE_PATH}: {count_members()} membros ({count_members('active')} ativos)")
+    print(f"Tarefas: {task_stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+Job Curator Bot - Message Render
+Texto dos posts de vaga, renderizado uma vez quando a vaga entra na fila
+(job_queue.rendered) em todas as variantes: canal (free/paid) × formato
+(markdown/plain/html). Na postagem é só ler e enviar.
+
+Funções puras (sem banco, rede ou arquivos): a descrição da empresa vem de quem chama.
+O cache é refeito quando muda a versão do template (TEMPLATE_VERSION) ou
+alguma coluna da vaga usada no texto (render_hash). A descrição da empresa fica
+gravada junto (job_queue.company_desc) e só é buscada de novo quando o registro
+de empresas muda.
+"""
+import hashlib
+import html
+import json
+from typing import Dict, Optional
+
+# Suba ao mudar o texto dos posts: renders antigos são refeitos na postagem
+TEMPLATE_VERSION = 1
+
+CHANNELS = ("free", "paid")
+FORMATS = ("markdown", "plain", "html")
+
+# Colunas de jobs que entram no texto
+RENDER_FIELDS = (
+    "title", "company", "location", "salary_min", "salary_max",
+    "direct_url", "source_url", "analysis_result",
+)
+
+
+def render_hash(job: dict, company_desc: str = "") -> str:
+    """Hash das colunas usadas no texto (muda quando a vaga muda)"""
+    raw = "\x1f".join(str(job.get(f) if job.get(f) is not None else "") for f in RENDER_FIELDS)
+    return hashlib.blake2b(f"{raw}\x1f{company_desc}".encode(), digest_size=8).hexdigest()
+
+
+def _analysis(job: dict) -> dict:
+    analysis = job.get("analysis_result") or {}
+    if isinstance(analysis, str):
+        try:
+            analysis = json.loads(analysis)
+        except ValueError:
+            analysis = {}
+    return analysis if isinstance(analysis, dict) else {}
+
+
+def job_fields(job: dict, company_desc: str = "") -> dict:
+    """Campos do post já resolvidos (título PT, empresa, local, salário, link)"""
+    analysis = _analysis(job)
+
+    location = job.get("location") or "Worldwide"
+    if len(location) > 25:
+        location = location[:22] + "..."
+
+    salary = ""
+    salary_est = analysis.get("salario_estimado_usd_mes")
+    if salary_est:
+        salary = f"~USD ${salary_est:,}/mês"
+    elif job.get("salary_min") and job.get("salary_max"):
+        salary = f"USD ${job['salary_min']:,} - ${job['salary_max']:,}/ano"
+    elif job.get("salary_min"):
+        salary = f"USD ${job['salary_min']:,}+/ano"
+
+    return {
+        "title": analysis.get("titulo_pt") or job.get("title") or "Vaga Remota",
+        "company": analysis.get("empresa") or job.get("company") or "Empresa Internacional",
+        "company_desc": company_desc,
+        "location": location,
+        "salary": salary,
+        "high": bool(analysis.get("is_high_salary")),
+        "link": job.get("direct_url") or job.get("source_url") or "",
+    }
+
+
+def render_markdown(f: dict) -> str:
+    """
+    Formato PT-BR (Markdown do Telegram):
+    🌍 Título da Vaga
+    🏢 Empresa: Nome — descrição do que faz
+    📍 Remoto | 🌎 País/Região
+    💰 Salário (se disponível)
+
+    🔗 Candidatar-se
+    """
+    company = f"{f['company']} — {f['company_desc']}" if f["company_desc"] else f["company"]
+    message = f"🌍 *{f['title']}*{' 🔥' if f['high'] else ''}\n"
+    message += f"🏢 *Empresa:* {company}\n"
+    message += f"📍 Remoto | 🌎 {f['location']}"
+    if f["salary"]:
+        message += f"\n💰 {f['salary']}"
+    message += f"\n\n🔗 [Candidatar-se]({f['link']})"
+    return message
+
+
+def render_plain(f: dict) -> str:
+    """Sem formatação (reenvio quando o Markdown é recusado): link por extenso"""
+    company = f"{f['company']} — {f['company_desc']}" if f["company_desc"] else f["company"]
+    message = f"🌍 {f['title']}{' 🔥' if f['high'] else ''}\n"
+    message += f"🏢 Empresa: {company}\n"
+    message += f"📍 Remoto | 🌎 {f['location']}"
+    if f["salary"]:
+        message += f"\n💰 {f['salary']}"
+    message += f"\n\n🔗 Candidatar-se: {f['link']}"
+    return message
+
+
+def render_html(f: dict) -> str:
+    e = html.escape
+    company = f"{e(f['company'])} — {e(f['company_desc'])}" if f["company_desc"] else e(f["company"])
+    message = f"🌍 <b>{e(f['title'])}</b>{' 🔥' if f['high'] else ''}\n"
+    message += f"🏢 <b>Empresa:</b> {company}\n"
+    message += f"📍 Remoto | 🌎 {e(f['location'])}"
+    if f["salary"]:
+        message += f"\n💰 {e(f['salary'])}"
+    message += f"\n\n🔗 <a href=\"{e(f['link'], quote=True)}\">Candidatar-se</a>"
+    return message
+
+
+RENDERERS = {"markdown": render_markdown, "plain": render_plain, "html": render_html}
+
+
+def render_all(job: dict, company_desc: str = "") -> Dict[str, Dict[str, str]]:
+    """{'free': {'markdown', 'plain', 'html'}, 'paid': {...}}"""
+    fields = job_fields(job, company_desc)
+    # FREE e PAID usam o mesmo template por enquanto; cada canal tem a própria entrada
+    return {channel: {fmt: RENDERERS[fmt](fields) for fmt in FORMATS} for channel in CHANNELS}
+
+
+def render_record(job: dict, company_desc: str = "") -> dict:
+    """Colunas de job_queue com o render da vaga: rendered (JSON), render_hash, render_version, company_desc"""
+    return {
+        "rendered": json.dumps(render_all(job, company_desc), ensure_ascii=False),
+        "render_hash": render_hash(job, company_desc),
+        "render_version": TEMPLATE_VERSION,
+        "company_desc": company_desc,
+    }
+
+
+def cached(job: dict, company_desc: str = "") -> Optional[Dict[str, Dict[str, str]]]:
+    """Render guardado na linha da fila, se ainda vale (mesma versão e mesmo hash)"""
+    if not job.get("rendered") or job.get("render_version") != TEMPLATE_VERSION:
+        return None
+    if job.get("render_hash") != render_hash(job, company_desc):
+        return None
+    try:
+        return json.loads(job["rendered"])
+    except ValueError:
+        return None
@@ -5,24 +5,31 @@ Vagas Remotas - Bot de Controle de Acesso (Canal PAGO)
 Funcionalidades:
 1. Gera link de convite único por comprador
 2. Verifica se usuário está na lista de pagantes
-3. Remove usuários que cancelaram/não pagaram
-4. Integra com Stripe/Hotmart via webhook
+3. Remove usuários que cancelaram/não pagaram (webhook ou --reconcile, que
+   também aplica expires_at)
+4. Integra com Stripe/Hotmart via webhook: o webhook só grava a tarefa
+   (member_store.tasks) e responde; convites, remoções e DMs rodam nos
+   workers do servidor, pela Bot API assíncrona (telegram_sender)
 
 Uso:
 - Standalone: python3 paid_access_bot.py
 - Com webhook: uvicorn paid_access_bot:app --port 8080
 """
 
+import asyncio
+import fcntl
 import json
 import os
 import secrets
 import time
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Optional
 
-# Telegram
-import requests
+import member_store
+from post_log import atomic_write_json
+from telegram_sender import TelegramSender
 
 # FastAPI para webhooks (opcional)
 try:
@@ -36,9 +43,8 @@ except ImportError:
 # CONFIGURAÇÃO
 # =============================================================================
 
-DATA_DIR = Path(__file__).parent / "data"
-MEMBERS_DB = DATA_DIR / "paid_members.json"
-INVITES_DB = DATA_DIR / "paid_invites.json"
+# Membros e convites: member_store (data/paid_access.db)
+DATA_DIR = member_store.DATA_DIR
 
 def load_env():
     """Carrega variáveis de ambiente"""
@@ -66,83 +72,76 @@ BOT_TOKEN = os.environ.get("TELEGRAM_TOKEN_PAID")
 GROUP_ID = os.environ.get("TELEGRAM_CHANNEL_PAID")
 STRIPE_WEBHOOK_SECRET = os.environ.get("STRIPE_WEBHOOK_SECRET")
 
-# =============================================================================
-# DATABASE (JSON simples)
-# =============================================================================
+# Acordado quando uma compra pega um link do pool (servidor)
+_pool_wakeup: Optional[asyncio.Event] = None
 
-def load_members() -> dict:
-    """Carrega banco de membros pagantes"""
-    if not MEMBERS_DB.exists():
-        return {}
-    try:
-        return json.loads(MEMBERS_DB.read_text())
-    except:
-        return {}
-
-def save_members(data: dict):
-    """Salva banco de membros"""
-    MEMBERS_DB.write_text(json.dumps(data, indent=2))
-
-def load_invites() -> dict:
-    """Carrega banco de convites pendentes"""
-    if not INVITES_DB.exists():
-        return {}
-    try:
-        return json.loads(INVITES_DB.read_text())
-    except:
-        return {}
+# Fila de tarefas dos webhooks (member_store.tasks)
+TASK_WORKERS = int(os.environ.get("PAID_TASK_WORKERS", "8"))
+TASK_MAX_ATTEMPTS = int(os.environ.get("PAID_TASK_MAX_ATTEMPTS", "6"))
+TASK_RETRY_BASE_SECONDS = 5.0
+TASK_POLL_SECONDS = 5.0
 
-def save_invites(data: dict):
-    """Salva banco de convites"""
-    INVITES_DB.write_text(json.dumps(data, indent=2))
+# Convites: validade para o comprador e pool criado antes das compras
+INVITE_HOURS = 72
+INVITE_POOL_SIZE = int(os.environ.get("PAID_INVITE_POOL_SIZE", "20"))
+INVITE_POOL_LINK_HOURS = 168
+INVITE_POOL_CHECK_SECONDS = 60.0
+# Com vários workers do uvicorn, só o processo com este lock completa o pool
+INVITE_POOL_LOCK_PATH = DATA_DIR / "invite_pool.lock"
+
+# Reconciliação (--reconcile, via cron)
+RECONCILE_MAX_SECONDS = float(os.environ.get("PAID_RECONCILE_MAX_SECONDS", "900"))
+RECONCILE_CONCURRENCY = 10
+RECONCILE_BATCH = 100
+RECONCILE_MAX_ATTEMPTS = 5
+RECONCILE_REPORT_PATH = DATA_DIR / "reconcile_report.json"
+RECONCILE_LOCK_PATH = DATA_DIR / "reconcile.lock"
 
 # =============================================================================
 # TELEGRAM API
 # =============================================================================
 
-def telegram_api(method: str, params: dict = None) -> dict:
-    """Chama Telegram Bot API"""
+async def telegram_api(sender: TelegramSender, method: str, params: dict = None, chat_id=None) -> dict:
+    """Chama Telegram Bot API (pool do sender, retry_after e limite do bot)"""
     if not BOT_TOKEN:
         raise RuntimeError("TELEGRAM_TOKEN_PAID não configurado")
-    
-    url = f"https://api.telegram.org/bot{BOT_TOKEN}/{method}"
-    r = requests.post(url, json=params or {}, timeout=15)
-    result = r.json()
-    
-    if not result.get("ok"):
-        raise RuntimeError(f"Telegram API error: {result.get('description')}")
-    
-    return result.get("result", {})
 
-def create_invite_link(expire_hours: int = 24, member_limit: int = 1) -> str:
+    result = await sender.call(BOT_TOKEN, method, params, chat_id=chat_id)
+
+    if not result["ok"]:
+        raise RuntimeError(f"Telegram API error: {result['error']}")
+
+    return result["result"] or {}
+
+async def create_invite_link(sender: TelegramSender, expire_hours: int = 24, member_limit: int = 1) -> str:
     """Cria link de convite único para o grupo"""
     if not GROUP_ID:
         raise RuntimeError("TELEGRAM_CHANNEL_PAID não configurado")
-    
+
     expire_date = int(time.time()) + (expire_hours * 3600)
-    
-    result = telegram_api("createChatInviteLink", {
+
+    result = await telegram_api(sender, "createChatInviteLink", {
         "chat_id": GROUP_ID,
         "expire_date": expire_date,
         "member_limit": member_limit,
         "creates_join_request": False
     })
-    
+
     return result.get("invite_link")
 
-def kick_member(user_id: int) -> bool:
+async def kick_member(sender: TelegramSender, user_id: int) -> bool:
     """Remove membro do grupo"""
     if not GROUP_ID:
         return False
-    
+
     try:
-        telegram_api("banChatMember", {
+        await telegram_api(sender, "banChatMember", {
             "chat_id": GROUP_ID,
             "user_id": user_id,
             "revoke_messages": False
         })
         # Unban para permitir re-entrada se pagar novamente
-        telegram_api("unbanChatMember", {
+        await telegram_api(sender, "unbanChatMember", {
             "chat_id": GROUP_ID,
             "user_id": user_id,
             "only_if_banned": True
@@ -152,14 +151,14 @@ def kick_member(user_id: int) -> bool:
         print(f"Erro ao remover membro {user_id}: {e}")
         return False
 
-def send_message(chat_id: int, text: str):
+async def send_message(sender: TelegramSender, chat_id: int, text: str):
     """Envia mensagem para um usuário"""
     try:
-        telegram_api("sendMessage", {
+        await telegram_api(sender, "sendMessage", {
             "chat_id": chat_id,
             "text": text,
             "parse_mode": "HTML"
-        })
+        }, chat_id=chat_id)
     except Exception as e:
         print(f"Erro ao enviar mensagem para {chat_id}: {e}")
 
@@ -167,167 +166,391 @@ def send_message(chat_id: int, text: str):
 # LÓGICA DE NEGÓCIO
 # =============================================================================
 
-def add_paid_member(email: str, telegram_id: int = None, payment_id: str = None, 
+def add_paid_member(email: str, telegram_id: int = None, payment_id: str = None,
                     platform: str = "manual") -> dict:
     """Adiciona membro pagante"""
-    members = load_members()
-    
-    member = {
-        "email": email,
-        "telegram_id": telegram_id,
-        "payment_id": payment_id,
-        "platform": platform,
-        "status": "active",
-        "joined_at": datetime.now().isoformat(),
-        "expires_at": None  # None = vitalício, ou data de expiração
-    }
-    
-    key = email.lower()
-    members[key] = member
-    save_members(members)
-    
-    return member
+    return member_store.upsert_member(email, telegram_id, payment_id, platform)
 
-def generate_invite_for_buyer(email: str, payment_id: str = None, 
-                               platform: str = "manual") -> str:
+async def generate_invite_for_buyer(sender: TelegramSender, email: str, payment_id: str = None,
+                                    platform: str = "manual") -> str:
     """Gera convite único para comprador"""
-    
-    # Registra como membro (sem telegram_id ainda)
-    add_paid_member(email, payment_id=payment_id, platform=platform)
-    
-    # Gera link de convite
-    invite_link = create_invite_link(expire_hours=72, member_limit=1)
-    
+
+    # Registra como membro (sem telegram_id ainda); banco fora do event loop
+    await asyncio.to_thread(add_paid_member, email, payment_id=payment_id, platform=platform)
+
+    # Tarefa repetida (worker caiu depois de criar o link): reaproveita o convite
+    if payment_id:
+        existing = await asyncio.to_thread(member_store.get_invites, payment_id=payment_id)
+        if existing:
+            return existing[0]["invite_link"]
+
+    # Link do pool, se houver; senão cria agora
+    invite_link = await asyncio.to_thread(member_store.claim_pool_invite, email, payment_id, _pool_min_expires())
+    if invite_link:
+        _wake_pool()
+        return invite_link
+    invite_link = await create_invite_link(sender, expire_hours=INVITE_HOURS, member_limit=1)
+
     # Salva convite pendente
-    invites = load_invites()
-    invites[invite_link] = {
-        "email": email,
-        "payment_id": payment_id,
-        "created_at": datetime.now().isoformat(),
-        "used": False
-    }
-    save_invites(invites)
-    
+    await asyncio.to_thread(member_store.add_invite, invite_link, email, payment_id)
+
     return invite_link
 
-def remove_member_by_email(email: str) -> bool:
+async def remove_member_by_email(sender: TelegramSender, email: str) -> bool:
     """Remove membro por email (cancelamento)"""
-    members = load_members()
-    key = email.lower()
-    
-    if key not in members:
+    member = await asyncio.to_thread(member_store.cancel_member, email)
+    if member is None:
         return False
-    
-    member = members[key]
     telegram_id = member.get("telegram_id")
-    
-    # Atualiza status
-    member["status"] = "cancelled"
-    member["cancelled_at"] = datetime.now().isoformat()
-    members[key] = member
-    save_members(members)
-    
-    # Remove do grupo se tiver telegram_id
+
+    # Remove do grupo se tiver telegram_id (se falhar, a reconciliação tenta de novo)
     if telegram_id:
-        kick_member(telegram_id)
-        send_message(telegram_id, 
+        if await kick_member(sender, telegram_id):
+            await asyncio.to_thread(member_store.mark_removed, [email.lower()])
+        await send_message(sender, telegram_id,
             "⚠️ Sua assinatura do Vagas Remotas Premium foi cancelada.\n\n"
             "Você foi removido do grupo. Para voltar, renove sua assinatura."
         )
-    
+
     return True
 
 def is_member_active(email: str = None, telegram_id: int = None) -> bool:
     """Verifica se membro está ativo"""
-    members = load_members()
-    
-    for member in members.values():
-        if email and member.get("email", "").lower() == email.lower():
-            return member.get("status") == "active"
-        if telegram_id and member.get("telegram_id") == telegram_id:
-            return member.get("status") == "active"
-    
-    return False
+    member = member_store.get_member(email=email) if email else None
+    if member is None and telegram_id:
+        member = member_store.get_member(telegram_id=telegram_id)
+    return bool(member) and member.get("status") == "active"
 
 def link_telegram_to_email(email: str, telegram_id: int) -> bool:
     """Vincula telegram_id ao email após entrada no grupo"""
-    members = load_members()
-    key = email.lower()
-    
-    if key not in members:
-        return False
-    
-    members[key]["telegram_id"] = telegram_id
-    members[key]["linked_at"] = datetime.now().isoformat()
-    save_members(members)
-    
-    return True
+    return member_store.link_telegram(email, telegram_id)
+
+async def with_sender(fn, *args, **kwargs):
+    """Roda uma função async da Bot API com um sender próprio (CLI)"""
+    async with TelegramSender() as sender:
+        return await fn(sender, *args, **kwargs)
+
+# =============================================================================
+# POOL DE CONVITES
+# =============================================================================
+
+def _pool_min_expires() -> float:
+    """Um link do pool só serve se ainda vale INVITE_HOURS para o comprador"""
+    return time.time() + INVITE_HOURS * 3600
+
+def _wake_pool():
+    if _pool_wakeup is not None:
+        _pool_wakeup.set()
+
+async def refill_invite_pool(sender: TelegramSender) -> dict:
+    """
+    Revoga os links livres que já não duram INVITE_HOURS e cria novos até
+    INVITE_POOL_SIZE (um por vez, no limite do bot).
+
+    Returns:
+        {'revoked', 'created', 'available'}
+    """
+    stale = await asyncio.to_thread(member_store.stale_pool_invites, _pool_min_expires())
+    for link in stale:
+        try:
+            await telegram_api(sender, "revokeChatInviteLink", {"chat_id": GROUP_ID, "invite_link": link})
+        except Exception as e:
+            print(f"Erro ao revogar convite do pool: {e}")
+    if stale:
+        await asyncio.to_thread(member_store.delete_pool_invites, stale)
+
+    available = await asyncio.to_thread(member_store.pool_size, _pool_min_expires())
+    created = 0
+    for _ in range(max(0, INVITE_POOL_SIZE - available)):
+        expires_at = time.time() + INVITE_POOL_LINK_HOURS * 3600
+        link = await create_invite_link(sender, expire_hours=INVITE_POOL_LINK_HOURS, member_limit=1)
+        # cada link entra no pool assim que criado: compras durante o refill já o encontram
+        await asyncio.to_thread(member_store.add_pool_invites, [(link, expires_at)])
+        created += 1
+    return {"revoked": len(stale), "created": created, "available": available + created}
+
+def _try_pool_lock():
+    """Lock exclusivo do pool de convites (arquivo aberto) ou None se outro processo já tem"""
+    lock = open(INVITE_POOL_LOCK_PATH, "w")
+    try:
+        fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock.close()
+        return None
+    return lock
+
+async def invite_pool_worker(sender: TelegramSender, wakeup: asyncio.Event):
+    """
+    Mantém o pool cheio: refaz a cada INVITE_POOL_CHECK_SECONDS ou quando uma compra pega um link.
+    Só roda no processo que pega INVITE_POOL_LOCK_PATH; os outros tentam de novo a cada
+    INVITE_POOL_CHECK_SECONDS (assumem se aquele processo parar).
+    """
+    lock = None
+    try:
+        while True:
+            wakeup.clear()
+            if lock is None:
+                lock = _try_pool_lock()
+            if lock is not None:
+                try:
+                    await refill_invite_pool(sender)
+                except Exception as e:
+                    print(f"⚠️ Erro ao completar o pool de convites: {e}")
+            try:
+                await asyncio.wait_for(wakeup.wait(), INVITE_POOL_CHECK_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        if lock is not None:
+            lock.close()
+
+# =============================================================================
+# TAREFAS EM BACKGROUND (convites, remoções, DMs)
+# =============================================================================
+
+async def run_task(sender: TelegramSender, task: dict) -> dict:
+    """Executa uma tarefa da fila (member_store.tasks)"""
+    data = task["payload"]
+    if task["kind"] == "invite":
+        invite_link = await generate_invite_for_buyer(sender, data["email"], data.get("payment_id"),
+                                                      data.get("platform", "manual"))
+        print(f"✅ Nova compra ({data.get('platform')}): {data['email']} → {invite_link}")
+        return {"invite_link": invite_link}
+    if task["kind"] == "cancel":
+        found = await remove_member_by_email(sender, data["email"])
+        print(f"❌ Cancelamento ({data.get('platform')}): {data['email']}")
+        return {"found": found}
+    raise ValueError(f"tipo de tarefa desconhecido: {task['kind']}")
+
+async def task_worker(sender: TelegramSender, wakeup: asyncio.Event):
+    """Processa a fila de tarefas até ser cancelado; dorme até um webhook novo ou TASK_POLL_SECONDS"""
+    while True:
+        task = await asyncio.to_thread(member_store.claim_task)
+        if task is None:
+            wakeup.clear()
+            try:
+                await asyncio.wait_for(wakeup.wait(), TASK_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            continue
+        try:
+            result = await run_task(sender, task)
+        except Exception as e:
+            delay = TASK_RETRY_BASE_SECONDS * 2 ** (task["attempts"] - 1)
+            status = await asyncio.to_thread(member_store.retry_task, task["id"], str(e), delay, TASK_MAX_ATTEMPTS)
+            print(f"⚠️ Tarefa {task['kind']} {task['payment_id']} falhou ({status}): {e}")
+        else:
+            await asyncio.to_thread(member_store.finish_task, task["id"], result)
+
+def enqueue_task(kind: str, email: str, payment_id: Optional[str], platform: str,
+                 occurred: Optional[str] = None) -> bool:
+    """
+    Grava a tarefa do webhook. Sem payment_id, a chave de idempotência é o email
+    + `occurred` (data/status do evento): o reenvio do mesmo evento não repete a
+    tarefa, mas um cancelamento novo do mesmo email (depois de recomprar) entra.
+    """
+    key = payment_id or ":".join(filter(None, (email.lower(), occurred)))
+    return member_store.enqueue_task(kind, key, {
+        "email": email, "payment_id": payment_id, "platform": platform,
+    })
+
+# =============================================================================
+# RECONCILIAÇÃO (expirados/cancelados ainda no grupo)
+# =============================================================================
+
+async def _remove_from_group(sender: TelegramSender, member: dict) -> Optional[str]:
+    """Remove um membro expirado/cancelado; retorna o erro ou None"""
+    try:
+        await telegram_api(sender, "banChatMember", {
+            "chat_id": GROUP_ID, "user_id": member["telegram_id"], "revoke_messages": False,
+        })
+        await telegram_api(sender, "unbanChatMember", {
+            "chat_id": GROUP_ID, "user_id": member["telegram_id"], "only_if_banned": True,
+        })
+    except Exception as e:
+        return str(e)
+    if member["status"] == "expired":
+        await send_message(sender, member["telegram_id"],
+            "⚠️ Sua assinatura do Vagas Remotas Premium expirou.\n\n"
+            "Você foi removido do grupo. Para voltar, renove sua assinatura."
+        )
+    return None
+
+async def reconcile_members(sender: TelegramSender, max_seconds: float = RECONCILE_MAX_SECONDS) -> dict:
+    """
+    Marca como 'expired' os ativos com expires_at vencido e remove do grupo
+    todos os expirados/cancelados que ainda não saíram.
+
+    Em lotes de RECONCILE_BATCH, RECONCILE_CONCURRENCY remoções simultâneas no
+    limite do bot (telegram_sender). Cada lote é gravado ao terminar
+    (removed_at / kick_attempts): se o processo morrer, a próxima execução
+    continua de onde parou. Para em `max_seconds`; o resto fica para a próxima.
+
+    Returns:
+        relatório (também gravado em reconcile_runs e RECONCILE_REPORT_PATH)
+    """
+    if not GROUP_ID:
+        raise RuntimeError("TELEGRAM_CHANNEL_PAID não configurado")
+
+    start = time.monotonic()
+    deadline = start + max_seconds
+    report = {
+        "started_at": datetime.now().isoformat(),
+        "expired": await asyncio.to_thread(member_store.expire_members),
+        "checked": 0,
+        "removed": 0,
+        "without_telegram": 0,
+        "failed": {},
+        "timed_out": False,
+    }
+    run_id = await asyncio.to_thread(member_store.save_reconcile_run, None, "running", report)
+    semaphore = asyncio.Semaphore(RECONCILE_CONCURRENCY)
+
+    async def remove(member: dict) -> Optional[str]:
+        async with semaphore:
+            if time.monotonic() >= deadline:
+                return "timeout"
+            return await _remove_from_group(sender, member)
+
+    after = ""
+    while True:
+        batch = await asyncio.to_thread(member_store.members_to_remove, after, RECONCILE_BATCH,
+                                        RECONCILE_MAX_ATTEMPTS)
+        if not batch:
+            break
+        if time.monotonic() >= deadline:
+            report["timed_out"] = True
+            break
+        after = batch[-1]["email_key"]
+        report["checked"] += len(batch)
+        to_kick = [m for m in batch if m["telegram_id"]]
+        # sem telegram_id nunca entrou no grupo: só marca
+        done = [m["email_key"] for m in batch if not m["telegram_id"]]
+        report["without_telegram"] += len(done)
+
+        errors = await asyncio.gather(*(remove(m) for m in to_kick))
+        timed_out = {m["email_key"] for m, err in zip(to_kick, errors) if err == "timeout"}
+        failures = {m["email_key"]: err for m, err in zip(to_kick, errors) if err and err != "timeout"}
+        done += [m["email_key"] for m, err in zip(to_kick, errors) if not err]
+        await asyncio.to_thread(member_store.mark_removed, done)
+        if failures:
+            await asyncio.to_thread(member_store.record_kick_failures, failures)
+        report["removed"] += len(to_kick) - len(failures) - len(timed_out)
+        report["failed"].update(failures)
+        if timed_out:
+            report["timed_out"] = True
+            break
+        await asyncio.to_thread(member_store.save_reconcile_run, run_id, "running", report)
+
+    report["seconds"] = round(time.monotonic() - start, 1)
+    report["finished_at"] = datetime.now().isoformat()
+    status = "partial" if report["timed_out"] else "done"
+    await asyncio.to_thread(member_store.save_reconcile_run, run_id, status, report)
+    atomic_write_json(RECONCILE_REPORT_PATH, report)
+    return report
 
 # =============================================================================
 # WEBHOOKS (Stripe, Hotmart, etc)
 # =============================================================================
 
 if HAS_FASTAPI:
-    app = FastAPI(title="Vagas Remotas - Access Control")
-    
+    @asynccontextmanager
+    async def lifespan(app):
+        """Um sender (pool HTTP), TASK_WORKERS workers da fila e o worker do pool de convites"""
+        global _pool_wakeup
+        requeued = await asyncio.to_thread(member_store.requeue_running)
+        if requeued:
+            print(f"↩️ {requeued} tarefas interrompidas voltaram para a fila")
+        app.state.wakeup = asyncio.Event()
+        _pool_wakeup = asyncio.Event()
+        async with TelegramSender() as sender:
+            workers = [asyncio.create_task(task_worker(sender, app.state.wakeup))
+                       for _ in range(TASK_WORKERS)]
+            if INVITE_POOL_SIZE > 0:
+                workers.append(asyncio.create_task(invite_pool_worker(sender, _pool_wakeup)))
+            try:
+                yield
+            finally:
+                for worker in workers:
+                    worker.cancel()
+                await asyncio.gather(*workers, return_exceptions=True)
+
+    app = FastAPI(title="Vagas Remotas - Access Control", lifespan=lifespan)
+
+    async def _enqueue(request: Request, kind: str, email: str, payment_id: Optional[str], platform: str,
+                       occurred: Optional[str] = None) -> str:
+        """Grava a tarefa e acorda os workers; devolve o status da resposta"""
+        created = await asyncio.to_thread(enqueue_task, kind, email, payment_id, platform, occurred)
+        if created:
+            request.app.state.wakeup.set()
+        return "queued" if created else "ok"
+
+    async def _purchase(request: Request, email: str, payment_id: Optional[str], platform: str) -> str:
+        """Compra: link do pool na hora (só banco); pool vazio → tarefa de convite"""
+        result = await asyncio.to_thread(member_store.record_purchase, email, payment_id or email.lower(),
+                                         platform, _pool_min_expires())
+        if result["invite_link"]:
+            _wake_pool()
+            print(f"✅ Nova compra ({platform}): {email} → {result['invite_link']}")
+            return "invited"
+        if result["created"]:
+            request.app.state.wakeup.set()
+            return "queued"
+        return "ok"
+
     @app.post("/webhook/stripe")
     async def stripe_webhook(request: Request):
-        """Webhook do Stripe"""
+        """Webhook do Stripe (só enfileira; convite/remoção rodam no worker)"""
         payload = await request.body()
         sig_header = request.headers.get("Stripe-Signature")
-        
+
         # Verificar assinatura (simplificado - em produção use stripe.Webhook.construct_event)
         try:
             event = json.loads(payload)
         except:
             raise HTTPException(400, "Invalid payload")
-        
+
         event_type = event.get("type")
         data = event.get("data", {}).get("object", {})
-        
-        if event_type == "checkout.session.completed":
+        email = data.get("customer_email")
+        status = "ok"
+
+        if event_type == "checkout.session.completed" and email:
             # Nova compra
-            email = data.get("customer_email")
-            payment_id = data.get("id")
-            
-            if email:
-                invite_link = generate_invite_for_buyer(email, payment_id, "stripe")
-                # Aqui você pode enviar o link por email ou retornar na resposta
-                print(f"✅ Nova compra: {email} → {invite_link}")
-        
-        elif event_type == "customer.subscription.deleted":
+            status = await _purchase(request, email, data.get("id"), "stripe")
+
+        elif event_type == "customer.subscription.deleted" and email:
             # Cancelamento
-            email = data.get("customer_email")
-            if email:
-                remove_member_by_email(email)
-                print(f"❌ Cancelamento: {email}")
-        
-        return JSONResponse({"status": "ok"})
-    
+            occurred = ":".join(str(v) for v in (event.get("created") or data.get("canceled_at"),
+                                                 data.get("status")) if v)
+            status = await _enqueue(request, "cancel", email, data.get("id"), "stripe", occurred)
+
+        return JSONResponse({"status": status})
+
     @app.post("/webhook/hotmart")
     async def hotmart_webhook(request: Request):
-        """Webhook do Hotmart"""
+        """Webhook do Hotmart (só enfileira; convite/remoção rodam no worker)"""
         data = await request.json()
-        
+
         event = data.get("event")
         buyer = data.get("data", {}).get("buyer", {})
         email = buyer.get("email")
-        
-        if event == "PURCHASE_COMPLETE":
-            if email:
-                invite_link = generate_invite_for_buyer(email, data.get("id"), "hotmart")
-                print(f"✅ Hotmart compra: {email} → {invite_link}")
-        
-        elif event in ["PURCHASE_REFUNDED", "SUBSCRIPTION_CANCELLATION"]:
-            if email:
-                remove_member_by_email(email)
-                print(f"❌ Hotmart cancelamento: {email}")
-        
-        return JSONResponse({"status": "ok"})
-    
+        status = "ok"
+
+        if event == "PURCHASE_COMPLETE" and email:
+            status = await _purchase(request, email, data.get("id"), "hotmart")
+
+        elif event in ["PURCHASE_REFUNDED", "SUBSCRIPTION_CANCELLATION"] and email:
+            purchase = data.get("data", {}).get("purchase", {})
+            occurred = ":".join(str(v) for v in (data.get("creation_date") or purchase.get("date"),
+                                                 event, purchase.get("status")) if v)
+            status = await _enqueue(request, "cancel", email, data.get("id"), "hotmart", occurred)
+
+        return JSONResponse({"status": status})
+
     @app.get("/health")
     async def health():
-        return {"status": "ok", "members": len(load_members())}
+        return {"status": "ok", "members": member_store.count_members(), "tasks": member_store.task_stats()}
 
 # =============================================================================
 # CLI
@@ -341,6 +564,11 @@ def main():
     parser.add_argument("--invite", metavar="EMAIL", help="Gera convite para email")
     parser.add_argument("--list", action="store_true", help="Lista membros")
     parser.add_argument("--check", metavar="EMAIL", help="Verifica se email é membro ativo")
+    parser.add_argument("--fill-pool", action="store_true", help="Completa o pool de convites")
+    parser.add_argument("--reconcile", action="store_true",
+                        help="Remove do grupo expirados/cancelados (retoma a execução interrompida)")
+    parser.add_argument("--max-seconds", type=float, default=RECONCILE_MAX_SECONDS,
+                        help="Tempo máximo da reconciliação")
     
     args = parser.parse_args()
     
@@ -349,25 +577,26 @@ def main():
         print(f"✅ Adicionado: {member}")
     
     elif args.remove:
-        if remove_member_by_email(args.remove):
+        if asyncio.run(with_sender(remove_member_by_email, args.remove)):
             print(f"✅ Removido: {args.remove}")
         else:
             print(f"❌ Email não encontrado: {args.remove}")
     
     elif args.invite:
         try:
-            link = generate_invite_for_buyer(args.invite, platform="manual")
+            link = asyncio.run(with_sender(generate_invite_for_buyer, args.invite, platform="manual"))
             print(f"✅ Convite gerado para {args.invite}:")
             print(f"   {link}")
         except Exception as e:
             print(f"❌ Erro: {e}")
     
     elif args.list:
-        members = load_members()
+        members = member_store.list_members()
         print(f"📋 Total de membros: {len(members)}\n")
-        for email, data in members.items():
+        for data in members:
+            email = data["email"]
             status = "✅" if data.get("status") == "active" else "❌"
-            tg = data.get("telegram_id", "não vinculado")
+            tg = data.get("telegram_id") or "não vinculado"
             print(f"{status} {email} (Telegram: {tg})")
     
     elif args.check:
@@ -377,6 +606,29 @@ def main():
         else:
             print(f"❌ {args.check} NÃO é membro ativo")
     
+    elif args.fill_pool:
+        lock = _try_pool_lock()
+        if lock is None:
+            print("❌ Pool de convites já mantido por outro processo (servidor de webhooks)")
+            return
+        result = asyncio.run(with_sender(refill_invite_pool))
+        print(f"✅ Pool de convites: {result['available']} livres "
+              f"({result['created']} criados, {result['revoked']} revogados)")
+
+    elif args.reconcile:
+        lock = open(RECONCILE_LOCK_PATH, "w")
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            print("❌ Outra reconciliação em andamento")
+            return
+        report = asyncio.run(with_sender(reconcile_members, args.max_seconds))
+        print(f"✅ Reconciliação {'parcial' if report['timed_out'] else 'completa'} em {report['seconds']}s: "
+              f"{report['expired']} expirados, {report['removed']} removidos, "
+              f"{len(report['failed'])} falhas, {report['without_telegram']} sem Telegram")
+        for email, error in list(report["failed"].items())[:20]:
+            print(f"   ❌ {email}: {error}")
+
     else:
         parser.print_help()
 
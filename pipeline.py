@@ -0,0 +1,1010 @@
+#!/usr/bin/env python3
+"""
+Job Curator Bot - Pipeline por estágios
+Um só fluxo sobre jobs.db para o app (canais FREE/PAID) e para o lote diário
+(prepare_daily_batch): cada estágio lê as vagas paradas no estágio anterior
+(coluna jobs.stage), processa e grava o resultado na própria linha da vaga.
+
+    fetch → filter → resolve → enrich → classify → select → render → post
+
+- Rejeições ficam no estágio onde aconteceram (status='rejected' + motivo).
+- Falhas transitórias (tempo, orçamento, erro de rede) deixam a vaga no
+  estágio para a próxima execução.
+- Cada estágio pode rodar sozinho; os de rede rodam em paralelo.
+- Em fluxo (stream_stages), fetch → classify rodam encadeados: a primeira
+  chamada ao LLM sai assim que a primeira fonte responde.
+- classify aprova e já coloca na fila (FREE/PAID); select/render montam o
+  lote diário a partir da mesma análise.
+- Cada execução pega as vagas com lease (jobs.claimed_by/lease_expires_at,
+  database.claim_jobs): vários processos dividem os mesmos estágios sem
+  processar a mesma vaga duas vezes, e as vagas de um processo que caiu voltam
+  quando o lease vence.
+
+Uso:
+- app.run_full_cycle / prepare_daily_batch.main
+- Standalone: python3 pipeline.py [--stages fetch,filter,...] [--batch]
+- Workers: python3 pipeline.py --worker [--stages resolve,enrich,classify] [--processes 3]
+"""
+import argparse
+import asyncio
+import fcntl
+import json
+import logging
+import multiprocessing
+import os
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from contextlib import contextmanager
+from datetime import datetime
+from itertools import chain
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+from config import GEMINI_DELAY, SALARY_HIGH_THRESHOLD
+import ats_boards
+import brave_planner
+import database as db
+import dedupe_index
+import job_keys
+import prepare_daily_batch as pdb
+from job_analyzer import analyze_job, quick_reject_check
+
+logger = logging.getLogger(__name__)
+
+STAGE_NAMES = ("fetch", "filter", "resolve", "enrich", "classify", "select", "render", "post")
+# Ciclo do app: descoberta e análise (a fila alimenta FREE/PAID)
+CYCLE_STAGES = STAGE_NAMES[:5]
+# Lote diário (prepare_daily_batch): tudo menos postar
+BATCH_STAGES = STAGE_NAMES[:-1]
+# Estágios por vaga: rodam encadeados em fluxo (stream_stages)
+STREAM_STAGES = STAGE_NAMES[:5]
+
+FETCH_WORKERS = int(os.environ.get("PIPELINE_FETCH_WORKERS", "4"))
+LLM_CHUNK_SIZE = 5
+# Analisador do classify: "batch" (micro-lotes do lote diário, pdb.call_gemini)
+# ou "job" (job_analyzer.analyze_job, uma vaga por chamada: critérios do app)
+ANALYZERS = ("batch", "job")
+JOB_ANALYZER_LIMIT = 15  # vagas por execução no modo "job" (rate limit)
+
+# Leases: tempo até uma vaga de processo parado ser retomada (renovado enquanto
+# o processo roda), vagas pegas por vez e espera do worker sem vagas
+LEASE_SECONDS = int(os.environ.get("PIPELINE_LEASE_SECONDS", "600"))
+CLAIM_BATCH = int(os.environ.get("PIPELINE_CLAIM_BATCH", "20"))
+WORKER_IDLE_SECONDS = int(os.environ.get("PIPELINE_WORKER_IDLE_SECONDS", "60"))
+
+# Conversão aproximada para USD (só para marcar is_high_salary)
+USD_RATES = {"USD": 1.0, "CAD": 0.73, "EUR": 1.08, "GBP": 1.27, "AUD": 0.66}
+
+
+class Reject(Exception):
+    """Rejeição definitiva da vaga no estágio atual"""
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+# =============================================================================
+# CONVERSÃO LINHA ↔ VAGA
+# =============================================================================
+
+def job_from_row(row: dict) -> dict:
+    """Linha de jobs → dict no formato usado pelas funções do lote diário"""
+    job = dict(row)
+    try:
+        raw = json.loads(job.get('raw_data') or '{}')
+    except (TypeError, ValueError):
+        raw = {}
+    job['raw'] = raw if isinstance(raw, dict) else {}
+    for key, value in job['raw'].items():
+        if job.get(key) is None:
+            job[key] = value
+    try:
+        analysis = json.loads(job.get('analysis_result') or '{}')
+    except (TypeError, ValueError):
+        analysis = {}
+    job['analysis'] = analysis if isinstance(analysis, dict) else {}
+    return job
+
+
+def job_to_row(job: dict) -> dict:
+    """Vaga de um fetcher do lote diário → linha para db.save_fetched_jobs"""
+    loc = job.get('location')
+    if not isinstance(loc, str):
+        loc = pdb.normalize_location(loc) if loc else ''
+    raw = {
+        'source': job.get('source'),
+        'posted_at': job.get('posted_at'),
+        'pt_hint': job.get('pt_hint'),
+        'brave_query': job.get('brave_query'),
+    }
+    return {
+        'id': job.get('id'),
+        'title': job.get('title'),
+        'company': job.get('company'),
+        'description': job.get('description'),
+        'source_url': job.get('source_url'),
+        'direct_url': job.get('direct_url'),
+        'location': loc,
+        'raw_data': {k: v for k, v in raw.items() if v is not None},
+    }
+
+
+def _columns(job: dict, fields: dict) -> dict:
+    """Campos alterados → colunas de jobs (o que não é coluna vai para raw_data)"""
+    cols = {k: v for k, v in fields.items() if k in db.STAGE_COLUMNS}
+    extra = {k: v for k, v in fields.items() if k not in db.STAGE_COLUMNS}
+    if extra:
+        raw = dict(job.get('raw') or {})
+        raw.update(extra)
+        cols['raw_data'] = json.dumps(raw)
+    return cols
+
+
+def _apply(job: dict, cols: dict) -> None:
+    """Colunas gravadas → vaga em memória (o próximo estágio do fluxo vê os campos novos)"""
+    for key, value in cols.items():
+        if key != 'raw_data':
+            job[key] = value
+            continue
+        try:
+            raw = json.loads(value or '{}')
+        except (TypeError, ValueError):
+            continue
+        if isinstance(raw, dict):
+            job['raw'] = raw
+            job.update(raw)
+
+
+def _export(job: dict) -> dict:
+    """Vaga no formato de batch_ready.json"""
+    out = {
+        'id': job.get('id'),
+        'title': job.get('title'),
+        'company': job.get('company'),
+        'description': job.get('description'),
+        'source_url': job.get('source_url'),
+        'location': job.get('location') or '',
+        'source': job.get('source'),
+        'pt_hint': bool(job.get('pt_hint')),
+        'direct_url': job.get('direct_url'),
+        'analysis': job.get('analysis') or {},
+    }
+    for key in ('posted_at', 'brave_query'):
+        if job.get(key):
+            out[key] = job[key]
+    return out
+
+
+def _priority(job: dict) -> int:
+    """Brave e boards de ATS primeiro (já vêm com link direto)"""
+    source = str(job.get('source') or '')
+    return 0 if source == 'brave' or source.startswith('ats-') else 1
+
+
+# =============================================================================
+# ESTÁGIOS
+# =============================================================================
+
+class Stage:
+    """
+    Estágio genérico: recebe vagas (paradas em `consumes` ou chegando do estágio
+    anterior, em fluxo), chama process() em cada uma (em paralelo se workers > 1,
+    dentro de time_budget) e grava o resultado.
+
+    process() retorna os campos a gravar (vaga avança para `produces`),
+    levanta Reject(motivo) ou retorna None (fica para a próxima execução).
+
+    Com `owner` (leases()), as vagas paradas são pegas com lease e só são
+    gravadas se o lease ainda for deste processo; `hold` mantém o lease das
+    que avançam (o próximo estágio do fluxo continua com elas).
+    """
+
+    name: str = ""
+    consumes: str = ""
+    produces: str = ""
+    limit: int = 200
+    workers: int = 1
+    time_budget: Optional[float] = None
+    newest_first: bool = False
+    owner: Optional[str] = None
+    hold: bool = False
+
+    def load(self, limit: Optional[int] = None) -> List[dict]:
+        limit = limit or self.limit
+        if self.owner:
+            rows = db.claim_jobs(self.consumes, self.owner, limit, LEASE_SECONDS, self.newest_first)
+        else:
+            rows = db.get_jobs_at_stage(self.consumes, limit, newest_first=self.newest_first)
+        return [job_from_row(r) for r in rows]
+
+    def parked(self) -> Iterator[dict]:
+        """
+        Vagas paradas em `consumes` (lidas só quando o fluxo chega nelas). Com
+        lease, pega CLAIM_BATCH por vez: o resto fica livre para outros processos.
+        """
+        if not self.owner:
+            yield from self.load()
+            return
+        taken = 0
+        while taken < self.limit:
+            jobs = self.load(min(CLAIM_BATCH, self.limit - taken))
+            if not jobs:
+                return
+            taken += len(jobs)
+            yield from jobs
+
+    def start(self) -> None:
+        """Chamado com a primeira vaga (o orçamento de tempo conta a partir daqui)"""
+
+    def process(self, job: dict) -> Optional[dict]:
+        raise NotImplementedError
+
+    def _call(self, job: dict):
+        try:
+            return self.process(job)
+        except Reject as r:
+            return r
+        except Exception as e:
+            logger.warning(f"[{self.name}] Erro em {job.get('id')}: {e}")
+            return None
+
+    def _map(self, jobs: Iterable[dict]) -> Iterator[tuple]:
+        """
+        (vaga, resultado) na ordem em que terminam. Só puxa a próxima vaga quando
+        há lugar na janela (workers * 2), então o estágio anterior não dispara na frente.
+        """
+        jobs = iter(jobs)
+        first = next(jobs, None)
+        if first is None:
+            return
+        self.deadline = time.time() + self.time_budget if self.time_budget else None
+        self.start()
+        jobs = chain([first], jobs)
+        if self.workers <= 1 and not self.time_budget:
+            for job in jobs:
+                self.stats['input'] += 1
+                yield job, self._call(job)
+            return
+
+        pool = ThreadPoolExecutor(max_workers=max(1, self.workers))
+        pending = {}
+        exhausted = False
+        try:
+            while True:
+                for future in [f for f in pending if f.done()]:
+                    yield pending.pop(future), future.result()
+                if self.deadline and time.time() >= self.deadline:
+                    logger.info(f"[{self.name}] Tempo esgotado ({self.time_budget:.0f}s)")
+                    break
+                if not exhausted and len(pending) < self.workers * 2:
+                    job = next(jobs, None)
+                    if job is None:
+                        exhausted = True
+                    else:
+                        self.stats['input'] += 1
+                        pending[pool.submit(self._call, job)] = job
+                    continue
+                if not pending:
+                    break
+                timeout = max(0.0, self.deadline - time.time()) if self.deadline else None
+                wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def stream(self, jobs: Iterable[dict], flush_every: int = 1) -> Iterator[dict]:
+        """
+        Processa as vagas conforme chegam e entrega as que avançaram, já gravadas
+        em `produces` (flush_every=1) e com os campos novos aplicados.
+        """
+        self.stats = {'input': 0, 'advanced': 0, 'rejected': 0, 'retry': 0}
+        reasons = {}
+        advanced, rejected = [], []
+
+        def flush():
+            db.advance_jobs(self.produces, advanced, self.owner, self.hold, LEASE_SECONDS, self.consumes)
+            db.reject_jobs(rejected, self.owner, self.consumes)
+            advanced.clear()
+            rejected.clear()
+
+        try:
+            for job, outcome in self._map(jobs):
+                if isinstance(outcome, Reject):
+                    rejected.append((job['id'], outcome.reason))
+                    reasons[outcome.reason] = reasons.get(outcome.reason, 0) + 1
+                    self.stats['rejected'] += 1
+                elif outcome is not None:
+                    advanced.append((job['id'], outcome))
+                    _apply(job, outcome)
+                    self.stats['advanced'] += 1
+                if len(advanced) + len(rejected) >= flush_every:
+                    flush()
+                if outcome is not None and not isinstance(outcome, Reject):
+                    yield job
+        finally:
+            flush()
+            self.stats['retry'] = self.stats['input'] - self.stats['advanced'] - self.stats['rejected']
+            if reasons:
+                self.stats['reasons'] = reasons
+
+    def run(self) -> dict:
+        jobs = self.load()
+        for _job in self.stream(jobs, flush_every=200):
+            pass
+        self.stats['input'] = len(jobs)
+        self.stats['retry'] = len(jobs) - self.stats['advanced'] - self.stats['rejected']
+        return self.stats
+
+
+class FetchStage(Stage):
+    """Coleta de todas as fontes em paralelo (vagas novas entram em 'fetched')"""
+
+    name = "fetch"
+    produces = "fetched"
+
+    def sources(self) -> dict:
+        return {
+            'ats-feeds': lambda: pdb.fetch_ats_feeds(pdb.ATS_FEEDS_LIMIT),
+            'companies-db': lambda: pdb.fetch_companies_from_db(pdb.COMPANIES_JOBS_LIMIT),
+            'brave-direct': lambda: pdb.fetch_brave_direct(150),
+            'remotive': lambda: pdb.fetch_remotive(60),
+            'remoteok': lambda: pdb.fetch_remoteok(60),
+            'himalayas': lambda: pdb.fetch_himalayas(60),
+            'jobicy': lambda: pdb.fetch_jobicy(60),
+            'workingnomads': lambda: pdb.fetch_workingnomads(60),
+            'landingjobs': lambda: pdb.fetch_landingjobs(60),
+            'weworkremotely': lambda: pdb.fetch_weworkremotely(60),
+        }
+
+    def _save(self, name: str, future) -> List[dict]:
+        """Grava o resultado de uma fonte e devolve as vagas novas"""
+        try:
+            found = future.result() or []
+        except Exception as e:
+            logger.error(f"  {name}: ERRO - {e}")
+            found = []
+        self.stats['sources'][name] = len(found)
+        self.stats['input'] += len(found)
+        rows = [job_to_row(j) for j in found if j.get('id') and j.get('source_url')]
+        new_ids = db.save_fetched_jobs(rows)
+        self.stats['advanced'] += len(new_ids)
+        if self.owner and self.hold:
+            # seguem no fluxo deste processo; outro worker pode ter pego alguma antes
+            new_ids = db.lease_jobs(new_ids, self.owner, LEASE_SECONDS)
+        new_ids = set(new_ids)
+        return [
+            job_from_row({**row, 'raw_data': json.dumps(row['raw_data']),
+                          'status': 'pending', 'stage': self.produces})
+            for row in rows if row['id'] in new_ids
+        ]
+
+    def stream(self, jobs: Iterable[dict] = (), flush_every: int = 1) -> Iterator[dict]:
+        """
+        Vagas novas de cada fonte assim que ela termina. Se o consumidor parar
+        antes, as fontes restantes ainda são gravadas (ficam em 'fetched').
+        """
+        self.stats = {'input': 0, 'advanced': 0, 'rejected': 0, 'retry': 0, 'sources': {}}
+        client = pdb.reset_brave_client()
+        pool = ThreadPoolExecutor(max_workers=max(1, FETCH_WORKERS))
+        futures = {pool.submit(fn): name for name, fn in self.sources().items()}
+        pending = set(futures)
+        try:
+            for future in as_completed(futures):
+                pending.discard(future)
+                yield from self._save(futures[future], future)
+        finally:
+            for future in pending:
+                self._save(futures[future], future)
+            pool.shutdown(wait=True)
+            logger.info(f"Coletadas: {self.stats['input']} ({self.stats['advanced']} novas)"
+                        f" — por fonte: {self.stats['sources']}")
+            logger.info(f"Brave requests: {client.requests}/{client.budget}"
+                        f" (hoje: {brave_planner.daily_spent()}/{client.daily_budget})"
+                        f"{' (cota esgotada)' if client.quota_exceeded else ''}")
+
+    def run(self) -> dict:
+        for _job in self.stream():
+            pass
+        return self.stats
+
+
+class FilterStage(Stage):
+    """Pré-filtro sem rede: termos de rejeição, geografia e idade da vaga"""
+
+    name = "filter"
+    consumes = "fetched"
+    produces = "filtered"
+    limit = 2000
+
+    def process(self, job: dict) -> Optional[dict]:
+        reason = quick_reject_check(job)
+        if reason:
+            raise Reject(reason)
+        if not pdb.is_allowed_geo(str(job.get('location') or ''), str(job.get('description') or '')):
+            raise Reject("geo")
+        if not pdb.is_recent(job.get('posted_at'), hours=pdb.MAX_AGE_HOURS):
+            raise Reject("antiga")
+        return {}
+
+
+class ResolveStage(Stage):
+    """Link direto/oficial da vaga (rede, em paralelo, com orçamento de tempo)"""
+
+    name = "resolve"
+    consumes = "filtered"
+    produces = "resolved"
+    limit = 300
+    workers = pdb.PHASE3_WORKERS
+    time_budget = pdb.PHASE3_TIME_BUDGET
+
+    def load(self, limit: Optional[int] = None) -> List[dict]:
+        return sorted(super().load(limit), key=_priority)
+
+    def start(self) -> None:
+        self.limits = pdb._Phase3Limits(self.deadline)
+        self.claimed = {}
+        self.claim_lock = threading.Lock()
+
+    def process(self, job: dict) -> Optional[dict]:
+        if self.limits.out_of_time():
+            return None
+        rec = pdb.resolve_candidate(job, self.limits, enrich=False)
+        if rec['status'] != 'ok':
+            if rec['reason'] in pdb.PHASE3_TRANSIENT:
+                return None
+            raise Reject(rec['reason'])
+        fields = dict(rec['fields'])
+        fields['direct_url'] = job_keys.canonical_url(fields.get('direct_url') or rec['url'])
+        # mesma vaga por outra fonte: só a primeira segue para enrich/LLM
+        if db.find_job_by_url(fields['direct_url'], exclude_id=job['id']):
+            raise Reject("duplicada")
+        with self.claim_lock:
+            owner = self.claimed.setdefault(fields['direct_url'], job['id'])
+        if owner != job['id']:
+            raise Reject("duplicada")
+        return _columns(job, fields)
+
+
+class EnrichStage(Stage):
+    """Dados completos pelo board do ATS + dedupe contra o histórico postado"""
+
+    name = "enrich"
+    consumes = "resolved"
+    produces = "enriched"
+    limit = 300
+    workers = pdb.PHASE3_WORKERS
+
+    def start(self) -> None:
+        imported = dedupe_index.migrate_legacy()
+        if imported:
+            logger.info(f"Histórico antigo importado no índice de dedupe: {imported}")
+
+    def load(self, limit: Optional[int] = None) -> List[dict]:
+        jobs = super().load(limit)
+        # busca cada board Greenhouse/Lever uma vez só, antes do enriquecimento
+        # (no fluxo, as vagas novas usam o cache de boards do ats_boards)
+        boards = ats_boards.prefetch_boards(j.get('direct_url') or '' for j in jobs)
+        logger.info(f"Boards ATS pré-carregados: {boards}")
+        return jobs
+
+    def process(self, job: dict) -> Optional[dict]:
+        if dedupe_index.seen_url(job.get('direct_url')):
+            raise Reject("ja_postada")
+        reason = pdb.enrich_candidate(job)
+        if reason:
+            raise Reject(reason)
+        if dedupe_index.seen_company(job.get('company')):
+            raise Reject("empresa_ja_postada")
+        return _columns(job, {k: job.get(k) for k in pdb.PHASE3_FIELDS if job.get(k) is not None})
+
+
+class ClassifyStage(Stage):
+    """
+    Análise com LLM. Aprovadas entram na fila de posting (FREE/PAID) com a mesma análise.
+
+    - analyzer "batch": micro-lotes de LLM_CHUNK_SIZE (LLM_DAILY_LIMIT chamadas/dia),
+      aprovação por is_approved (lote diário)
+    - analyzer "job": job_analyzer.analyze_job vaga a vaga (até JOB_ANALYZER_LIMIT
+      por execução, GEMINI_DELAY entre chamadas), aprovação por `aprovada` (app.py)
+    """
+
+    name = "classify"
+    consumes = "enriched"
+    produces = "classified"
+    limit = 300
+    newest_first = True
+    analyzer = "batch"
+
+    def picker(self) -> Callable[[dict], bool]:
+        """Filtro incremental: uma vaga por empresa e teto de ATS ("job": só JOB_ANALYZER_LIMIT)"""
+        if self.analyzer == "job":
+            counts = {'picked': 0}
+
+            def accept_job(job: dict) -> bool:
+                counts['picked'] += 1
+                return counts['picked'] <= JOB_ANALYZER_LIMIT
+
+            return accept_job
+        max_ats_ratio = float(os.environ.get("ATS_MAX_RATIO", "0.4") or "0.4")
+        max_ats_count = int(os.environ.get("ATS_MAX_COUNT", "6") or "6")
+        min_allow = int(os.environ.get("ATS_MIN_ALLOW", "5") or "5")
+        companies_run = set()
+        counts = {'picked': 0, 'ats': 0}
+
+        def accept(job: dict) -> bool:
+            if counts['picked'] >= pdb.PHASE3_MAX_CANDIDATES:
+                return False
+            company_key = (job.get('company') or '').strip().lower()
+            if company_key in companies_run:
+                return False
+            direct_url = job.get('direct_url') or ''
+            is_ats = bool(direct_url) and pdb.is_ats_url(direct_url)
+            if is_ats and counts['picked'] >= min_allow:
+                projected = (counts['ats'] + 1) / max(1, counts['picked'] + 1)
+                if counts['ats'] >= max_ats_count or projected > max_ats_ratio:
+                    return False
+            companies_run.add(company_key)
+            counts['picked'] += 1
+            counts['ats'] += int(is_ats)
+            return True
+
+        return accept
+
+    def pick(self, jobs: List[dict]) -> List[dict]:
+        """Vagas escolhidas para o LLM (ordem de prioridade)"""
+        accept = self.picker()
+        return [job for job in sorted(jobs, key=_priority) if accept(job)]
+
+    def stream(self, jobs: Iterable[dict], flush_every: int = 1) -> Iterator[dict]:
+        """Dispara um micro-lote no LLM assim que LLM_CHUNK_SIZE vagas escolhidas chegam"""
+        self.stats = {'input': 0, 'advanced': 0, 'rejected': 0, 'retry': 0}
+        self.usage = pdb.load_llm_usage()
+        self.approved_queries = []
+        self.stopped = False
+        if self.analyzer == "batch" and pdb.LLM_DAILY_LIMIT <= 0:
+            logger.info("LLM desativado (LLM_DAILY_LIMIT=0)")
+            self.stopped = True
+        accept = self.picker()
+        chunk = []
+        try:
+            for job in jobs:
+                if not accept(job):
+                    continue
+                self.stats['input'] += 1
+                chunk.append(job)
+                if len(chunk) >= LLM_CHUNK_SIZE:
+                    yield from self.classify_chunk(chunk)
+                    chunk = []
+            if chunk:
+                yield from self.classify_chunk(chunk)
+        finally:
+            brave_planner.record_outcome("approved", self.approved_queries)
+            s = self.stats
+            s['retry'] = s['input'] - s['advanced'] - s['rejected']
+            logger.info(f"Aprovadas (LLM, {self.analyzer}): {s['advanced']} / {s['advanced'] + s['rejected']}")
+
+    def analyze(self, chunk: List[dict]) -> List[tuple]:
+        """[(vaga, análise, aprovada)]; vagas sem resultado ficam para a próxima execução"""
+        if self.analyzer == "job":
+            out = []
+            for job in chunk:
+                try:
+                    result = analyze_job(job)
+                except Exception as e:
+                    logger.error(f"  Erro: {job.get('id')} - {e}")
+                    continue
+                if not result:
+                    logger.warning(f"  Falha na análise: {(job.get('title') or 'N/A')[:40]}")
+                    continue
+                out.append((job, result, bool(result.get('aprovada'))))
+                time.sleep(GEMINI_DELAY)  # rate limiting
+            return out
+        # outros processos também gastam a cota do dia
+        self.usage = pdb.load_llm_usage()
+        if self.usage["count"] >= pdb.LLM_DAILY_LIMIT:
+            logger.info("Limite diário de LLM atingido; parando análise.")
+            self.stopped = True
+            return []
+        try:
+            results = pdb.call_gemini(pdb.build_llm_payload(chunk), len(chunk))
+        except Exception as e:
+            logger.warning(f"Erro LLM ({len(chunk)} vagas): {e}")
+            return []
+        self.usage = _count_llm_call()
+        out = []
+        for job, res in zip(chunk, results):
+            if isinstance(res, dict):
+                analysis = build_analysis(job, res)
+                out.append((job, analysis, is_approved(analysis)))
+        return out
+
+    def classify_chunk(self, chunk: List[dict]) -> Iterator[dict]:
+        """Analisa o micro-lote; grava a análise e coloca as aprovadas na fila"""
+        from telegram_poster import render_job
+
+        if self.stopped:
+            return
+        updates, approved_jobs = [], []
+        for job, analysis, approved in self.analyze(chunk):
+            updates.append((job['id'], {
+                'analysis_result': json.dumps(analysis, ensure_ascii=False),
+                'analyzed_at': datetime.now().isoformat(),
+                'status': 'approved' if approved else 'rejected',
+                'category': analysis.get('categoria'),
+                'accepts_international': analysis.get('accepts_international'),
+            }))
+            if approved:
+                # texto dos posts renderizado agora; a postagem só lê e envia
+                render = render_job({**job, 'analysis_result': updates[-1][1]['analysis_result']})
+                db.add_to_queue(job['id'], analysis.get('is_high_salary', False), render=render)
+                job['analysis'] = analysis
+                approved_jobs.append(job)
+                self.approved_queries.append(job.get('brave_query'))
+        db.advance_jobs(self.produces, updates, self.owner, self.hold, LEASE_SECONDS, self.consumes)
+        self.stats['advanced'] += len(approved_jobs)
+        self.stats['rejected'] += len(updates) - len(approved_jobs)
+        yield from approved_jobs
+
+    def run(self) -> dict:
+        for _job in self.stream(self.pick(self.load())):
+            pass
+        return self.stats
+
+
+def _count_llm_call() -> dict:
+    """Soma uma chamada ao uso diário do LLM (com lock: vários processos no mesmo arquivo)"""
+    with open(f"{pdb.LLM_USAGE_PATH}.lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        usage = pdb.load_llm_usage()
+        usage["count"] += 1
+        pdb.save_llm_usage(usage)
+    return usage
+
+
+def build_analysis(job: dict, res: dict) -> dict:
+    """
+    Resultado do LLM do lote diário + campos usados pelo telegram_poster
+    (titulo_pt, is_high_salary, accepts_international, categoria).
+    """
+    analysis = dict(res)
+    # força empresa a partir do dado real
+    analysis["empresa"] = job.get("company") or analysis.get("empresa")
+    if not analysis.get("titulo"):
+        analysis["titulo"] = job.get("title")
+    if not analysis.get("pais") or "worldwide" in str(analysis.get("pais")).lower():
+        inferred = pdb.infer_country_from_location(pdb.normalize_location(job.get("location")))
+        if inferred:
+            analysis["pais"] = inferred
+    analysis.setdefault("titulo_pt", analysis.get("titulo"))
+    analysis.setdefault("categoria", analysis.get("setor"))
+    analysis.setdefault("accepts_international", analysis.get("internacional_ok"))
+    try:
+        monthly = float(analysis.get("salario_mensal") or 0)
+    except (TypeError, ValueError):
+        monthly = 0.0
+    usd = monthly * USD_RATES.get(str(analysis.get("moeda") or "USD").upper(), 1.0)
+    if usd and not analysis.get("salario_estimado_usd_mes"):
+        analysis["salario_estimado_usd_mes"] = int(round(usd))
+    analysis.setdefault("is_high_salary", usd > SALARY_HIGH_THRESHOLD)
+    return analysis
+
+
+def is_approved(analysis: dict) -> bool:
+    if analysis.get("aprovada") is False:
+        return False
+    if analysis.get("internacional_ok") is False:
+        return False
+    return pdb.llm_country_allowed(analysis.get("pais"))
+
+
+class SelectStage(Stage):
+    """Escolhe o lote diário diverso entre as aprovadas ainda não usadas"""
+
+    name = "select"
+    consumes = "classified"
+    produces = "selected"
+    limit = 500
+    newest_first = True
+
+    def run(self) -> dict:
+        jobs = [job_from_row(r) for r in db.get_jobs_at_stage(
+            self.consumes, self.limit, status='approved', newest_first=True, unposted=True)]
+        analyses = []
+        for idx, job in enumerate(jobs):
+            analysis = dict(job['analysis'])
+            analysis["job_index"] = idx
+            analyses.append(analysis)
+        target_size = int(os.environ.get("BATCH_SIZE", "20"))
+        batch = pdb.select_diverse_batch(analyses, size=target_size)
+        if not batch:
+            logger.info("Nenhum lote passou diversidade — usando fallback")
+            batch = pdb.pick_with_requirements(analyses, target_size)
+        selected = [jobs[a["job_index"]] for a in batch if isinstance(a.get("job_index"), int)]
+        db.advance_jobs(self.produces, [(j['id'], {}) for j in selected])
+        logger.info(f"Lote diário: {len(selected)} de {len(jobs)} aprovadas")
+        return {'input': len(jobs), 'advanced': len(selected), 'rejected': 0,
+                'retry': len(jobs) - len(selected)}
+
+
+class RenderStage(Stage):
+    """Grava o lote escolhido em batch_ready.json e o texto dos posts"""
+
+    name = "render"
+    consumes = "selected"
+    produces = "rendered"
+    limit = 500
+
+    def run(self) -> dict:
+        jobs = [j for j in self.load() if j.get('direct_url')]
+        # ordena para evitar links semelhantes em sequência
+        final = pdb.interleave_by_domain([_export(j) for j in jobs])
+
+        out = {
+            "generated_at": datetime.utcnow().isoformat() + "Z",
+            "count": len(final),
+            "items": final,
+        }
+        out_path = pdb.DATA_DIR / "batch_ready.json"
+        with open(out_path, "w") as f:
+            json.dump(out, f, ensure_ascii=False, indent=2)
+
+        posts_path = Path(os.environ.get("TELEGRAM_POSTS_PATH") or (pdb.DATA_DIR / "telegram_posts.txt"))
+        with open(posts_path, "w") as f:
+            for j in final:
+                f.write(pdb.format_post(j))
+                f.write("\n\n---\n\n")
+
+        db.advance_jobs(self.produces, [(j['id'], {}) for j in jobs])
+        logger.info(f"Prontas para revisão: {len(final)} — posts em {posts_path}")
+        return {'input': len(jobs), 'advanced': len(final), 'rejected': 0, 'retry': 0}
+
+
+class PostStage(Stage):
+    """Posta a fila nos canais FREE e PAID"""
+
+    name = "post"
+
+    def run(self) -> dict:
+        posted_free, posted_paid = asyncio.run(post_queued_jobs())
+        return {'input': posted_free + posted_paid, 'advanced': posted_free + posted_paid,
+                'rejected': 0, 'retry': 0, 'free': posted_free, 'paid': posted_paid}
+
+
+async def post_queued_jobs(sender=None):
+    """
+    Posta a fila em todos os canais em paralelo (respeita limites diários e proporção 75/25).
+    Com `sender`, reaproveita o TelegramSender (e os limites por chat) de quem chama.
+
+    Returns:
+        (postadas FREE, postadas PAID)
+    """
+    from telegram_poster import post_jobs_to_channels, posting_channels, refresh_renders
+
+    # Limpa fila expirada
+    db.cleanup_expired_queue()
+
+    # Reutiliza vagas não postadas (estado dos links vem do link_health, sem rede aqui)
+    requeue_stats = db.verify_and_requeue_unused_jobs()
+    logger.info(f"Reutilização: {requeue_stats['reused']} vagas OK, {requeue_stats['removed_dead_links']} links mortos removidos")
+
+    # Busca vagas para cada canal (FREE, PAID e extras)
+    jobs_by_channel = []
+    for channel in posting_channels():
+        jobs = db.get_jobs_for_posting(channel['type'], channel['limit'])
+        logger.info(f"Vagas para canal {channel['type'].upper()}: {len(jobs)}")
+        jobs_by_channel.append((channel, jobs))
+    # renders que faltam ou ficaram velhos (template novo, vaga alterada)
+    db.save_renders(refresh_renders([job for _, jobs in jobs_by_channel for job in jobs]))
+
+    posted = await post_jobs_to_channels(jobs_by_channel, sender)
+
+    db.mark_many_as_posted([
+        (job['id'], channel['type'], job.get('posted_channel', ''), job.get('posted_message_id'),
+         job.get('delivery'))
+        for channel, jobs in posted for job in jobs
+    ])
+    for channel, jobs in posted:
+        dedupe_index.add_jobs(jobs, source=channel['type'])
+    brave_planner.record_posted(job.get('direct_url') for _, jobs in posted for job in jobs)
+
+    counts = {channel['type']: len(jobs) for channel, jobs in posted}
+    logger.info("Postadas: " + ", ".join(f"{t.upper()}={n}" for t, n in counts.items()))
+    return counts.get('free', 0), counts.get('paid', 0)
+
+
+STAGES = {
+    cls.name: cls for cls in (
+        FetchStage, FilterStage, ResolveStage, EnrichStage,
+        ClassifyStage, SelectStage, RenderStage, PostStage,
+    )
+}
+
+
+# =============================================================================
+# EXECUÇÃO
+# =============================================================================
+
+@contextmanager
+def leases() -> Iterator[str]:
+    """
+    Dono dos leases de uma execução (host:pid:id). Renova os leases em segundo
+    plano enquanto roda e, no fim, devolve as vagas que não terminaram. Se o
+    processo morrer, os leases vencem em LEASE_SECONDS e outro processo retoma.
+    """
+    owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+    stop = threading.Event()
+
+    def heartbeat():
+        while not stop.wait(LEASE_SECONDS / 3):
+            try:
+                db.renew_leases(owner, LEASE_SECONDS)
+            except Exception as e:
+                logger.warning(f"Erro ao renovar leases: {e}")
+
+    thread = threading.Thread(target=heartbeat, name="lease-heartbeat", daemon=True)
+    thread.start()
+    try:
+        yield owner
+    finally:
+        stop.set()
+        thread.join()
+        released = db.release_jobs(owner)
+        if released:
+            logger.info(f"{released} vagas devolvidas (ficam para a próxima execução)")
+
+
+def _build_stage(name: str, analyzer: Optional[str] = None) -> Stage:
+    stage = STAGES[name]()
+    if analyzer and isinstance(stage, ClassifyStage):
+        if analyzer not in ANALYZERS:
+            raise ValueError(f"Analisador inválido: {analyzer} (use {', '.join(ANALYZERS)})")
+        stage.analyzer = analyzer
+    return stage
+
+
+def run_stage(name: str, owner: Optional[str] = None, analyzer: Optional[str] = None) -> dict:
+    if name not in STAGES:
+        raise ValueError(f"Estágio inválido: {name} (use {', '.join(STAGE_NAMES)})")
+    logger.info("=" * 60)
+    logger.info(f"ESTÁGIO: {name.upper()}")
+    logger.info("=" * 60)
+    start = time.time()
+    stage = _build_stage(name, analyzer)
+    stage.owner = owner
+    stats = stage.run()
+    stats['seconds'] = round(time.time() - start, 1)
+    logger.info(f"[{name}] {stats}")
+    return stats
+
+
+def run_stages(names=STAGE_NAMES, analyzer: Optional[str] = None) -> Dict[str, dict]:
+    """Roda os estágios em ordem; erro em um estágio não impede os seguintes"""
+    results = {}
+    with leases() as owner:
+        for name in names:
+            try:
+                results[name] = run_stage(name, owner, analyzer)
+            except Exception as e:
+                logger.error(f"[{name}] ERRO: {e}")
+                results[name] = {'error': str(e)}
+    return results
+
+
+def stream_stages(names=STAGE_NAMES, analyzer: Optional[str] = None) -> Dict[str, dict]:
+    """
+    Como run_stages, mas os estágios por vaga (fetch → classify) rodam como um
+    fluxo: cada fonte que termina já alimenta o filtro, o resolver, o enriquecimento
+    e os micro-lotes do LLM. Cada estágio puxa do anterior só quando tem vaga livre
+    (memória limitada) e grava cada vaga ao avançar, então parar no meio não perde nada.
+    Vagas paradas de execuções anteriores entram no fluxo antes das novas.
+    Os demais estágios (select, render, post) rodam depois, em lote.
+    `analyzer` escolhe o analisador do classify (ANALYZERS; padrão "batch").
+    """
+    names = list(names)
+    flow = [_build_stage(name, analyzer) for name in names if name in STREAM_STAGES]
+    results = {}
+    if flow:
+        logger.info("=" * 60)
+        logger.info(f"FLUXO: {' → '.join(stage.name.upper() for stage in flow)}")
+        logger.info("=" * 60)
+        start = time.time()
+        with leases() as owner:
+            jobs = iter(())
+            for stage in flow:
+                # vagas que avançam seguem com lease até o último estágio do fluxo
+                stage.owner, stage.hold = owner, stage is not flow[-1]
+                if isinstance(stage, FetchStage):
+                    jobs = stage.stream()
+                else:
+                    jobs = stage.stream(chain(stage.parked(), jobs))
+            try:
+                for _job in jobs:
+                    pass
+            except Exception as e:
+                logger.error(f"[fluxo] ERRO: {e}")
+                results['stream'] = {'error': str(e)}
+            finally:
+                jobs.close()
+        seconds = round(time.time() - start, 1)
+        for stage in flow:
+            stats = getattr(stage, 'stats', None) or {'input': 0, 'advanced': 0, 'rejected': 0, 'retry': 0}
+            stats['seconds'] = seconds
+            logger.info(f"[{stage.name}] {stats}")
+            results[stage.name] = stats
+    results.update(run_stages([name for name in names if name not in STREAM_STAGES], analyzer))
+    return results
+
+
+def run_daily_batch() -> Dict[str, dict]:
+    """Lote diário (prepare_daily_batch): coleta → ... → render, sem postar"""
+    logger.info(f"Brave token: {'OK' if pdb.brave_token() else 'MISSING'}")
+    # speed up resolver
+    try:
+        import link_resolver
+        link_resolver.REQUEST_DELAY = 0.5
+        link_resolver.REQUEST_TIMEOUT = 10
+    except Exception:
+        pass
+    results = stream_stages(BATCH_STAGES)
+    logger.info(f"Pipeline: {db.get_stage_counts()}")
+    return results
+
+
+def run_worker(names=STREAM_STAGES[1:], idle_seconds: float = WORKER_IDLE_SECONDS,
+               analyzer: Optional[str] = None) -> None:
+    """
+    Worker: roda os estágios por vaga (filter → classify) em fluxo, sem parar,
+    sobre as vagas paradas no banco; sem vagas, espera `idle_seconds`. Vários
+    workers (processos ou máquinas com o mesmo jobs.db) dividem as vagas pelos leases.
+    """
+    names = [name for name in names if name in STREAM_STAGES[1:]]
+    if not names:
+        raise ValueError(f"Worker roda só estágios por vaga ({', '.join(STREAM_STAGES[1:])})")
+    logger.info(f"Worker {os.getpid()}: {' → '.join(names)}")
+    try:
+        while True:
+            results = stream_stages(names, analyzer)
+            if not any(stats.get('input') for stats in results.values()):
+                time.sleep(idle_seconds)
+    except KeyboardInterrupt:
+        logger.info(f"Worker {os.getpid()} encerrado")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pipeline por estágios sobre jobs.db")
+    parser.add_argument("--stages", default=",".join(STAGE_NAMES),
+                        help=f"estágios separados por vírgula ({','.join(STAGE_NAMES)})")
+    parser.add_argument("--batch", action="store_true",
+                        help="roda um estágio por vez sobre o banco (sem fluxo)")
+    parser.add_argument("--worker", action="store_true",
+                        help="roda filter → classify sem parar, dividindo as vagas com outros workers")
+    parser.add_argument("--processes", type=int, default=1,
+                        help="workers em processos separados (com --worker)")
+    parser.add_argument("--analyzer", choices=ANALYZERS, default=None,
+                        help="analisador do classify (padrão: batch; o app.py usa job)")
+    args = parser.parse_args()
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s [%(levelname)s] %(name)s: %(message)s',
+        datefmt='%Y-%m-%d %H:%M:%S'
+    )
+    pdb.load_env()
+    names = [s.strip() for s in args.stages.split(",") if s.strip()]
+    if args.worker:
+        if names == list(STAGE_NAMES):
+            names = list(STREAM_STAGES[1:])
+        for _ in range(args.processes - 1):
+            multiprocessing.Process(target=run_worker, args=(names, WORKER_IDLE_SECONDS, args.analyzer),
+                                    daemon=True).start()
+        run_worker(names, analyzer=args.analyzer)
+    elif args.batch:
+        run_stages(names, args.analyzer)
+    else:
+        stream_stages(names, args.analyzer)
+
+
+if __name__ == "__main__":
+    main()
@@ -12,7 +12,7 @@ import json
 import os
 import sys
 
-import requests
+from telegram_sender import send_message_sync
 
 
 def get_required_env(name: str) -> str:
@@ -65,18 +65,10 @@ def main():
 
     msg = f"VAGA REMOTA\n\n{title}\n{company}\n\nAPLICAR: {url}"
 
-    resp = requests.post(
-        f"https://api.telegram.org/bot{token}/sendMessage",
-        json={
-            "chat_id": int(group_id),
-            "text": msg,
-            "disable_web_page_preview": True,
-        },
-        timeout=15,
-    )
-
-    if not resp.ok:
-        print(f"ERRO Telegram: {resp.status_code} - {resp.text}")
+    result = send_message_sync(token, int(group_id), msg)
+
+    if not result["ok"]:
+        print(f"ERRO Telegram: {result['error']}")
         sys.exit(1)
 
     print(f"OK: Vaga {idx} postada ({title[:40]}...)")
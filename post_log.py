@@ -0,0 +1,339 @@
+"""
+Job Curator Bot - Post Log
+Fila de posts do post_next.py / post_next_paid.py sem reler nem reescrever
+telegram_posts.txt a cada tick do cron.
+
+Arquivos (em data/):
+- posts.log            registros [tamanho u32][texto UTF-8], só cresce (append-only)
+- posts.idx            offset u64 de cada post no posts.log (post n → idx[n])
+- posts_{fila}.order   ordem de postagem da fila: números de post u32
+- ponteiro da fila     JSON {"index": n} (post_queue.json / post_queue_paid.json),
+                       gravado de forma atômica (temp + fsync + rename)
+
+Ler o próximo post é O(1) via mmap. A ordem já evita o mesmo domínio base em
+sequência (jobs.lever.co → lever.co): cada lote acrescentado é intercalado por
+domínio na hora do append, continuando do último post de cada fila, então o
+tick do cron só lê a posição do ponteiro. Na primeira abertura,
+telegram_posts.txt é importado (mesma ordem, os ponteiros atuais continuam valendo).
+
+Uso:
+- post_next.py / post_next_paid.py (leitura), weekly_collect.sh / run_paid.sh (append)
+- Standalone: python3 post_log.py [--append ARQUIVO] [--show N]
+"""
+import argparse
+import fcntl
+import heapq
+import json
+import mmap
+import os
+import struct
+import urllib.parse
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+DATA_DIR = Path(__file__).parent / "data"
+LEGACY_POSTS_PATH = DATA_DIR / "telegram_posts.txt"
+POST_SEPARATOR = "\n\n---\n\n"
+QUEUES = ("free", "paid")
+
+_LEN = struct.Struct(">I")
+_OFFSET = struct.Struct(">Q")
+_SLOT = struct.Struct(">I")
+
+
+def split_posts(text: str) -> List[str]:
+    """Blocos de um arquivo no formato de telegram_posts.txt"""
+    return [p.strip() for p in text.split(POST_SEPARATOR) if p.strip()]
+
+
+def post_domain(post_text: str) -> str:
+    """Domínio base do link do post (linha 'APLICAR:' ou primeira URL): jobs.lever.co → lever.co"""
+    url = ""
+    for line in post_text.splitlines():
+        line = line.strip()
+        if line.lower().startswith("aplicar:"):
+            url = line.split(":", 1)[1].strip()
+            break
+    else:
+        url = next((t for t in post_text.split() if t.startswith(("http://", "https://"))), "")
+    try:
+        host = (urllib.parse.urlparse(url).hostname or "").lower()
+    except ValueError:
+        host = ""
+    return ".".join(host.split(".")[-2:])
+
+
+def interleave(posts: List[tuple], prev_domain: str = "") -> List[int]:
+    """
+    Ordem dos posts (número, domínio) sem o mesmo domínio em sequência quando possível.
+    Heap pelo domínio com mais posts restantes (o mais frequente sai primeiro,
+    senão sobra no fim); empates mantêm a ordem de chegada. prev_domain é o
+    domínio do último post já na fila.
+    """
+    groups = {}
+    for number, domain in posts:
+        # post sem link não conflita com nenhum outro
+        groups.setdefault(domain or f"#{number}", deque()).append(number)
+    heap = [(-len(q), i, domain) for i, (domain, q) in enumerate(groups.items())]
+    heapq.heapify(heap)
+    order = []
+    while heap:
+        entry = heapq.heappop(heap)
+        if entry[2] == prev_domain and heap:
+            entry = heapq.heapreplace(heap, entry)
+        count, i, domain = entry
+        order.append(groups[domain].popleft())
+        if count + 1:
+            heapq.heappush(heap, (count + 1, i, domain))
+        prev_domain = domain
+    return order
+
+
+def _fsync_dir(path: Path) -> None:
+    try:
+        fd = os.open(str(path), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def atomic_write_json(path: Path, data) -> None:
+    """Grava JSON de forma atômica: arquivo temporário + fsync + rename"""
+    path = Path(path)
+    tmp = path.with_name(f".{path.name}.tmp")
+    with open(tmp, "w") as f:
+        json.dump(data, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    _fsync_dir(path.parent)
+
+
+def _read_slots(path: Path) -> List[int]:
+    if not path.exists():
+        return []
+    data = path.read_bytes()
+    usable = len(data) - len(data) % _SLOT.size
+    return [n for (n,) in _SLOT.iter_unpack(data[:usable])]
+
+
+class PostLog:
+    """Log de posts append-only com índice de offsets e ordem por fila"""
+
+    def __init__(self, data_dir: Path = DATA_DIR, legacy_path: Optional[Path] = LEGACY_POSTS_PATH):
+        self.data_dir = Path(data_dir)
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+        self.log_path = self.data_dir / "posts.log"
+        self.idx_path = self.data_dir / "posts.idx"
+        self.lock_path = self.data_dir / "posts.lock"
+        self._log_map = None
+        self._idx_map = None
+        with self._locked():
+            self._recover()
+            if legacy_path and len(self) == 0 and Path(legacy_path).exists():
+                self._append(split_posts(Path(legacy_path).read_text(errors="ignore")), ordered=False)
+
+    # ------------------------------------------------------------------
+    # Arquivos
+    # ------------------------------------------------------------------
+
+    @contextmanager
+    def _locked(self):
+        """Lock exclusivo entre processos para appends e mudanças de ordem"""
+        with open(self.lock_path, "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def order_path(self, queue: str) -> Path:
+        return self.data_dir / f"posts_{queue}.order"
+
+    def _close_maps(self) -> None:
+        for m in (self._log_map, self._idx_map):
+            if m is not None:
+                m.close()
+        self._log_map = self._idx_map = None
+
+    def _maps(self):
+        """mmap (somente leitura) do log e do índice; refeito se os arquivos cresceram"""
+        log_size = self.log_path.stat().st_size if self.log_path.exists() else 0
+        idx_size = self.idx_path.stat().st_size if self.idx_path.exists() else 0
+        if self._log_map is None or len(self._log_map) != log_size or len(self._idx_map) != idx_size:
+            self._close_maps()
+            if not log_size or not idx_size:
+                return None, None
+            with open(self.log_path, "rb") as f:
+                self._log_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            with open(self.idx_path, "rb") as f:
+                self._idx_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._log_map, self._idx_map
+
+    def _recover(self) -> None:
+        """
+        Acerta o índice depois de uma queda no meio de um append: indexa registros
+        completos que ficaram sem offset e descarta um registro cortado no fim.
+        """
+        if not self.log_path.exists():
+            return
+        log_size = self.log_path.stat().st_size
+        offsets = [o for (o,) in _OFFSET.iter_unpack(self._read_idx_bytes())]
+        pos = 0
+        if offsets:
+            with open(self.log_path, "rb") as f:
+                f.seek(offsets[-1])
+                head = f.read(_LEN.size)
+            pos = offsets[-1] + _LEN.size + _LEN.unpack(head)[0] if len(head) == _LEN.size else offsets[-1]
+        missing = []
+        with open(self.log_path, "rb") as f:
+            while pos + _LEN.size <= log_size:
+                f.seek(pos)
+                (length,) = _LEN.unpack(f.read(_LEN.size))
+                if pos + _LEN.size + length > log_size:
+                    break
+                missing.append(pos)
+                pos += _LEN.size + length
+        if pos < log_size:
+            with open(self.log_path, "r+b") as f:
+                f.truncate(pos)
+        if missing:
+            with open(self.idx_path, "ab") as f:
+                f.write(b"".join(_OFFSET.pack(o) for o in missing))
+                f.flush()
+                os.fsync(f.fileno())
+        # ordens das filas cobrem todos os posts
+        total = len(offsets) + len(missing)
+        for queue in QUEUES:
+            known = len(_read_slots(self.order_path(queue)))
+            if known < total:
+                self._extend_order(queue, range(known, total))
+
+    def _read_idx_bytes(self) -> bytes:
+        if not self.idx_path.exists():
+            return b""
+        data = self.idx_path.read_bytes()
+        return data[:len(data) - len(data) % _OFFSET.size]
+
+    # ------------------------------------------------------------------
+    # Leitura
+    # ------------------------------------------------------------------
+
+    def __len__(self) -> int:
+        size = self.idx_path.stat().st_size if self.idx_path.exists() else 0
+        return size // _OFFSET.size
+
+    def read(self, n: int) -> str:
+        """Texto do post n (O(1): um offset no índice + um registro no log)"""
+        log_map, idx_map = self._maps()
+        if log_map is None or n < 0 or (n + 1) * _OFFSET.size > len(idx_map):
+            raise IndexError(f"Post {n} não existe")
+        (offset,) = _OFFSET.unpack_from(idx_map, n * _OFFSET.size)
+        (length,) = _LEN.unpack_from(log_map, offset)
+        start = offset + _LEN.size
+        return log_map[start:start + length].decode("utf-8")
+
+    def order(self, queue: str) -> "QueueOrder":
+        return QueueOrder(self, queue)
+
+    # ------------------------------------------------------------------
+    # Escrita
+    # ------------------------------------------------------------------
+
+    def _append(self, posts: Iterable[str], ordered: bool = True) -> List[int]:
+        posts = [p.strip() for p in posts if p and p.strip()]
+        if not posts:
+            return []
+        first = len(self)
+        offsets = []
+        with open(self.log_path, "ab") as f:
+            pos = f.tell()
+            for text in posts:
+                data = text.encode("utf-8")
+                f.write(_LEN.pack(len(data)) + data)
+                offsets.append(pos)
+                pos += _LEN.size + len(data)
+            f.flush()
+            os.fsync(f.fileno())
+        # só depois do log gravado: índice (uma queda aqui é refeita no _recover)
+        with open(self.idx_path, "ab") as f:
+            f.write(b"".join(_OFFSET.pack(o) for o in offsets))
+            f.flush()
+            os.fsync(f.fileno())
+        numbers = list(range(first, first + len(posts)))
+        domains = [post_domain(text) for text in posts]
+        for queue in QUEUES:
+            if ordered:
+                order = self.order(queue)
+                prev = post_domain(order.text(len(order) - 1)) if len(order) else ""
+                self._extend_order(queue, interleave(list(zip(numbers, domains)), prev))
+            else:
+                self._extend_order(queue, numbers)
+        return numbers
+
+    def append(self, posts: Iterable[str]) -> List[int]:
+        """Acrescenta posts no fim do log e, intercalados por domínio, no fim da ordem de cada fila"""
+        with self._locked():
+            self._recover()
+            return self._append(posts)
+
+    def _extend_order(self, queue: str, numbers: Iterable[int]) -> None:
+        data = b"".join(_SLOT.pack(n) for n in numbers)
+        if not data:
+            return
+        with open(self.order_path(queue), "ab") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+
+
+class QueueOrder:
+    """Ordem de postagem de uma fila (posição → número do post), só cresce"""
+
+    def __init__(self, log: PostLog, queue: str):
+        self.log = log
+        self.queue = queue
+        self.path = log.order_path(queue)
+
+    def __len__(self) -> int:
+        size = self.path.stat().st_size if self.path.exists() else 0
+        return size // _SLOT.size
+
+    def __getitem__(self, position: int) -> int:
+        if position < 0 or position >= len(self):
+            raise IndexError(position)
+        with open(self.path, "rb") as f:
+            f.seek(position * _SLOT.size)
+            return _SLOT.unpack(f.read(_SLOT.size))[0]
+
+    def text(self, position: int) -> str:
+        """Texto do post na posição da fila"""
+        return self.log.read(self[position])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Log de posts (fila do post_next)")
+    parser.add_argument("--append", metavar="ARQUIVO", help="acrescenta os posts de um arquivo no formato telegram_posts.txt")
+    parser.add_argument("--show", type=int, metavar="N", help="mostra o post na posição N da fila")
+    parser.add_argument("--queue", default="free", choices=QUEUES)
+    args = parser.parse_args()
+    # com --append o arquivo é um lote novo, não o histórico a importar
+    log = PostLog(legacy_path=None if args.append else LEGACY_POSTS_PATH)
+    if args.append:
+        path = Path(args.append)
+        added = log.append(split_posts(path.read_text(errors="ignore"))) if path.exists() else []
+        print(f"Posts acrescentados: {len(added)}")
+    if args.show is not None:
+        print(log.order(args.queue).text(args.show))
+    print(f"Posts no log: {len(log)} | fila {args.queue}: {len(log.order(args.queue))}")
+
+
+if __name__ == "__main__":
+    main()
@@ -12,16 +12,15 @@ import argparse
 import json
 import os
 from pathlib import Path
-import requests
-import subprocess
-import time
-import urllib.parse
-import urllib.request
+
+from post_log import PostLog, atomic_write_json
+from telegram_sender import send_message_sync
 
 
 DATA_DIR = Path(__file__).parent / "data"
 QUEUE_PATH = DATA_DIR / "post_queue_paid.json"  # Fila separada do FREE
 POSTS_PATH = DATA_DIR / "telegram_posts.txt"     # Usa mesma fonte de posts
+POST_QUEUE = "paid"  # ordem própria em data/posts_paid.order
 FAIL_STATE_PATH = DATA_DIR / "post_failures_paid.json"
 PAUSE_FLAG_PATH = DATA_DIR / "posting_paused_paid.json"
 
@@ -59,70 +58,12 @@ def load_queue():
 
 
 def save_queue(data):
-    with open(QUEUE_PATH, "w") as f:
-        json.dump(data, f)
+    atomic_write_json(QUEUE_PATH, data)
 
 
 def load_posts():
-    if not POSTS_PATH.exists():
-        return []
-    text = POSTS_PATH.read_text()
-    parts = [p.strip() for p in text.split("\n\n---\n\n") if p.strip()]
-    return parts
-
-
-def save_posts(posts):
-    text = "\n\n---\n\n".join(posts) + "\n"
-    POSTS_PATH.write_text(text)
-
-
-def extract_domain(post_text: str):
-    for line in post_text.splitlines():
-        line = line.strip()
-        if line.lower().startswith("aplicar:"):
-            url = line.split(":", 1)[1].strip()
-            try:
-                host = urllib.parse.urlparse(url).hostname or ""
-            except Exception:
-                host = ""
-            return host.lower()
-    for token in post_text.split():
-        if token.startswith("http://") or token.startswith("https://"):
-            try:
-                host = urllib.parse.urlparse(token).hostname or ""
-            except Exception:
-                host = ""
-            return host.lower()
-    return ""
-
-
-def _send_via_requests(url: str, payload: dict):
-    last_err = None
-    for attempt in range(3):
-        try:
-            r = requests.post(url, json=payload, timeout=15)
-            if not r.ok:
-                raise RuntimeError(f"Telegram error {r.status_code}: {r.text[:200]}")
-            return
-        except Exception as e:
-            last_err = e
-            time.sleep(1.5 * (attempt + 1))
-    raise RuntimeError(f"requests_failed: {last_err}")
-
-
-def _send_via_urllib(url: str, payload: dict):
-    data = urllib.parse.urlencode(payload).encode("utf-8")
-    req = urllib.request.Request(url, data=data, method="POST")
-    with urllib.request.urlopen(req, timeout=20) as resp:
-        resp.read()
-
-
-def _send_via_curl(url: str, payload: dict):
-    data = urllib.parse.urlencode(payload)
-    cmd = ["curl", "-sS", "-X", "POST", "-d", data, url]
-    res = subprocess.run(cmd, capture_output=True, text=True)
-    if res.returncode != 0:
-        raise RuntimeError(f"curl_failed: {res.stderr.strip()[:200]}")
+    """Ordem de postagem da fila (já intercalada por domínio) sobre o log de posts"""
+    return PostLog(DATA_DIR, POSTS_PATH).order(POST_QUEUE)
 
 
 def send_telegram(text: str):
@@ -133,20 +74,9 @@ def send_telegram(text: str):
     if not token or not chat_id:
         raise RuntimeError("TELEGRAM_TOKEN_PAID/TELEGRAM_CHANNEL_PAID não configurados. Configure no .env ou .env.paid")
     
-    url = f"https://api.telegram.org/bot{token}/sendMessage"
-    payload = {"chat_id": chat_id, "text": text, "disable_web_page_preview": True}
-    
-    try:
-        _send_via_requests(url, payload)
-        return
-    except Exception:
-        pass
-    try:
-        _send_via_urllib(url, payload)
-        return
-    except Exception:
-        pass
-    _send_via_curl(url, payload)
+    result = send_message_sync(token, chat_id, text)
+    if not result["ok"]:
+        raise RuntimeError(f"Telegram error {result['error']} ({result['attempts']} tentativas)")
 
 
 def get_alert_config():
@@ -165,24 +95,9 @@ def send_alert(message: str):
     if str(chat_id).startswith("-100"):
         print("ALERTA: chat_id aponta para grupo/canal; ignorado")
         return
-    url = f"https://api.telegram.org/bot{token}/sendMessage"
-    payload = {"chat_id": chat_id, "text": f"⚠️ ALERTA VAGAS PAGO: {message}", "disable_web_page_preview": True}
-    try:
-        _send_via_requests(url, payload)
-        return
-    except Exception as e:
-        last_err = e
-    try:
-        _send_via_urllib(url, payload)
-        return
-    except Exception as e:
-        last_err = e
-    try:
-        _send_via_curl(url, payload)
-        return
-    except Exception as e:
-        last_err = e
-    print(f"ALERTA: falha ao enviar alerta: {last_err}")
+    result = send_message_sync(token, chat_id, f"⚠️ ALERTA VAGAS PAGO: {message}")
+    if not result["ok"]:
+        print(f"ALERTA: falha ao enviar alerta: {result['error']}")
 
 
 def load_fail_state():
@@ -196,8 +111,7 @@ def load_fail_state():
 
 
 def save_fail_state(state):
-    with open(FAIL_STATE_PATH, "w") as f:
-        json.dump(state, f)
+    atomic_write_json(FAIL_STATE_PATH, state)
 
 
 def pause_posting(reason: str):
@@ -208,6 +122,15 @@ def pause_posting(reason: str):
     print("Postagens PAGO pausadas.")
 
 
+def record_posted(text: str):
+    """Conta o post no funil do Brave (brave_query_stats.posted); nunca impede a postagem"""
+    try:
+        import brave_planner
+        brave_planner.record_posted_text(text)
+    except Exception as e:
+        print(f"Aviso: funil do Brave não atualizado: {e}")
+
+
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--alert-test", action="store_true")
@@ -237,40 +160,14 @@ def main():
         print("Fila PAGO concluída.")
         return
     
-    # Evita links com o mesmo domínio em sequência (melhorado)
-    prev_domain = extract_domain(posts[idx - 1]) if idx > 0 else ""
-    curr_domain = extract_domain(posts[idx])
-    
-    # Também evita mesmo domínio base (ex: jobs.lever.co → lever.co)
-    def base_domain(d):
-        parts = d.split('.')
-        if len(parts) >= 2:
-            return '.'.join(parts[-2:])
-        return d
-    
-    prev_base = base_domain(prev_domain)
-    curr_base = base_domain(curr_domain)
-    
-    if prev_base and curr_base and prev_base == curr_base:
-        swap_idx = None
-        for j in range(idx + 1, len(posts)):
-            next_domain = extract_domain(posts[j])
-            next_base = base_domain(next_domain)
-            if next_base and next_base != prev_base:
-                swap_idx = j
-                break
-        if swap_idx is not None:
-            posts[idx], posts[swap_idx] = posts[swap_idx], posts[idx]
-            save_posts(posts)
-            print(f"[SWAP] Evitou repetição de {prev_base}: trocou posição {idx} com {swap_idx}")
-    
+    # a ordem da fila já evita o mesmo domínio em sequência (post_log.interleave)
     if args.test:
         print(f"[TEST] Vaga {idx+1}:")
-        print(posts[idx][:200] + "...")
+        print(posts.text(idx)[:200] + "...")
         return
     
     try:
-        send_telegram(posts[idx])
+        send_telegram(posts.text(idx))
     except Exception as e:
         print(f"Erro ao postar PAGO: {e}")
         state = load_fail_state()
@@ -284,6 +181,7 @@ def main():
     
     # sucesso: zera contador de falhas
     save_fail_state({"count": 0})
+    record_posted(posts.text(idx))
     queue["index"] = idx + 1
     save_queue(queue)
     print(f"OK PAGO: post {idx+1}/{len(posts)} enviado")
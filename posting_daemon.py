@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+Job Curator Bot - Posting Daemon
+Um processo só (asyncio) para as filas FREE e PAGO, no lugar das ~35 execuções
+por dia do cron (post_paid.sh / post_next.py): sem pagar a cada post a
+subida do Python, a leitura dos .env e um handshake TLS novo com a API do Telegram.
+
+- Horários fixos por canal a partir de POST_DAY_START_UTC: o PAGO reproduz o
+  cron_pago_30.txt (09:00 UTC, a cada 34 min, 30 por dia).
+- Conexão HTTP mantida aberta entre os posts (telegram_sender, keep-alive).
+- Mesma fila, pausa e alertas do post_next.py / post_next_paid.py: lê a ordem
+  do log de posts, respeita posting_paused*.json, pausa depois de 2 falhas seguidas.
+- Estado gravado de forma atômica (temp + fsync + rename): ponteiro da fila,
+  contador de falhas e último horário postado (data/posting_daemon.json) —
+  reiniciar o daemon não repete o horário já postado.
+
+Uso:
+- python3 posting_daemon.py                 (roda até ser interrompido)
+- python3 posting_daemon.py --once paid     (posta o próximo da fila agora e sai)
+- python3 posting_daemon.py --channels paid (só o canal PAGO)
+"""
+import argparse
+import asyncio
+import fcntl
+import json
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import post_next
+import post_next_paid
+from post_log import atomic_write_json
+from telegram_sender import TelegramSender
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR = Path(__file__).parent / "data"
+STATE_PATH = DATA_DIR / "posting_daemon.json"
+LOCK_PATH = DATA_DIR / "posting_daemon.lock"
+
+POST_DAY_START_UTC = os.environ.get("POST_DAY_START_UTC", "09:00")
+POST_CHANNELS = os.environ.get("POST_CHANNELS", "free,paid")
+
+class Channel:
+    """Um canal postado pelo daemon (fila, credenciais e horários)"""
+
+    def __init__(self, name: str, module, token_envs: tuple, chat_envs: tuple,
+                 interval_min: int, daily_max: int, label: str):
+        self.name = name
+        self.module = module          # post_next / post_next_paid: caminhos, fila, pausa e alertas
+        self.token_envs = token_envs
+        self.chat_envs = chat_envs
+        self.interval = timedelta(minutes=interval_min)
+        self.daily_max = daily_max
+        self.label = label
+        self.empty_alerted = False
+
+    @staticmethod
+    def _env(names: tuple) -> str:
+        return next((os.environ[n] for n in names if os.environ.get(n)), "")
+
+    @property
+    def token(self) -> str:
+        return self._env(self.token_envs)
+
+    @property
+    def chat_id(self) -> str:
+        return self._env(self.chat_envs)
+
+    def slots(self, day) -> List[datetime]:
+        """Horários de post (UTC) de um dia"""
+        hour, minute = (int(x) for x in POST_DAY_START_UTC.split(":"))
+        start = datetime(day.year, day.month, day.day, hour, minute, tzinfo=timezone.utc)
+        return [start + self.interval * k for k in range(self.daily_max)]
+
+    def next_slot(self, after: datetime) -> datetime:
+        """Primeiro horário estritamente depois de `after` (a grade de ontem pode invadir a madrugada)"""
+        day = (after - timedelta(days=1)).date()
+        while True:
+            for slot in self.slots(day):
+                if slot > after:
+                    return slot
+            day += timedelta(days=1)
+
+
+CHANNEL_NAMES = ("free", "paid")
+
+
+def make_channels() -> Dict[str, Channel]:
+    """Canais com intervalos e limites do ambiente (depois do load_env)"""
+    return {
+        "free": Channel(
+            "free", post_next,
+            ("TELEGRAM_TOKEN_FREE", "TELEGRAM_BOT_TOKEN"), ("TELEGRAM_CHANNEL_FREE", "TELEGRAM_GROUP_ID"),
+            int(os.environ.get("POST_FREE_INTERVAL_MIN", "180")),
+            int(os.environ.get("POST_FREE_DAILY_MAX", "5")),
+            "FREE",
+        ),
+        "paid": Channel(
+            "paid", post_next_paid,
+            ("TELEGRAM_TOKEN_PAID",), ("TELEGRAM_CHANNEL_PAID",),
+            int(os.environ.get("POST_PAID_INTERVAL_MIN", "34")),
+            int(os.environ.get("POST_PAID_DAILY_MAX", "30")),
+            "PAGO",
+        ),
+    }
+
+
+# =============================================================================
+# ESTADO
+# =============================================================================
+
+def load_state() -> dict:
+    if not STATE_PATH.exists():
+        return {}
+    try:
+        with open(STATE_PATH) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_state(state: dict) -> None:
+    atomic_write_json(STATE_PATH, state)
+
+
+# =============================================================================
+# POSTAGEM
+# =============================================================================
+
+async def post_next_in_queue(channel: Channel, sender: TelegramSender) -> bool:
+    """
+    Posta o próximo post da fila do canal, com a mesma pausa e os mesmos
+    alertas do post_next.py. Retorna True se postou.
+    """
+    m = channel.module
+    if m.PAUSE_FLAG_PATH.exists():
+        logger.info(f"[{channel.label}] Postagens pausadas (flag ativa)")
+        return False
+    posts = m.load_posts()
+    if not posts:
+        logger.warning(f"[{channel.label}] Sem posts disponíveis")
+        # um alerta por vez que a fila esvazia, não um por horário
+        if not channel.empty_alerted:
+            await asyncio.to_thread(m.send_alert, f"Sem posts disponíveis ({channel.label}).")
+            channel.empty_alerted = True
+        return False
+    channel.empty_alerted = False
+    queue = m.load_queue()
+    idx = int(queue.get("index", 0))
+    if idx >= len(posts):
+        logger.info(f"[{channel.label}] Fila concluída")
+        return False
+
+    if not channel.token or not channel.chat_id:
+        error = RuntimeError(f"{'/'.join(channel.token_envs + channel.chat_envs)} não configurados")
+    else:
+        result = await sender.send_message(channel.token, channel.chat_id, posts.text(idx))
+        error = None if result["ok"] else RuntimeError(
+            f"Telegram error {result['error']} ({result['attempts']} tentativas)")
+    if error:
+        logger.error(f"[{channel.label}] Erro ao postar: {error}")
+        state = m.load_fail_state()
+        state["count"] = int(state.get("count", 0)) + 1
+        m.save_fail_state(state)
+        if state["count"] >= 2:
+            await asyncio.to_thread(m.pause_posting, str(error))
+        else:
+            await asyncio.to_thread(m.send_alert, f"Falha ao postar vaga {idx+1}: {error}")
+        return False
+
+    m.save_fail_state({"count": 0})
+    await asyncio.to_thread(m.record_posted, posts.text(idx))
+    queue["index"] = idx + 1
+    m.save_queue(queue)
+    logger.info(f"[{channel.label}] OK: post {idx+1}/{len(posts)} enviado")
+    return True
+
+
+async def run_channel(channel: Channel, sender: TelegramSender, state: dict) -> None:
+    """Laço de um canal: dorme até o próximo horário e posta"""
+    while True:
+        last = state.get(channel.name, {}).get("last_slot")
+        now = datetime.now(timezone.utc)
+        after = max(now, datetime.fromisoformat(last)) if last else now
+        slot = channel.next_slot(after)
+        logger.info(f"[{channel.label}] Próximo post: {slot:%Y-%m-%d %H:%M} UTC")
+        await asyncio.sleep(max(0.0, (slot - datetime.now(timezone.utc)).total_seconds()))
+        try:
+            await post_next_in_queue(channel, sender)
+        except Exception as e:
+            logger.exception(f"[{channel.label}] Erro inesperado: {e}")
+        # horário consumido (postado, pausado ou com falha): não repete depois de reiniciar
+        state.setdefault(channel.name, {})["last_slot"] = slot.isoformat()
+        save_state(state)
+
+
+async def run(names: List[str]) -> None:
+    channels = make_channels()
+    state = load_state()
+    async with TelegramSender() as sender:
+        await asyncio.gather(*(run_channel(channels[n], sender, state) for n in names))
+
+
+async def run_once(name: str) -> bool:
+    async with TelegramSender() as sender:
+        return await post_next_in_queue(make_channels()[name], sender)
+
+
+def acquire_lock() -> Optional[object]:
+    """Uma instância do daemon por vez"""
+    DATA_DIR.mkdir(parents=True, exist_ok=True)
+    lock = open(LOCK_PATH, "w")
+    try:
+        fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock.close()
+        return None
+    return lock
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Daemon de postagem (FREE e PAGO)")
+    parser.add_argument("--channels", default=POST_CHANNELS, help="canais separados por vírgula (free,paid)")
+    parser.add_argument("--once", choices=CHANNEL_NAMES, help="posta o próximo da fila do canal e sai")
+    args = parser.parse_args()
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s [%(levelname)s] %(name)s: %(message)s',
+        datefmt='%Y-%m-%d %H:%M:%S'
+    )
+    # .env, .env.paid e arquivos do sistema: lidos uma vez
+    post_next_paid.load_env()
+
+    if args.once:
+        asyncio.run(run_once(args.once))
+        return
+
+    names = [n.strip() for n in args.channels.split(",") if n.strip()]
+    unknown = [n for n in names if n not in CHANNEL_NAMES]
+    if unknown:
+        parser.error(f"Canais desconhecidos: {', '.join(unknown)}")
+    lock = acquire_lock()
+    if lock is None:
+        print("Já rodando (lock ativo)")
+        return
+    try:
+        asyncio.run(run(names))
+    except KeyboardInterrupt:
+        logger.info("Daemon encerrado")
+    finally:
+        lock.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,27 +1,32 @@
 #!/usr/bin/env python3
 import os
 import re
+import html
 import json
 import time
-import itertools
+import logging
+import threading
 from datetime import datetime
 from email.utils import parsedate_to_datetime
 from pathlib import Path
-from typing import List, Dict
+from typing import List, Dict, Optional
 
 import requests
 import feedparser
 from bs4 import BeautifulSoup
 from urllib.parse import urlparse, unquote
 
+import ats_boards
+import brave_planner
+from brave_client import BraveClient, brave_token
+from job_keys import stable_id
 from link_resolver import resolve_direct_url, is_valid_direct_url
+from scrapers.ats import ATS_SCRAPERS
 from config import AGGREGATOR_DOMAINS, VALID_JOB_DOMAINS
 
 DATA_DIR = Path(__file__).parent / "data"
 DATA_DIR.mkdir(parents=True, exist_ok=True)
 
-HISTORY_URLS = DATA_DIR / "posted_urls.txt"
-HISTORY_COMPANIES = DATA_DIR / "posted_companies.txt"
 COMPANIES_DB = DATA_DIR / "companies_database.json"
 
 ALLOWED_COUNTRY_TERMS = [
@@ -66,15 +71,17 @@ GENERIC_TITLE_PHRASES = [
     "open positions", "current openings",
 ]
 
-BRAVE_ENDPOINT = "https://api.search.brave.com/res/v1/web/search"
 MAX_AGE_HOURS = int(os.environ.get("MAX_AGE_HOURS", "168"))
 BRAVE_BUDGET = int(os.environ.get("BRAVE_BUDGET", "60"))
-_BRAVE_QUOTA_EXCEEDED = False
-_BRAVE_REQUESTS = 0
+_BRAVE = None
 LLM_DAILY_LIMIT = int(os.environ.get("LLM_DAILY_LIMIT", "2"))
 LLM_USAGE_PATH = DATA_DIR / "llm_usage.json"
 COMPANIES_SCAN_LIMIT = int(os.environ.get("COMPANIES_SCAN_LIMIT", "50"))
 COMPANIES_JOBS_LIMIT = int(os.environ.get("COMPANIES_JOBS_LIMIT", "80"))
+ATS_FEEDS_LIMIT = int(os.environ.get("ATS_FEEDS_LIMIT", "200"))
+PHASE3_TIME_BUDGET = float(os.environ.get("PHASE3_TIME_BUDGET", "120"))
+PHASE3_WORKERS = int(os.environ.get("PHASE3_WORKERS", "6"))
+PHASE3_MAX_CANDIDATES = int(os.environ.get("PHASE3_MAX_CANDIDATES", "50"))
 
 
 def load_env():
@@ -470,42 +477,19 @@ def normalize_location(loc) -> str:
 
 
 def _brave_token() -> str:
-    return (
-        os.environ.get("BRAVE_API_KEY") or
-        os.environ.get("BRAVE_SEARCH_API_KEY") or
-        os.environ.get("BRAVE_SUBSCRIPTION_TOKEN") or
-        ""
-    )
+    return brave_token()
+
+
+def get_brave_client() -> BraveClient:
+    """Cliente Brave da execução (orçamento, rate limit e concorrência compartilhados)"""
+    global _BRAVE
+    if _BRAVE is None:
+        _BRAVE = BraveClient(budget=BRAVE_BUDGET)
+    return _BRAVE
 
 
 def brave_search(query: str, count: int = 10, offset: int = 0) -> list:
-    token = _brave_token()
-    if not token:
-        return []
-    global _BRAVE_REQUESTS
-    if _BRAVE_REQUESTS >= BRAVE_BUDGET:
-        return []
-    headers = {"X-Subscription-Token": token}
-    params = {
-        "q": query,
-        "count": count,
-        "offset": offset,
-        "search_lang": "en",
-        "safesearch": "moderate",
-    }
-    try:
-        r = requests.get(BRAVE_ENDPOINT, headers=headers, params=params, timeout=20)
-        _BRAVE_REQUESTS += 1
-        if r.status_code == 429:
-            global _BRAVE_QUOTA_EXCEEDED
-            _BRAVE_QUOTA_EXCEEDED = True
-            return []
-        if not r.ok:
-            return []
-        data = r.json()
-        return data.get("web", {}).get("results", []) if isinstance(data, dict) else []
-    except Exception:
-        return []
+    return get_brave_client().search(query, count=count, offset=offset)
 
 
 def _parse_domain(url: str) -> str:
@@ -521,19 +505,9 @@ def _parse_domain(url: str) -> str:
 
 
 def load_companies_db() -> list:
-    if not COMPANIES_DB.exists():
-        return []
-    try:
-        data = json.loads(COMPANIES_DB.read_text())
-    except Exception:
-        return []
-    if isinstance(data, dict):
-        items = data.get("companies") or []
-    elif isinstance(data, list):
-        items = data
-    else:
-        items = []
-    return [i for i in items if isinstance(i, dict)]
+    """Empresas do companies_database.json (via company_registry, reimportado se o arquivo mudar)"""
+    import company_registry
+    return company_registry.companies("companies_database")
 
 
 def select_companies_subset(companies: list, limit: int) -> list:
@@ -561,15 +535,47 @@ def _company_queries(name: str, domain: str) -> list:
     return queries
 
 
+def fetch_ats_feeds(limit: int = 200) -> list:
+    # boards públicos dos ATS (sem Brave) para empresas com ATS conhecido
+    jobs = []
+    boards = ats_boards.load_company_boards(COMPANIES_DB)
+    for scraper_cls in ATS_SCRAPERS:
+        scraper = scraper_cls(boards.get(scraper_cls.provider, []))
+        if not scraper.boards:
+            continue
+        for item in scraper.run(limit=limit):
+            desc = (item.get("description") or "")[:1200]
+            jobs.append({
+                "id": item["id"],
+                "title": item.get("title") or "N/A",
+                "company": item.get("company") or "Unknown",
+                "description": desc,
+                "source_url": item.get("source_url") or "",
+                "location": item.get("location") or "",
+                "source": f"ats-{scraper.provider}",
+                "pt_hint": has_portuguese_hint(desc),
+                "posted_at": item.get("posted_at"),
+            })
+            if len(jobs) >= limit:
+                return jobs
+    return jobs
+
+
 def fetch_companies_from_db(limit: int = 80) -> list:
     jobs = []
-    if not _brave_token():
+    client = get_brave_client()
+    if not client.enabled:
         return jobs
     companies = load_companies_db()
     if not companies:
         return jobs
+    # empresas com board de ATS conhecido já vêm por fetch_ats_feeds
+    companies = [
+        c for c in companies
+        if not ((c.get("ats") and c.get("ats_slug")) or ats_boards.detect_ats(c.get("careers_url") or ""))
+    ]
     subset = select_companies_subset(companies, COMPANIES_SCAN_LIMIT)
-    seen = set()
+    query_company = {}
     for c in subset:
         name = (c.get("name") or "").strip()
         if not name:
@@ -577,10 +583,14 @@ def fetch_companies_from_db(limit: int = 80) -> list:
         careers_url = (c.get("careers_url") or "").strip()
         domain = _parse_domain(careers_url)
         for q in _company_queries(name, domain):
-            if _BRAVE_QUOTA_EXCEEDED or _BRAVE_REQUESTS >= BRAVE_BUDGET:
-                return jobs
-            results = brave_search(q, count=6)
-            time.sleep(1.1)
+            query_company.setdefault(q, name)
+    seen = set()
+    kept_queries = []
+    # buscas em paralelo (rate limit/orçamento no cliente), resultados na ordem das queries
+    results_iter = client.search_many(list(query_company), count=6)
+    try:
+        for q, results in results_iter:
+            name = query_company[q]
             for item in results:
                 url = item.get("url") or ""
                 if not url or url in seen:
@@ -592,8 +602,9 @@ def fetch_companies_from_db(limit: int = 80) -> list:
                 if not (is_allowed_ats_url(url, name) or is_company_job_url(url, name)):
                     continue
                 seen.add(url)
+                kept_queries.append(q)
                 jobs.append({
-                    "id": f"company-{hash(url)}",
+                    "id": stable_id(url),
                     "title": item.get("title") or "N/A",
                     "company": name,
                     "description": strip_html(item.get("description") or "")[:1200],
@@ -601,17 +612,20 @@ def fetch_companies_from_db(limit: int = 80) -> list:
                     "location": "",
                     "source": "companies-db",
                     "pt_hint": has_portuguese_hint(item.get("description") or ""),
+                    "brave_query": q,
                 })
                 if len(jobs) >= limit:
                     return jobs
+    finally:
+        results_iter.close()
+        brave_planner.record_outcome("kept", kept_queries)
     return jobs
 
 
 def fetch_brave_direct(limit=30):
     jobs = []
-    if not _brave_token():
-        return jobs
-    if _BRAVE_QUOTA_EXCEEDED:
+    client = get_brave_client()
+    if not client.enabled or client.exhausted():
         return jobs
     countries = [
         "United States", "Canada", "United Kingdom", "Germany", "France",
@@ -704,49 +718,51 @@ def fetch_brave_direct(limit=30):
         queries.append(f"site:jobvite.com visa sponsorship {c}")
         queries.append(f"site:icims.com visa sponsorship {c}")
         queries.append(f"site:recruitee.com visa sponsorship {c}")
-    # limita número de queries para controlar tempo
+    # limita número de queries para controlar tempo; escolhe pelo rendimento histórico
     max_queries = int(os.environ.get("BRAVE_QUERY_LIMIT", "40"))
-    if len(queries) > max_queries:
-        start = int(datetime.utcnow().strftime("%j")) % len(queries)
-        queries = (queries[start:] + queries[:start])[:max_queries]
-    queries = fixed_queries + queries
+    queries = brave_planner.plan_queries(fixed_queries + queries, len(fixed_queries) + max_queries)
     seen = set()
+    kept_queries = []
     domain_counts = {}
     total_found = 0
-    for q in queries:
-        results = brave_search(q, count=10)
-        total_found += len(results)
-        time.sleep(1.2)
-        for item in results:
-            url = item.get("url") or ""
-            if not url or url in seen:
-                continue
-            if "boards.greenhouse.io/embed/" in url:
-                continue
-            if not any(d in url for d in domains):
-                continue
-            if not is_job_specific_url(url):
-                continue
-            domain = url.split("/")[2] if "://" in url else ""
-            if domain:
-                domain_counts[domain] = domain_counts.get(domain, 0) + 1
-                if domain_counts[domain] > 25:
+    results_iter = client.search_many(queries, count=10)
+    try:
+        for q, results in results_iter:
+            total_found += len(results)
+            for item in results:
+                url = item.get("url") or ""
+                if not url or url in seen:
                     continue
-            seen.add(url)
-            jobs.append({
-                "id": f"brave-{hash(url)}",
-                "title": item.get("title") or "N/A",
-                "company": item.get("source") or "Unknown",
-                "description": strip_html(item.get("description") or "")[:1200],
-                "source_url": url,
-                "location": "",
-                "source": "brave",
-                "pt_hint": has_portuguese_hint(item.get("description") or ""),
-            })
-            if len(jobs) >= limit:
-                print(f"Brave results total: {total_found}, kept: {len(jobs)}")
-                return jobs
-    print(f"Brave results total: {total_found}, kept: {len(jobs)}")
+                if "boards.greenhouse.io/embed/" in url:
+                    continue
+                if not any(d in url for d in domains):
+                    continue
+                if not is_job_specific_url(url):
+                    continue
+                domain = url.split("/")[2] if "://" in url else ""
+                if domain:
+                    domain_counts[domain] = domain_counts.get(domain, 0) + 1
+                    if domain_counts[domain] > 25:
+                        continue
+                seen.add(url)
+                kept_queries.append(q)
+                jobs.append({
+                    "id": stable_id(url),
+                    "title": item.get("title") or "N/A",
+                    "company": item.get("source") or "Unknown",
+                    "description": strip_html(item.get("description") or "")[:1200],
+                    "source_url": url,
+                    "location": "",
+                    "source": "brave",
+                    "pt_hint": has_portuguese_hint(item.get("description") or ""),
+                    "brave_query": q,
+                })
+                if len(jobs) >= limit:
+                    return jobs
+    finally:
+        results_iter.close()
+        print(f"Brave results total: {total_found}, kept: {len(jobs)}")
+        brave_planner.record_outcome("kept", kept_queries)
     return jobs
 
 
@@ -765,7 +781,6 @@ def fallback_search_direct(job: Dict) -> str:
         "site:recruitee.com OR site:breezy.hr OR site:applytojob.com"
     )
     results = brave_search(query, count=5)
-    time.sleep(2)
     for item in results:
         url = item.get("url") or ""
         if not url:
@@ -785,7 +800,7 @@ def fetch_remotive(limit=50):
         desc = strip_html(item.get("description") or "")[:1200]
         loc = item.get("candidate_required_location", "") or item.get("location", "")
         jobs.append({
-            "id": f"remotive-{item.get('id')}",
+            "id": stable_id(item.get("url") or f"remotive:{item.get('id')}"),
             "title": item.get("title") or "N/A",
             "company": item.get("company_name") or "Unknown",
             "description": desc,
@@ -808,7 +823,7 @@ def fetch_remoteok(limit=50):
         desc = strip_html(item.get("description") or "")[:1200]
         loc = item.get("location") or ""
         jobs.append({
-            "id": f"remoteok-{item.get('id')}",
+            "id": stable_id(item.get("url") or f"remoteok:{item.get('id')}"),
             "title": item.get("position") or "N/A",
             "company": item.get("company") or "Unknown",
             "description": desc,
@@ -828,7 +843,7 @@ def fetch_himalayas(limit=50):
         desc = strip_html(entry.get("summary") or "")[:1200]
         loc = entry.get("location") or entry.get("tags") or ""
         jobs.append({
-            "id": f"himalayas-{entry.get('id', entry.get('link',''))}",
+            "id": stable_id(entry.get("link") or f"himalayas:{entry.get('id')}"),
             "title": entry.get("title") or "N/A",
             "company": entry.get("author") or "Unknown",
             "description": desc,
@@ -851,7 +866,7 @@ def fetch_jobicy(limit=50):
         desc = strip_html(item.get("jobExcerpt") or item.get("jobDescription") or "")[:1200]
         loc = item.get("jobGeo") or item.get("jobLocation") or ""
         jobs.append({
-            "id": f"jobicy-{item.get('id')}",
+            "id": stable_id(item.get("jobUrl") or f"jobicy:{item.get('id')}"),
             "title": item.get("jobTitle") or "N/A",
             "company": item.get("companyName") or "Unknown",
             "description": desc,
@@ -871,7 +886,7 @@ def fetch_workingnomads(limit=50):
         desc = strip_html(entry.get("summary") or "")[:1200]
         loc = entry.get("location") or entry.get("tags") or ""
         jobs.append({
-            "id": f"workingnomads-{entry.get('id', entry.get('link',''))}",
+            "id": stable_id(entry.get("link") or f"workingnomads:{entry.get('id')}"),
             "title": entry.get("title") or "N/A",
             "company": entry.get("author") or "Unknown",
             "description": desc,
@@ -900,7 +915,7 @@ def fetch_landingjobs(limit=50):
             code = (first.get("country_code") or "").upper()
             loc = f"{city} ({code})" if city else code
         jobs.append({
-            "id": f"landingjobs-{item.get('id')}",
+            "id": stable_id(item.get("url") or f"landingjobs:{item.get('id')}"),
             "title": item.get("title") or "N/A",
             "company": item.get("company_name") or "Unknown",
             "description": desc,
@@ -942,7 +957,7 @@ def fetch_weworkremotely(limit=50):
                 title = parts[1].strip() or title
             desc = strip_html(entry.get("description") or entry.get("summary") or "")[:1200]
             jobs.append({
-                "id": f"weworkremotely-{entry.get('id', entry.get('link',''))}",
+                "id": stable_id(entry.get("link") or f"weworkremotely:{entry.get('id')}"),
                 "title": title or "N/A",
                 "company": company,
                 "description": desc,
@@ -957,26 +972,40 @@ def fetch_weworkremotely(limit=50):
     return jobs[:limit]
 
 
+def _apply_board_data(job: Dict, data: Dict, fallback_company: str) -> None:
+    job["title"] = data.get("title") or job.get("title")
+    job["company"] = data.get("company") or fallback_company
+    if data.get("location"):
+        job["location"] = data["location"]
+    content = strip_html(html.unescape(data.get("content") or ""))
+    if content:
+        job["description"] = content
+
+
 def enrich_greenhouse(job: Dict) -> None:
     url = job.get("direct_url", "")
     m = re.search(r"greenhouse\.io/([^/]+)/jobs/(\d+)", url)
     if not m:
         return
     board, job_id = m.group(1), m.group(2)
+    # listagem do board inteiro (1 chamada por board, com cache)
+    board_ok, data = ats_boards.lookup_job(url)
+    if board_ok:
+        if data:
+            _apply_board_data(job, data, board)
+        return
     api = f"https://boards-api.greenhouse.io/v1/boards/{board}/jobs/{job_id}"
     r = requests.get(api, timeout=20)
     if not r.ok:
         return
     data = r.json()
-    job["title"] = data.get("title") or job.get("title")
-    job["company"] = data.get("company") or board
     location = data.get("location")
-    if isinstance(location, dict):
-        job["location"] = location.get("name") or job.get("location")
-    content = data.get("content") or ""
-    content = strip_html(content)
-    if content:
-        job["description"] = content
+    _apply_board_data(job, {
+        "title": data.get("title"),
+        "company": data.get("company"),
+        "location": location.get("name") if isinstance(location, dict) else "",
+        "content": data.get("content"),
+    }, board)
 
 
 def enrich_lever(job: Dict) -> None:
@@ -985,20 +1014,21 @@ def enrich_lever(job: Dict) -> None:
     if not m:
         return
     company, posting = m.group(1), m.group(2)
+    board_ok, data = ats_boards.lookup_job(url)
+    if board_ok:
+        if data:
+            _apply_board_data(job, data, company)
+        return
     api = f"https://api.lever.co/v0/postings/{company}/{posting}?mode=json"
     r = requests.get(api, timeout=20)
     if not r.ok:
         return
     data = r.json()
-    job["title"] = data.get("text") or job.get("title")
-    job["company"] = company
-    loc = (data.get("categories") or {}).get("location")
-    if loc:
-        job["location"] = loc
-    content = data.get("description") or ""
-    content = strip_html(content)
-    if content:
-        job["description"] = content
+    _apply_board_data(job, {
+        "title": data.get("text"),
+        "location": (data.get("categories") or {}).get("location"),
+        "content": data.get("description"),
+    }, company)
 
 
 def infer_company_from_url(url: str) -> str:
@@ -1078,19 +1108,6 @@ def clean_company_name(name: str) -> str:
     return n
 
 
-def load_history(path: Path) -> set:
-    if not path.exists():
-        return set()
-    with open(path, "r") as f:
-        return set([line.strip() for line in f if line.strip()])
-
-
-def save_history(path: Path, items: List[str]) -> None:
-    with open(path, "a") as f:
-        for item in items:
-            f.write(item + "\n")
-
-
 def build_llm_payload(jobs: List[Dict]) -> str:
     entries = []
     for i, j in enumerate(jobs):
@@ -1274,14 +1291,185 @@ def infer_country_from_location(loc: str) -> str:
     return ""
 
 
+DIVERSITY_FLAGS = ("faculdade_sim", "faculdade_nao", "ingles_basico", "sem_experiencia", "com_experiencia")
+MIN_COUNTRIES = 2
+MIN_SECTORS = 3
+# nós da busca exata do núcleo (select_diverse_batch, quando o guloso empaca)
+EXACT_CORE_NODES = 200_000
+
+
+def _diversity_profile(item: Dict) -> tuple:
+    """(empresa, país, setor, flags) de uma vaga — mesmos critérios de validate_diversity"""
+    req = item.get("requisitos", {})
+    flags = set()
+    if req.get("faculdade") == "sim":
+        flags.add("faculdade_sim")
+    if req.get("faculdade") == "nao":
+        flags.add("faculdade_nao")
+    if req.get("ingles") in ("basico", "nao_precisa"):
+        flags.add("ingles_basico")
+    if req.get("experiencia_anos") == 0:
+        flags.add("sem_experiencia")
+    if (req.get("experiencia_anos") or 0) >= 2:
+        flags.add("com_experiencia")
+    return (
+        clean_whitespace(item.get("empresa", "")).lower(),
+        item.get("pais", "").lower(),
+        item.get("setor", ""),
+        frozenset(flags),
+    )
+
+
+def _diversity_missing(profiles: List[tuple], chosen: List[int]) -> int:
+    """Quantos requisitos de diversidade ainda faltam no conjunto escolhido"""
+    countries = set()
+    sectors = set()
+    flags = set()
+    for idx in chosen:
+        _company, country, sector, item_flags = profiles[idx]
+        countries.add(country)
+        sectors.add(sector)
+        flags |= item_flags
+    return (
+        max(0, MIN_COUNTRIES - len(countries)) +
+        max(0, MIN_SECTORS - len(sectors)) +
+        sum(1 for f in DIVERSITY_FLAGS if f not in flags)
+    )
+
+
+def _exact_core(profiles: List[tuple], size: int, max_nodes: int = EXACT_CORE_NODES) -> Optional[List[int]]:
+    """
+    Núcleo que cobre os requisitos de diversidade por backtracking: pega o
+    primeiro requisito que falta e tenta cada vaga que o cumpre. Cada vaga do
+    núcleo cumpre ao menos um requisito, então ele tem no máximo
+    len(DIVERSITY_FLAGS) + MIN_COUNTRIES + MIN_SECTORS vagas; vagas com o mesmo
+    perfil (país, setor, flags) são equivalentes, então basta esse número de
+    representantes (de empresas diferentes) por perfil.
+
+    Returns:
+        índices do núcleo, ou None se não existe (ou passou de max_nodes)
+    """
+    depth = min(size, len(DIVERSITY_FLAGS) + MIN_COUNTRIES + MIN_SECTORS)
+    groups = {}
+    for idx, (company, country, sector, flags) in enumerate(profiles):
+        group = groups.setdefault((country, sector, flags), [])
+        if len(group) < depth and (not company or all(profiles[g][0] != company for g in group)):
+            group.append(idx)
+    candidates = [idx for group in groups.values() for idx in group]
+    nodes = 0
+
+    def covers(chosen: List[int]):
+        """Predicado do primeiro requisito que falta (None = tudo coberto)"""
+        countries = {profiles[i][1] for i in chosen}
+        sectors = {profiles[i][2] for i in chosen}
+        flags = set().union(*(profiles[i][3] for i in chosen))
+        for flag in DIVERSITY_FLAGS:
+            if flag not in flags:
+                return lambda p: flag in p[3]
+        if len(countries) < MIN_COUNTRIES:
+            return lambda p: p[1] not in countries
+        if len(sectors) < MIN_SECTORS:
+            return lambda p: p[2] not in sectors
+        return None
+
+    def search(chosen: List[int]) -> Optional[List[int]]:
+        nonlocal nodes
+        nodes += 1
+        need = covers(chosen)
+        if need is None:
+            return chosen
+        if len(chosen) >= depth or nodes > max_nodes:
+            return None
+        companies = {profiles[i][0] for i in chosen}
+        for idx in candidates:
+            company = profiles[idx][0]
+            if idx in chosen or (company and company in companies) or not need(profiles[idx]):
+                continue
+            found = search(chosen + [idx])
+            if found is not None:
+                return found
+        return None
+
+    return search([])
+
+
 def select_diverse_batch(items: List[Dict], size: int = 5) -> List[Dict]:
-    # tenta combinações nas primeiras 30 vagas aprovadas
-    approved = [i for i in items if i.get("aprovada")]
-    pool = approved[:50]
-    for combo in itertools.combinations(pool, size):
-        if validate_diversity(list(combo)):
-            return list(combo)
-    return []
+    """
+    Escolhe `size` vagas aprovadas que passam em validate_diversity.
+
+    Guloso + reparo (milissegundos mesmo com centenas de vagas):
+    1. cobre os requisitos escolhendo sempre a vaga que mais reduz o que falta
+       (empate → a que vem primeiro na lista)
+    2. reparo: troca vagas do núcleo quando a cobertura empaca ou passa de `size`;
+       se ainda faltar algo, busca exata limitada do núcleo (_exact_core)
+    3. completa até `size` na ordem original, sem repetir empresa
+    """
+    pool = [i for i in items if i.get("aprovada") and i.get("internacional_ok")]
+    if size <= 0 or len(pool) < size:
+        return []
+    profiles = [_diversity_profile(i) for i in pool]
+    # inviável já pela união de todas as vagas
+    if _diversity_missing(profiles, list(range(len(pool)))):
+        return []
+
+    def _company_free(idx: int, chosen: List[int]) -> bool:
+        company = profiles[idx][0]
+        return not company or all(profiles[c][0] != company for c in chosen)
+
+    # 1. cobertura gulosa
+    chosen = []
+    missing = _diversity_missing(profiles, chosen)
+    while missing and len(chosen) < size:
+        best, best_missing = None, missing
+        for idx in range(len(pool)):
+            if idx in chosen or not _company_free(idx, chosen):
+                continue
+            m = _diversity_missing(profiles, chosen + [idx])
+            if m < best_missing:
+                best, best_missing = idx, m
+        if best is None:
+            break
+        chosen.append(best)
+        missing = best_missing
+
+    # 2. reparo: adiciona ou troca 1 a 1 enquanto reduzir o que falta
+    for _ in range(size * 2):
+        if not missing:
+            break
+        improved = False
+        for idx in range(len(pool)):
+            if idx in chosen:
+                continue
+            trials = [chosen] if len(chosen) < size else []
+            trials += [chosen[:pos] + chosen[pos + 1:] for pos in range(len(chosen))]
+            for trial in trials:
+                if not _company_free(idx, trial):
+                    continue
+                m = _diversity_missing(profiles, trial + [idx])
+                if m < missing:
+                    chosen, missing, improved = trial + [idx], m, True
+                    break
+            if improved:
+                break
+        if not improved:
+            break
+    if missing:
+        # 2b. guloso empacou: busca exata (limitada) antes de desistir
+        chosen = _exact_core(profiles, size)
+        if chosen is None:
+            return []
+
+    # 3. completa com as primeiras vagas restantes
+    for idx in range(len(pool)):
+        if len(chosen) >= size:
+            break
+        if idx not in chosen and _company_free(idx, chosen):
+            chosen.append(idx)
+    if len(chosen) < size:
+        return []
+
+    batch = [pool[idx] for idx in sorted(chosen)]
+    return batch if validate_diversity(batch) else []
 
 
 def pick_with_requirements(items: List[Dict], size: int) -> List[Dict]:
@@ -1510,282 +1698,165 @@ def format_post(job: Dict) -> str:
     )
 
 
-def main():
-    load_env()
-    global _BRAVE_QUOTA_EXCEEDED
-    global _BRAVE_REQUESTS
-    _BRAVE_QUOTA_EXCEEDED = False
-    _BRAVE_REQUESTS = 0
-    print(f"Brave token: {'OK' if _brave_token() else 'MISSING'}")
-    # speed up resolver
-    try:
-        import link_resolver
-        link_resolver.REQUEST_DELAY = 0.5
-        link_resolver.REQUEST_TIMEOUT = 10
-    except Exception:
-        pass
-    print("== FASE 1: COLETA ==")
-    jobs = []
-    count_before = 0
-    jobs += fetch_companies_from_db(COMPANIES_JOBS_LIMIT)
-    companies_count = len(jobs) - count_before
-    count_before = len(jobs)
-    jobs += fetch_brave_direct(150)
-    brave_direct_count = len(jobs) - count_before
-    jobs += fetch_remotive(60)
-    jobs += fetch_remoteok(60)
-    jobs += fetch_himalayas(60)
-    jobs += fetch_jobicy(60)
-    jobs += fetch_workingnomads(60)
-    jobs += fetch_landingjobs(60)
-    jobs += fetch_weworkremotely(60)
-    print(f"Coletadas: {len(jobs)}")
-    print(f"  - companies-db: {companies_count}")
-    print(f"  - brave-direct: {brave_direct_count}")
-    by_source = {}
-    for j in jobs:
-        by_source[j.get("source")] = by_source.get(j.get("source"), 0) + 1
-    print(f"Por fonte: {by_source}")
-
-    print("== FASE 2: FILTRO GEO ==")
-    geo = []
-    for j in jobs:
-        if not is_allowed_geo(str(j.get("location", "")), str(j.get("description", ""))):
-            continue
-        geo.append(j)
-    print(f"Após geo: {len(geo)}")
-
-    print("== FASE 2B: FILTRO 48H (quando disponível) ==")
-    recent = []
-    for j in geo:
-        if is_recent(j.get("posted_at"), hours=MAX_AGE_HOURS):
-            recent.append(j)
-    print(f"Após {MAX_AGE_HOURS}h: {len(recent)}")
-
-    # prioriza brave
-    recent.sort(key=lambda x: 0 if x.get("source") == "brave" else 1)
-
-    print("== FASE 3: LINK DIRETO OFICIAL ==")
-    seen_urls = load_history(HISTORY_URLS)
-    seen_companies = load_history(HISTORY_COMPANIES)
-    candidates = []
-    companies_run = set()
-    ats_count = 0
-    max_ats_ratio = float(os.environ.get("ATS_MAX_RATIO", "0.4") or "0.4")
-    max_ats_count = int(os.environ.get("ATS_MAX_COUNT", "6") or "6")
-    min_allow = int(os.environ.get("ATS_MIN_ALLOW", "5") or "5")
-    attempts = 0
-    fallback_calls = 0
-    resolver_calls = 0
-    start_time = time.time()
-    for j in recent:
-        attempts += 1
-        if attempts > 120:
-            break
-        if time.time() - start_time > 120:
-            break
-        src = j.get("source_url") or ""
-        if not src:
-            continue
-        if j.get("source") == "weworkremotely":
-            direct_url = ""
-        elif j.get("source") == "brave" and is_valid_direct_url(src):
-            direct_url = src
-        elif is_valid_direct_url(src):
-            direct_url = src
-        else:
-            direct_url = ""
-            if resolver_calls < 15:
-                resolved, _status = resolve_direct_url(src)
-                resolver_calls += 1
-                if resolved and is_valid_direct_url(resolved):
-                    direct_url = resolved
-            # evita resolver agregadores pesados; usa fallback com Brave
-            if not direct_url:
-                if fallback_calls < 40:
-                    direct_url = fallback_search_direct(j)
-                    fallback_calls += 1
-                else:
-                    direct_url = ""
-            if not direct_url:
-                continue
-            if not is_valid_direct_url(direct_url):
-                continue
-        # tenta inferir empresa pelo ATS antes das validações
-        if direct_url:
-            inferred_company = infer_company_from_direct_url(direct_url) or infer_company_from_url(direct_url)
-            if inferred_company:
-                j["company"] = clean_company_name(inferred_company)
+# ----------------------------------------------------------------------
+# FASE 3 (link direto): parte de rede por vaga (usada pelo estágio resolve/enrich do pipeline)
+# ----------------------------------------------------------------------
 
-        if not direct_url:
-            # tenta encontrar link oficial no domínio da empresa
-            fallback = search_company_job_link(j.get("company") or "", j.get("title") or "")
-            if not fallback:
-                continue
-            final_url = fallback
-            if not (is_company_job_url(final_url, j.get("company") or "") or is_allowed_company_listing(final_url, j.get("company") or "")):
-                continue
-            j["direct_url"] = final_url
-            # segue para dedupe/enriquecimento
-        else:
-            if not is_job_specific_url(direct_url):
-                continue
-        # evita listagens
-        if direct_url:
-            if "greenhouse.io" in direct_url and "/jobs/" not in direct_url:
-                continue
-        if j.get("company"):
-            j["company"] = clean_company_name(j.get("company"))
-        company_name = j.get("company") or ""
-        if direct_url:
-            # se link final ainda é ATS, tenta achar link oficial no domínio da empresa
-            final_url = direct_url
-            if not (is_company_job_url(final_url, company_name) or is_allowed_company_listing(final_url, company_name)):
-                # permite ATS se nome da empresa estiver na URL
-                if is_allowed_ats_url(final_url, company_name):
-                    j["direct_url"] = final_url
-                else:
-                    resolved_company = resolve_official_company_link(final_url)
-                    if not resolved_company:
-                        # fallback por nome da empresa + título (útil para WWR e agregadores)
-                        if time.time() - start_time > 110:
-                            resolved_company = ""
-                        else:
-                            resolved_company = search_company_job_link(company_name, j.get("title") or "")
-                    if not resolved_company:
-                        continue
-                    final_url = resolved_company
-                    if not (is_company_job_url(final_url, company_name) or is_allowed_company_listing(final_url, company_name)):
-                        continue
-                    j["direct_url"] = final_url
-        if not j.get("company") or j.get("company") == "Unknown":
-            continue
-        if is_generic_title(j.get("title")):
-            continue
-        # enriquecer
-        if "greenhouse.io" in direct_url:
-            enrich_greenhouse(j)
-        elif "lever.co" in direct_url:
-            enrich_lever(j)
-        if looks_like_listing(j.get("description", "")):
-            continue
-        if not j.get("company") or j.get("company") == "Unknown":
-            continue
-        # dedupe histórico
-        company_key = (j.get("company") or "").strip().lower()
-        if company_key in seen_companies:
-            continue
-        if company_key in companies_run:
-            continue
-        if direct_url in seen_urls:
-            continue
-        if direct_url and is_ats_url(direct_url):
-            if len(candidates) >= min_allow:
-                projected = (ats_count + 1) / max(1, len(candidates) + 1)
-                if ats_count >= max_ats_count or projected > max_ats_ratio:
-                    continue
-        companies_run.add(company_key)
-        candidates.append(j)
-        if direct_url and is_ats_url(direct_url):
-            ats_count += 1
-        if len(candidates) >= 50:
-            break
-    print(f"Com link direto: {len(candidates)}")
+# campos da vaga que a fase 3 pode alterar
+PHASE3_FIELDS = ("title", "company", "description", "location", "posted_at", "direct_url")
+# rejeições por falta de tempo/orçamento: a vaga fica no estágio e tenta de novo
+PHASE3_TRANSIENT = ("sem_tempo", "sem_orcamento", "erro")
 
-    if not candidates:
-        print("Sem candidatos suficientes")
-        return
 
-    print("== FASE 4: LLM (Gemini) ==")
-    merged = []
-    batch_size = 5
-    usage = load_llm_usage()
-    if LLM_DAILY_LIMIT <= 0:
-        print("LLM desativado (LLM_DAILY_LIMIT=0)")
-    for start in range(0, len(candidates), batch_size):
-        if LLM_DAILY_LIMIT <= 0:
-            break
-        if usage["count"] >= LLM_DAILY_LIMIT:
-            print("Limite diário de LLM atingido; parando análise.")
-            break
-        chunk = candidates[start:start + batch_size]
-        payload = build_llm_payload(chunk)
-        try:
-            results = call_gemini(payload, len(chunk))
-        except Exception as e:
-            print(f"Erro LLM (chunk {start}): {e}")
-            continue
-        usage["count"] += 1
-        save_llm_usage(usage)
-        for i, res in enumerate(results):
-            if i >= len(chunk):
-                break
-            job = chunk[i].copy()
-            # força empresa a partir do dado real
-            if isinstance(res, dict):
-                res["job_index"] = len(merged)
-                res["empresa"] = job.get("company") or res.get("empresa")
-                if not res.get("titulo"):
-                    res["titulo"] = job.get("title")
-                if not res.get("pais") or "worldwide" in str(res.get("pais")).lower():
-                    inferred = infer_country_from_location(normalize_location(job.get("location")))
-                    if inferred:
-                        res["pais"] = inferred
-            job["analysis"] = res
-            merged.append(job)
-
-    print("== FASE 5: DIVERSIDADE ==")
-    analyses = [m["analysis"] for m in merged]
-    approved = []
-    for a in analyses:
-        if a.get("aprovada") is False:
-            continue
-        if a.get("internacional_ok") is False:
-            continue
-        if not llm_country_allowed(a.get("pais")):
-            continue
-        approved.append(a)
-    print(f"Aprovadas (LLM): {len(approved)} / {len(analyses)}")
-    target_size = int(os.environ.get("BATCH_SIZE", "20"))
-    batch = select_diverse_batch(approved, size=target_size)
-    if not batch:
-        print("Nenhum lote passou diversidade — usando fallback")
-        batch = pick_with_requirements(approved, target_size)
-
-    # montar lote final com dados originais
-    final = []
-    for item in batch:
-        idx = item.get("job_index")
-        if idx is None:
-            continue
-        if idx < len(merged):
-            job = merged[idx]
-            final.append(job)
-
-    # remove itens sem link e ordena para evitar links semelhantes em sequência
-    final = [j for j in final if j.get("direct_url")]
-    final = interleave_by_domain(final)
-
-    # salvar para revisão
-    out = {
-        "generated_at": datetime.utcnow().isoformat() + "Z",
-        "count": len(final),
-        "items": final,
+class _Phase3Limits:
+    """Orçamento de chamadas caras da fase 3 (compartilhado entre threads)"""
+
+    def __init__(self, deadline: float):
+        self.deadline = deadline
+        self._lock = threading.Lock()
+        self._left = {
+            "resolver": int(os.environ.get("PHASE3_RESOLVER_CALLS", "15")),
+            "fallback": int(os.environ.get("PHASE3_FALLBACK_CALLS", "40")),
+        }
+
+    def take(self, name: str) -> bool:
+        with self._lock:
+            if self._left.get(name, 0) <= 0:
+                return False
+            self._left[name] -= 1
+            return True
+
+    def out_of_time(self, margin: float = 0.0) -> bool:
+        return time.time() > self.deadline - margin
+
+
+def _phase3_record(job: Dict, reason: str = "", url: str = "") -> Dict:
+    return {
+        "checked_at": datetime.now().isoformat(),
+        "status": "rejected" if reason else "ok",
+        "reason": reason,
+        "url": url,
+        "fields": {k: job.get(k) for k in PHASE3_FIELDS if job.get(k) is not None},
     }
-    out_path = DATA_DIR / "batch_ready.json"
-    with open(out_path, "w") as f:
-        json.dump(out, f, ensure_ascii=False, indent=2)
-
-    # salvar versão pronta para Telegram
-    posts_path = Path(os.environ.get("TELEGRAM_POSTS_PATH") or (DATA_DIR / "telegram_posts.txt"))
-    with open(posts_path, "w") as f:
-        for j in final:
-            f.write(format_post(j))
-            f.write("\n\n---\n\n")
-
-    print("== RESULTADO ==")
-    print(f"Prontas para revisão: {len(final)}")
-    print(f"Posts prontos em: {posts_path}")
+
+
+def resolve_candidate(j: Dict, limits: _Phase3Limits, enrich: bool = True) -> Dict:
+    """
+    Parte de rede da fase 3 para uma vaga: link direto, link oficial e
+    (se enrich) enriquecimento. Não mexe em estado compartilhado
+    (dedupe/cotas ficam na etapa de aceite).
+    """
+    job = dict(j)
+    src = job.get("source_url") or ""
+    if not src:
+        return _phase3_record(job, "sem_url")
+    if job.get("source") == "weworkremotely":
+        direct_url = ""
+    elif is_valid_direct_url(src):
+        direct_url = src
+    else:
+        direct_url = ""
+        if limits.take("resolver"):
+            resolved, _status = resolve_direct_url(src)
+            if resolved and is_valid_direct_url(resolved):
+                direct_url = resolved
+        # evita resolver agregadores pesados; usa fallback com Brave
+        if not direct_url:
+            if not limits.take("fallback"):
+                return _phase3_record(job, "sem_orcamento")
+            direct_url = fallback_search_direct(job)
+            if not direct_url and get_brave_client().exhausted():
+                return _phase3_record(job, "sem_orcamento")
+        if not direct_url:
+            return _phase3_record(job, "link_nao_resolvido")
+        if not is_valid_direct_url(direct_url):
+            return _phase3_record(job, "link_invalido")
+    # tenta inferir empresa pelo ATS antes das validações
+    if direct_url:
+        inferred_company = infer_company_from_direct_url(direct_url) or infer_company_from_url(direct_url)
+        if inferred_company:
+            job["company"] = clean_company_name(inferred_company)
+
+    if not direct_url:
+        # tenta encontrar link oficial no domínio da empresa
+        fallback = search_company_job_link(job.get("company") or "", job.get("title") or "")
+        if not fallback:
+            return _phase3_record(job, "sem_link_oficial")
+        final_url = fallback
+        if not (is_company_job_url(final_url, job.get("company") or "") or is_allowed_company_listing(final_url, job.get("company") or "")):
+            return _phase3_record(job, "link_oficial_invalido")
+        job["direct_url"] = final_url
+        # segue para dedupe/enriquecimento
+    else:
+        if not is_job_specific_url(direct_url):
+            return _phase3_record(job, "nao_especifica")
+    # evita listagens
+    if direct_url:
+        if "greenhouse.io" in direct_url and "/jobs/" not in direct_url:
+            return _phase3_record(job, "listagem")
+    if job.get("company"):
+        job["company"] = clean_company_name(job.get("company"))
+    company_name = job.get("company") or ""
+    if direct_url:
+        # se link final ainda é ATS, tenta achar link oficial no domínio da empresa
+        final_url = direct_url
+        if not (is_company_job_url(final_url, company_name) or is_allowed_company_listing(final_url, company_name)):
+            # permite ATS se nome da empresa estiver na URL
+            if is_allowed_ats_url(final_url, company_name):
+                job["direct_url"] = final_url
+            else:
+                resolved_company = resolve_official_company_link(final_url)
+                if not resolved_company:
+                    # fallback por nome da empresa + título (útil para WWR e agregadores)
+                    if limits.out_of_time(margin=10):
+                        return _phase3_record(job, "sem_tempo")
+                    resolved_company = search_company_job_link(company_name, job.get("title") or "")
+                if not resolved_company:
+                    return _phase3_record(job, "sem_link_oficial")
+                final_url = resolved_company
+                if not (is_company_job_url(final_url, company_name) or is_allowed_company_listing(final_url, company_name)):
+                    return _phase3_record(job, "link_oficial_invalido")
+                job["direct_url"] = final_url
+    if not job.get("company") or job.get("company") == "Unknown":
+        return _phase3_record(job, "sem_empresa")
+    if is_generic_title(job.get("title")):
+        return _phase3_record(job, "titulo_generico")
+    if not job.get("direct_url"):
+        job["direct_url"] = direct_url
+    if enrich:
+        reason = enrich_candidate(job)
+        if reason:
+            return _phase3_record(job, reason)
+    return _phase3_record(job, url=direct_url)
+
+
+def enrich_candidate(job: Dict) -> str:
+    """Enriquece pela API do ATS (Greenhouse/Lever); retorna motivo de rejeição ou ''"""
+    direct_url = job.get("direct_url") or ""
+    if "greenhouse.io" in direct_url:
+        enrich_greenhouse(job)
+    elif "lever.co" in direct_url:
+        enrich_lever(job)
+    if looks_like_listing(job.get("description", "")):
+        return "listagem"
+    if not job.get("company") or job.get("company") == "Unknown":
+        return "sem_empresa"
+    return ""
+
+
+def reset_brave_client() -> BraveClient:
+    """Novo cliente Brave (orçamento zerado) para uma execução"""
+    global _BRAVE
+    _BRAVE = BraveClient(budget=BRAVE_BUDGET)
+    return _BRAVE
+
+
+def main():
+    load_env()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    # import tardio: o pipeline usa as funções deste módulo
+    import pipeline
+    pipeline.run_daily_batch()
 
 
 if __name__ == "__main__":
@@ -29,6 +29,8 @@ export TELEGRAM_POSTS_PATH="${TELEGRAM_POSTS_PATH:-/home/ubuntu/projects/job-cur
 
 python3 /home/ubuntu/projects/job-curator-bot/prepare_daily_batch.py
 python3 /home/ubuntu/projects/job-curator-bot/scripts/save_found_jobs.py
+# posts do lote entram no fim do log de posts (fila do post_next_paid.py)
+python3 /home/ubuntu/projects/job-curator-bot/post_log.py --append "$TELEGRAM_POSTS_PATH"
 
 # =============================================================================
 # 2. POSTAGEM (modo teste por padrão)
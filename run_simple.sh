@@ -1,5 +1,5 @@
 #!/bin/bash
-# Versão simplificada - usa scrapers testados
+# Versão simplificada - usa as fontes do lote diário (prepare_daily_batch)
 cd /home/ubuntu/projects/job-curator-bot
 
 export $(cat .env | grep -v '^#' | xargs)
@@ -8,8 +8,7 @@ python3 << 'PYSCRIPT'
 import sys
 sys.path.insert(0, '/home/ubuntu/projects/job-curator-bot')
 
-from scrapers.weworkremotely import WeWorkRemotelyScraper
-from scrapers.himalayas import HimalayasScraper
+from prepare_daily_batch import fetch_himalayas, fetch_weworkremotely
 import json
 import os
 import requests
@@ -20,8 +19,7 @@ print("🔍 Descobrindo vagas...")
 # Scrape WWR
 jobs = []
 try:
-    wwr = WeWorkRemotelyScraper()
-    wwr_jobs = wwr.run(limit=3)
+    wwr_jobs = fetch_weworkremotely(limit=3)[:3]
     jobs.extend(wwr_jobs)
     print(f"  ✅ WWR: {len(wwr_jobs)}")
 except Exception as e:
@@ -29,8 +27,7 @@ except Exception as e:
 
 # Scrape Himalayas
 try:
-    hima = HimalayasScraper()
-    hima_jobs = hima.run(limit=3)
+    hima_jobs = fetch_himalayas(limit=3)
     jobs.extend(hima_jobs)
     print(f"  ✅ Himalayas: {len(hima_jobs)}")
 except Exception as e:
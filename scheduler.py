@@ -0,0 +1,118 @@
+"""
+Job Curator Bot - Scheduler
+Agendador asyncio do app.py: cada fase é um job com a própria cadência, num
+event loop só (no lugar do `schedule` consultado a cada 60 s, com um
+asyncio.run novo por ciclo).
+
+- every: a cada N segundos, contados do início da execução anterior
+- at: nos horários HH:MM (hora local), como SCHEDULE_HOURS
+- when: com `every`, só roda se a condição for verdadeira (ex: há vagas para analisar)
+
+Cada job roda no próprio laço: nunca há duas execuções do mesmo job ao mesmo
+tempo, e uma execução longa só atrasa a próxima daquele job (sem acumular).
+Início e fim de cada execução ficam em jobs.db (scheduler_runs): ao reiniciar, a
+cadência continua de onde estava; um horário `at` perdido com o processo
+parado é pulado (não posta fora de hora), espera o próximo.
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, List, Optional
+
+import database as db
+
+logger = logging.getLogger(__name__)
+
+# Espera máxima de uma vez (recalcula depois; acompanha ajustes de relógio)
+MAX_SLEEP_SECONDS = 300
+
+
+class Job:
+    """Uma fase agendada: `run` é uma corrotina sem argumentos que devolve estatísticas"""
+
+    def __init__(self, name: str, run: Callable[[], Awaitable], every: Optional[float] = None,
+                 at: Optional[List[str]] = None, when: Optional[Callable[[], bool]] = None):
+        if not every and not at:
+            raise ValueError(f"Job {name}: informe every ou at")
+        self.name = name
+        self.run = run
+        self.every = every
+        self.at = sorted(at or [])
+        self.when = when
+        self.checked_at: Optional[datetime] = None  # última vez que `when` deu falso
+        self.since: Optional[datetime] = None  # início do laço; horários `at` anteriores não rodam
+        self.running = False
+
+    def _next_slot(self, after: datetime) -> datetime:
+        for day in range(2):
+            for hhmm in self.at:
+                hour, minute = (int(x) for x in hhmm.split(":"))
+                slot = (after + timedelta(days=day)).replace(hour=hour, minute=minute, second=0, microsecond=0)
+                if slot > after:
+                    return slot
+        raise ValueError(f"Job {self.name}: horários inválidos {self.at}")
+
+    def next_run(self, last_started: Optional[datetime], now: datetime) -> datetime:
+        """Próxima execução; no passado = rodar agora"""
+        if self.at:
+            # horário perdido (processo parado) é pulado: conta a partir do início do laço
+            return self._next_slot(max(filter(None, (last_started, self.since)), default=now))
+        base = max(filter(None, (last_started, self.checked_at)), default=None)
+        return base + timedelta(seconds=self.every) if base else now
+
+
+class Scheduler:
+    """Roda os jobs, cada um no seu laço, até ser cancelado"""
+
+    def __init__(self, jobs: List[Job]):
+        self.jobs = {job.name: job for job in jobs}
+
+    async def run(self):
+        runs = await asyncio.to_thread(db.get_scheduler_runs)
+        for name, run in runs.items():
+            if run.get("last_status") == "running" and name in self.jobs:
+                logger.warning(f"[{name}] execução de {run['last_started']} não terminou (processo parado)")
+        await asyncio.gather(*(self._loop(job, runs.get(job.name)) for job in self.jobs.values()))
+
+    async def _loop(self, job: Job, last: Optional[dict]):
+        last_started = datetime.fromisoformat(last["last_started"]) if last and last.get("last_started") else None
+        job.since = datetime.now()
+        first = job.next_run(last_started, datetime.now())
+        logger.info(f"  {job.name}: próxima execução {first:%Y-%m-%d %H:%M}")
+        while True:
+            now = datetime.now()
+            delay = (job.next_run(last_started, now) - now).total_seconds()
+            if delay > 0:
+                await asyncio.sleep(min(delay, MAX_SLEEP_SECONDS))
+                continue
+            if job.when and not await asyncio.to_thread(job.when):
+                job.checked_at = datetime.now()
+                continue
+            last_started = datetime.now()
+            await self.run_job(job, last_started)
+
+    async def run_job(self, job: Job, started: Optional[datetime] = None) -> Optional[dict]:
+        """Executa o job agora (ignora se já estiver rodando) e grava o resultado"""
+        if job.running:
+            logger.info(f"[{job.name}] já em execução, ignorado")
+            return None
+        job.running = True
+        started = started or datetime.now()
+        await asyncio.to_thread(db.save_scheduler_run, job.name, started.isoformat())
+        logger.info(f"[{job.name}] iniciando")
+        start = time.monotonic()
+        stats, status, error = None, "ok", None
+        try:
+            stats = await job.run()
+        except Exception as e:
+            status, error = "error", f"{type(e).__name__}: {e}"
+            logger.exception(f"[{job.name}] ERRO: {e}")
+        finally:
+            job.running = False
+        seconds = round(time.monotonic() - start, 1)
+        saved = stats if stats is None or isinstance(stats, dict) else {"result": stats}
+        await asyncio.to_thread(db.save_scheduler_run, job.name, started.isoformat(), datetime.now().isoformat(),
+                                status, error, seconds, saved)
+        logger.info(f"[{job.name}] {status} em {seconds}s")
+        return stats
@@ -1,18 +1,17 @@
 """
 Job Curator Bot - Scrapers
+Boards públicos de ATS (usados por prepare_daily_batch.fetch_ats_feeds). Os
+agregadores (RemoteOK, WWR, Himalayas...) são buscados pelas funções fetch_*
+do prepare_daily_batch, no estágio fetch do pipeline.
 """
 from .base import BaseScraper
-from .remoteok import RemoteOKScraper
-from .weworkremotely import WeWorkRemotelyScraper
-from .himalayas import HimalayasScraper
-
-# Lista de todos os scrapers disponíveis
-ALL_SCRAPERS = [
-    RemoteOKScraper,
-    WeWorkRemotelyScraper,
-    HimalayasScraper,
-]
-
-def get_all_scrapers():
-    """Retorna instâncias de todos os scrapers"""
-    return [scraper() for scraper in ALL_SCRAPERS]
+from .ats import (
+    ATSBoardScraper,
+    GreenhouseScraper,
+    LeverScraper,
+    AshbyScraper,
+    SmartRecruitersScraper,
+    WorkableScraper,
+    RecruiteeScraper,
+    ATS_SCRAPERS,
+)
@@ -0,0 +1,140 @@
+"""
+Job Curator Bot - ATS Board Scrapers
+Lê direto as APIs públicas dos boards (Greenhouse, Lever, Ashby,
+SmartRecruiters, Workable, Recruitee) das empresas do companies_database.json.
+
+Listagens completas e estruturadas, sem gastar Brave.
+"""
+import html
+import logging
+from typing import List, Dict, Optional
+
+from bs4 import BeautifulSoup
+
+import ats_boards
+
+from .base import BaseScraper
+
+logger = logging.getLogger(__name__)
+
+
+class ATSBoardScraper(BaseScraper):
+    """Base para scrapers de boards de ATS (um provider por subclasse)"""
+
+    provider: str = ""
+
+    def __init__(self, boards: Optional[List[tuple]] = None):
+        """
+        Args:
+            boards: lista de (slug, nome_empresa). Se None, usa os boards
+                    detectados no companies_database.json.
+        """
+        super().__init__()
+        if boards is None:
+            boards = ats_boards.load_company_boards().get(self.provider, [])
+        self.boards = boards
+
+    def fetch_jobs(self, limit: int = 50) -> List[Dict]:
+        """Busca todos os boards do provider em paralelo (com cache/GET condicional)"""
+
+        if not self.boards:
+            return []
+
+        names = {slug: company for slug, company in self.boards}
+        results = ats_boards.get_boards((self.provider, slug) for slug in names)
+
+        jobs = []
+        for (provider, slug), board in results.items():
+            if not board:
+                continue
+            for job_key, data in board.items():
+                try:
+                    job = self.normalize_job(slug, names.get(slug, ""), job_key, data)
+                    if job:
+                        jobs.append(job)
+                except Exception as e:
+                    logger.warning(f"[{self.name}] Erro ao normalizar vaga: {e}")
+                    continue
+                if len(jobs) >= limit:
+                    return jobs
+
+        return jobs
+
+    def normalize_job(self, slug: str, company: str, job_key: str, data: dict) -> Optional[Dict]:
+        """Normaliza vaga de um board de ATS"""
+
+        url = data.get('url')
+        if not url:
+            return None
+
+        description = html.unescape(data.get('content') or '')
+        if '<' in description:
+            description = BeautifulSoup(description, 'html.parser').get_text(separator=' ', strip=True)
+
+        return {
+            'id': self.generate_job_id(url),
+            'title': data.get('title') or 'N/A',
+            'company': company or data.get('company') or slug,
+            'description': description,
+            'source_url': url,
+            'direct_url': url,
+            'location': data.get('location') or '',
+            'posted_at': data.get('posted_at'),
+            'salary_min': None,
+            'salary_max': None,
+            'salary_currency': 'USD',
+            'tags': [self.provider],
+            'raw_data': {'provider': self.provider, 'slug': slug, 'job_key': job_key},
+        }
+
+
+class GreenhouseScraper(ATSBoardScraper):
+    """Boards Greenhouse (boards-api.greenhouse.io)"""
+    name = "greenhouse"
+    provider = "greenhouse"
+    base_url = "https://boards.greenhouse.io"
+
+
+class LeverScraper(ATSBoardScraper):
+    """Postings Lever (api.lever.co)"""
+    name = "lever"
+    provider = "lever"
+    base_url = "https://jobs.lever.co"
+
+
+class AshbyScraper(ATSBoardScraper):
+    """Job boards Ashby (api.ashbyhq.com/posting-api)"""
+    name = "ashby"
+    provider = "ashby"
+    base_url = "https://jobs.ashbyhq.com"
+
+
+class SmartRecruitersScraper(ATSBoardScraper):
+    """Postings SmartRecruiters (api.smartrecruiters.com)"""
+    name = "smartrecruiters"
+    provider = "smartrecruiters"
+    base_url = "https://jobs.smartrecruiters.com"
+
+
+class WorkableScraper(ATSBoardScraper):
+    """Contas Workable (apply.workable.com widget API)"""
+    name = "workable"
+    provider = "workable"
+    base_url = "https://apply.workable.com"
+
+
+class RecruiteeScraper(ATSBoardScraper):
+    """Ofertas Recruitee ({empresa}.recruitee.com/api/offers)"""
+    name = "recruitee"
+    provider = "recruitee"
+    base_url = "https://recruitee.com"
+
+
+ATS_SCRAPERS = [
+    GreenhouseScraper,
+    LeverScraper,
+    AshbyScraper,
+    SmartRecruitersScraper,
+    WorkableScraper,
+    RecruiteeScraper,
+]
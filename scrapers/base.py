@@ -2,7 +2,6 @@
 Job Curator Bot - Base Scraper
 Classe base para todos os scrapers
 """
-import hashlib
 import logging
 import time
 from abc import ABC, abstractmethod
@@ -11,6 +10,7 @@ from typing import List, Dict, Optional
 import requests
 
 from config import USER_AGENT, REQUEST_TIMEOUT, REQUEST_DELAY
+from job_keys import looks_like_url, stable_id
 
 logger = logging.getLogger(__name__)
 
@@ -29,9 +29,14 @@ class BaseScraper(ABC):
         })
     
     def generate_job_id(self, unique_string: str) -> str:
-        """Gera um ID único para a vaga"""
-        content = f"{self.name}:{unique_string}"
-        return hashlib.md5(content.encode()).hexdigest()[:16]
+        """
+        Gera o ID estável da vaga (job_keys.stable_id).
+        Com a URL da vaga, o id é o mesmo por qualquer fonte; sem URL,
+        usa a chave única dentro desta fonte.
+        """
+        if looks_like_url(unique_string):
+            return stable_id(unique_string)
+        return stable_id(f"{self.name}:{unique_string}")
     
     def make_request(self, url: str, method: str = 'GET', **kwargs) -> Optional[requests.Response]:
         """Faz uma requisição HTTP com tratamento de erros"""
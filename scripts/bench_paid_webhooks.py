@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Teste de carga dos webhooks do paid_access_bot contra a Bot API falsa
+(scripts/fake_bot_api.py), sem rede, sem token real e sem uvicorn.
+
+Dispara rajadas de compras (com uma fração de eventos repetidos, como os
+reenvios do Stripe) e mede: latência de resposta do webhook, tempo até a fila
+esvaziar e convites criados (deve ser um por payment_id). Com --pool N, o
+worker do pool cria N links antes da rajada e as compras saem direto do banco.
+
+Uso:
+    python3 scripts/bench_paid_webhooks.py [--purchases 300] [--burst 50] [--duplicates 0.2] [--api-latency-ms 300] [--workers 4] [--pool 0]
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import httpx  # noqa: E402
+
+from fake_bot_api import FakeBotAPI, start_server  # noqa: E402
+
+import member_store  # noqa: E402
+import paid_access_bot  # noqa: E402
+import telegram_sender  # noqa: E402
+
+
+async def run(api: FakeBotAPI, purchases: int, burst: int, duplicates: float, pool: int,
+              seed: int = 42) -> dict:
+    rng = random.Random(seed)
+    app = paid_access_bot.app
+    events = []
+    for i in range(purchases):
+        event = {"type": "checkout.session.completed",
+                 "data": {"object": {"id": f"cs_bench_{i}", "customer_email": f"buyer{i}@bench.dev"}}}
+        events.append(event)
+        if rng.random() < duplicates:
+            events.append(event)
+    rng.shuffle(events)
+
+    acks = []
+    async with app.router.lifespan_context(app):
+        while member_store.pool_size(paid_access_bot._pool_min_expires()) < pool:
+            await asyncio.sleep(0.05)
+        calls_before = api.stats["requests"]
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            async def post(event):
+                start = time.perf_counter()
+                response = await client.post("/webhook/stripe", json=event)
+                acks.append((time.perf_counter() - start) * 1000)
+                response.raise_for_status()
+
+            start = time.perf_counter()
+            for i in range(0, len(events), burst):
+                await asyncio.gather(*(post(e) for e in events[i:i + burst]))
+            acked = time.perf_counter() - start
+            while True:
+                stats = member_store.task_stats()
+                if not stats.get("pending") and not stats.get("running"):
+                    break
+                await asyncio.sleep(0.05)
+            drained = time.perf_counter() - start
+    acks.sort()
+    return {
+        "webhooks": len(events),
+        "acked_s": acked,
+        "drained_s": drained,
+        "ack_p50": statistics.median(acks),
+        "ack_p95": acks[int(len(acks) * 0.95) - 1],
+        "ack_max": acks[-1],
+        "tasks": member_store.task_stats(),
+        "api_calls": api.stats["requests"] - calls_before,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--purchases", type=int, default=300)
+    parser.add_argument("--burst", type=int, default=50, help="webhooks simultâneos por rajada")
+    parser.add_argument("--duplicates", type=float, default=0.2, help="fração de eventos reenviados")
+    parser.add_argument("--api-latency-ms", type=float, default=300, help="latência da Bot API falsa")
+    parser.add_argument("--workers", type=int, default=paid_access_bot.TASK_WORKERS)
+    parser.add_argument("--pool", type=int, default=0, help="links de convite criados antes da rajada")
+    args = parser.parse_args()
+
+    api = FakeBotAPI(latency_ms=args.api_latency_ms)
+    server = start_server(api)
+    os.environ["TELEGRAM_API_URL"] = f"http://127.0.0.1:{server.server_address[1]}"
+    paid_access_bot.BOT_TOKEN = "bench"
+    paid_access_bot.GROUP_ID = "-100bench"
+    paid_access_bot.TASK_POLL_SECONDS = 0.2
+    paid_access_bot.TASK_WORKERS = args.workers
+    paid_access_bot.INVITE_POOL_SIZE = args.pool
+
+    with tempfile.TemporaryDirectory() as tmp:
+        member_store.STORE_PATH = Path(tmp) / "paid_access.db"
+        member_store.LEGACY_MEMBERS = member_store.LEGACY_INVITES = Path(tmp) / "none.json"
+        # sem o log de cada convite
+        with contextlib.redirect_stdout(io.StringIO()):
+            r = asyncio.run(run(api, args.purchases, args.burst, args.duplicates, args.pool))
+        with member_store.get_connection() as conn:
+            invites = conn.execute("SELECT COUNT(*) FROM invites").fetchone()[0]
+    server.shutdown()
+
+    print(f"webhooks: {r['webhooks']} ({args.purchases} compras únicas), "
+          f"Bot API com {args.api_latency_ms:.0f} ms, {paid_access_bot.TASK_WORKERS} workers, pool {args.pool}")
+    print(f"resposta do webhook: p50 {r['ack_p50']:.1f} ms, p95 {r['ack_p95']:.1f} ms, máx {r['ack_max']:.1f} ms")
+    print(f"todos respondidos em {r['acked_s']:.2f}s ({r['webhooks'] / r['acked_s']:.0f} webhooks/s); "
+          f"fila vazia em {r['drained_s']:.2f}s "
+          f"(mínimo pelo limite do bot: {args.purchases / telegram_sender.GLOBAL_MSGS_PER_SEC:.1f}s)")
+    print(f"tarefas: {r['tasks']}; convites criados: {invites}; chamadas à Bot API durante a rajada: {r['api_calls']}")
+
+
+if __name__ == "__main__":
+    main()
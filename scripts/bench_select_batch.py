@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Benchmark do select_diverse_batch (guloso + reparo + busca exata do núcleo) com pools sintéticos de 10 a 500 vagas.
+
+Uso:
+    python3 scripts/bench_select_batch.py [--sizes 5,20,30] [--runs 20] [--check]
+
+--check compara a viabilidade com a busca exaustiva por combinações (só pools pequenos).
+"""
+import argparse
+import itertools
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from prepare_daily_batch import select_diverse_batch, validate_diversity  # noqa: E402
+
+POOL_SIZES = [10, 25, 50, 100, 250, 500]
+COUNTRIES = ["USA", "Canada", "United Kingdom", "Germany", "Portugal", "Ireland"]
+SECTORS = ["tech", "saude", "educacao", "financas", "marketing", "vendas", "operacoes"]
+
+
+def make_pool(n: int, rng: random.Random, rare: bool = False) -> list:
+    """
+    Vagas aprovadas sintéticas no formato da análise do LLM.
+    rare=True: requisitos difíceis (faculdade=nao, inglês básico) aparecem só no fim do pool.
+    """
+    companies = max(6, n // 2)
+    pool = []
+    for i in range(n):
+        late = i >= n - 2
+        faculdade = rng.choice(["sim", "sim", "nao"])
+        ingles = rng.choice(["fluente", "intermediario", "basico"])
+        if rare and not late:
+            faculdade = "sim"
+            ingles = "fluente"
+        pool.append({
+            "job_index": i,
+            "aprovada": True,
+            "internacional_ok": rng.random() > 0.05,
+            "empresa": f"Company {rng.randrange(companies)}",
+            "pais": rng.choice(COUNTRIES[:2] if rare else COUNTRIES),
+            "setor": rng.choice(SECTORS[:3] if rare else SECTORS),
+            "requisitos": {
+                "faculdade": faculdade,
+                "ingles": ingles,
+                "experiencia_anos": rng.choice([0, 0, 1, 2, 3, 5]),
+            },
+        })
+    return pool
+
+
+def brute_force_feasible(items: list, size: int) -> bool:
+    pool = [i for i in items if i.get("aprovada")]
+    return any(validate_diversity(list(c)) for c in itertools.combinations(pool, size))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="5,20,30", help="tamanhos de lote (BATCH_SIZE)")
+    parser.add_argument("--runs", type=int, default=20, help="pools por combinação")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--check", action="store_true", help="confere viabilidade com busca exaustiva")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    batch_sizes = [int(x) for x in args.sizes.split(",") if x.strip()]
+
+    print(f"{'pool':>5} {'lote':>5} {'cenário':>8} {'ok':>6} {'médio ms':>9} {'máx ms':>8}")
+    for n in POOL_SIZES:
+        for size in batch_sizes:
+            for scenario in ("normal", "raro"):
+                times = []
+                ok = 0
+                for _ in range(args.runs):
+                    pool = make_pool(n, rng, rare=(scenario == "raro"))
+                    start = time.perf_counter()
+                    batch = select_diverse_batch(pool, size=size)
+                    times.append((time.perf_counter() - start) * 1000)
+                    if batch:
+                        assert len(batch) == size and validate_diversity(batch)
+                        ok += 1
+                print(
+                    f"{n:>5} {size:>5} {scenario:>8} {ok:>3}/{args.runs:<2} "
+                    f"{statistics.mean(times):>9.2f} {max(times):>8.2f}"
+                )
+
+    if args.check:
+        mismatches = 0
+        checked = 0
+        for _ in range(200):
+            n = rng.randint(6, 12)
+            size = rng.randint(4, 6)
+            pool = make_pool(n, rng, rare=rng.random() < 0.5)
+            greedy = bool(select_diverse_batch(pool, size=size))
+            exact = brute_force_feasible(pool, size)
+            checked += 1
+            if greedy != exact:
+                mismatches += 1
+        print(f"Conferência exaustiva: {checked - mismatches}/{checked} iguais")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Benchmark do telegram_sender contra a Bot API falsa (scripts/fake_bot_api.py).
+
+Mede vazão sustentada, 429 recebidos e latência por envio com vários canais
+em paralelo. --scale acelera o relógio dos dois lados (limite de 20/min vira
+20*scale/min) para o teste caber em segundos.
+
+Uso:
+    python3 scripts/bench_telegram_sender.py [--chats 4] [--messages 60] [--scale 60] [--error-rate 0.02]
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from fake_bot_api import FakeBotAPI, start_server  # noqa: E402
+from telegram_sender import TelegramSender  # noqa: E402
+
+import telegram_sender  # noqa: E402
+
+
+async def run(api_url: str, chats: int, messages: int, per_min: float, global_per_sec: float,
+              limited: bool) -> dict:
+    # sem limite: bucket enorme, só o retry_after segura (como um envio ingênuo)
+    per_min_sender = per_min if limited else 1e9
+    results = []
+    async with TelegramSender(api_url=api_url, channel_per_min=per_min_sender,
+                              global_per_sec=global_per_sec if limited else 1e9, max_attempts=20) as sender:
+        async def channel(c: int):
+            for i in range(messages):
+                results.append(await sender.send_message("bench", f"-100{c}", f"vaga {i}"))
+
+        start = time.perf_counter()
+        await asyncio.gather(*(channel(c) for c in range(chats)))
+        elapsed = time.perf_counter() - start
+    latencies = sorted(r["latency_ms"] for r in results)
+    return {
+        "ok": sum(r["ok"] for r in results),
+        "sent": len(results),
+        "attempts": sum(r["attempts"] for r in results),
+        "seconds": elapsed,
+        "p50": statistics.median(latencies),
+        "p95": latencies[int(len(latencies) * 0.95) - 1],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chats", type=int, default=4)
+    parser.add_argument("--messages", type=int, default=60, help="mensagens por canal")
+    parser.add_argument("--per-min", type=float, default=20)
+    parser.add_argument("--scale", type=float, default=60)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    # backoff de 5xx na mesma escala do relógio
+    telegram_sender.BACKOFF_BASE /= args.scale
+    per_min = args.per_min * args.scale
+    ideal = min(args.chats * per_min / 60.0, telegram_sender.GLOBAL_MSGS_PER_SEC * args.scale)
+
+    print(f"{'modo':>10} {'ok':>9} {'tentativas':>10} {'429':>5} {'5xx':>5} {'msgs/s':>8} "
+          f"{'ideal':>7} {'p50 ms':>8} {'p95 ms':>8}")
+    for mode in ("bucket", "sem-limite"):
+        api = FakeBotAPI(args.per_min, args.scale, args.error_rate)
+        server = start_server(api)
+        url = f"http://127.0.0.1:{server.server_address[1]}"
+        r = asyncio.run(run(url, args.chats, args.messages, per_min,
+                            telegram_sender.GLOBAL_MSGS_PER_SEC * args.scale, mode == "bucket"))
+        server.shutdown()
+        print(f"{mode:>10} {r['ok']:>4}/{r['sent']:<4} {r['attempts']:>10} {api.stats['429']:>5} "
+              f"{api.stats['5xx']:>5} {r['ok'] / r['seconds']:>8.1f} {ideal:>7.1f} "
+              f"{r['p50']:>8.0f} {r['p95']:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Bot API falsa para testar o telegram_sender sem rede e sem token real.
+
+Responde sendMessage (e os métodos de convite/remoção usados pelo
+paid_access_bot, em METHODS) como o Telegram, aplicando os mesmos limites:
+- por chat: grupos/canais PER_MIN msgs por minuto, chats privados 1 msg/s
+- global: 30 msgs/s por bot
+Acima do limite devolve 429 com parameters.retry_after; --error-rate injeta 5xx.
+GET /stats devolve os contadores.
+
+Uso:
+    python3 scripts/fake_bot_api.py [--port 8081] [--per-min 20] [--scale 1] [--error-rate 0]
+    TELEGRAM_API_URL=http://127.0.0.1:8081 python3 post_next.py
+
+--scale N acelera o relógio (limites N vezes maiores) para benchmarks curtos.
+"""
+import argparse
+import json
+import math
+import random
+import threading
+import time
+from collections import defaultdict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+METHODS = ("sendMessage", "createChatInviteLink", "revokeChatInviteLink", "banChatMember", "unbanChatMember")
+
+
+class FakeBotAPI:
+    """Estado do servidor: janelas de envio por chat/bot e contadores"""
+
+    def __init__(self, per_min: float = 20, scale: float = 1.0, error_rate: float = 0.0,
+                 latency_ms: float = 0.0, seed: int = 42):
+        self.window = 60.0 / scale
+        self.per_window = per_min
+        self.private_interval = 1.0 / scale
+        self.global_window = 1.0 / scale
+        self.global_per_window = 30
+        self.error_rate = error_rate
+        self.latency = latency_ms / 1000.0
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.sent = defaultdict(deque)       # chat → horários aceitos
+        self.bot_sent = defaultdict(deque)   # token → horários aceitos
+        self.next_id = defaultdict(int)
+        self.stats = {"ok": 0, "429": 0, "5xx": 0, "requests": 0}
+
+    def _retry_after(self, times: deque, window: float, limit: int, now: float) -> float:
+        while times and times[0] <= now - window:
+            times.popleft()
+        if len(times) < limit:
+            return 0.0
+        return times[0] + window - now
+
+    def send(self, token: str, chat_id: str, method: str = "sendMessage") -> tuple:
+        """(status HTTP, corpo JSON) de um sendMessage (ou outro método, só com o limite global)"""
+        if self.latency:
+            time.sleep(self.latency)
+        with self.lock:
+            self.stats["requests"] += 1
+            if self.error_rate and self.rng.random() < self.error_rate:
+                self.stats["5xx"] += 1
+                return 502, {"ok": False, "error_code": 502, "description": "Bad Gateway"}
+            now = time.monotonic()
+            if method != "sendMessage":
+                wait = 0.0
+            elif str(chat_id).isdigit():
+                wait = self._retry_after(self.sent[chat_id], self.private_interval, 1, now)
+            else:
+                wait = self._retry_after(self.sent[chat_id], self.window, self.per_window, now)
+            wait = max(wait, self._retry_after(self.bot_sent[token], self.global_window,
+                                               self.global_per_window, now))
+            if wait > 0:
+                self.stats["429"] += 1
+                # o Telegram informa segundos inteiros
+                retry_after = max(1, math.ceil(wait)) if self.window >= 60 else round(wait, 3)
+                return 429, {
+                    "ok": False, "error_code": 429,
+                    "description": f"Too Many Requests: retry after {retry_after}",
+                    "parameters": {"retry_after": retry_after},
+                }
+            self.bot_sent[token].append(now)
+            self.stats["ok"] += 1
+            if method == "createChatInviteLink":
+                self.next_id["invite"] += 1
+                return 200, {"ok": True, "result": {
+                    "invite_link": f"https://t.me/+fake{self.next_id['invite']}", "member_limit": 1}}
+            if method != "sendMessage":
+                return 200, {"ok": True, "result": True}
+            self.sent[chat_id].append(now)
+            self.next_id[chat_id] += 1
+            return 200, {"ok": True, "result": {"message_id": self.next_id[chat_id],
+                                                "chat": {"id": chat_id}}}
+
+
+def make_handler(api: FakeBotAPI):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, como o Telegram
+
+        def _reply(self, status: int, body: dict):
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            try:
+                self.wfile.write(data)
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # cliente desistiu (ex: worker cancelado no fim do benchmark)
+
+        def do_GET(self):
+            if self.path == "/stats":
+                with api.lock:
+                    self._reply(200, dict(api.stats))
+            else:
+                self._reply(404, {"ok": False, "description": "Not Found"})
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            raw = self.rfile.read(length)
+            parts = self.path.strip("/").split("/")
+            if len(parts) != 2 or not parts[0].startswith("bot") or parts[1] not in METHODS:
+                self._reply(404, {"ok": False, "description": "Not Found"})
+                return
+            try:
+                payload = json.loads(raw or b"{}")
+            except ValueError:
+                payload = {}
+            if not payload.get("chat_id") or (parts[1] == "sendMessage" and not payload.get("text")):
+                self._reply(400, {"ok": False, "error_code": 400, "description": "Bad Request: message text is empty"})
+                return
+            self._reply(*api.send(parts[0][3:], str(payload["chat_id"]), parts[1]))
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def start_server(api: FakeBotAPI, port: int = 0) -> ThreadingHTTPServer:
+    """Sobe o servidor numa thread; a porta usada fica em server.server_address[1]"""
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(api))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bot API falsa (limites e 429 do Telegram)")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--per-min", type=float, default=20, help="msgs por minuto por grupo/canal")
+    parser.add_argument("--scale", type=float, default=1.0, help="acelera o relógio dos limites")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fração de respostas 502")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    args = parser.parse_args()
+    api = FakeBotAPI(args.per_min, args.scale, args.error_rate, args.latency_ms)
+    server = start_server(api, args.port)
+    print(f"Bot API falsa em http://127.0.0.1:{server.server_address[1]} (Ctrl+C para sair)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+        print(f"Contadores: {api.stats}")
+
+
+if __name__ == "__main__":
+    main()
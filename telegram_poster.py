@@ -1,16 +1,16 @@
 """
 Job Curator Bot - Telegram Poster
-Posta vagas formatadas nos canais Free e Pago
+Posta vagas formatadas nos canais Free e Pago (envio pelo telegram_sender)
 """
 import asyncio
 import json
 import logging
-from pathlib import Path
+import os
 from typing import Optional, List
 
-from telegram import Bot
-from telegram.constants import ParseMode
-from telegram.error import TelegramError
+import company_registry
+import message_render
+from telegram_sender import TelegramSender
 
 from config import (
     TELEGRAM_TOKEN_FREE,
@@ -19,176 +19,176 @@ from config import (
     TELEGRAM_CHANNEL_PAID,
     JOBS_PER_DAY_FREE,
     JOBS_PER_DAY_PAID,
+    TELEGRAM_EXTRA_CHANNELS,
 )
 
 logger = logging.getLogger(__name__)
 
-# Cache de empresas (carrega uma vez)
-EMPRESAS_CACHE_PATH = Path(__file__).parent / "data" / "empresas_cache.json"
-_empresas_cache = None
+# Formato enviado: Markdown, HTML ou plain (o plain é o reenvio quando o formato é recusado)
+TELEGRAM_PARSE_MODE = os.environ.get('TELEGRAM_PARSE_MODE', 'Markdown')
+_FORMATS = {'markdown': 'markdown', 'html': 'html', 'plain': 'plain'}
 
 def get_empresa_descricao(empresa_nome: str) -> str:
-    """Busca descrição da empresa no cache local."""
-    global _empresas_cache
-    if _empresas_cache is None:
-        try:
-            with open(EMPRESAS_CACHE_PATH, 'r', encoding='utf-8') as f:
-                _empresas_cache = json.load(f)
-        except:
-            _empresas_cache = {}
-    
-    # Busca case-insensitive
-    nome_lower = empresa_nome.lower().strip()
-    return _empresas_cache.get(nome_lower, "")
+    """Descrição da empresa no registro (nome exato, sem sufixo societário ou aproximado)."""
+    return company_registry.describe(empresa_nome)
+
+
+def _company_desc(job: dict) -> str:
+    analysis = message_render.job_fields(job)
+    return get_empresa_descricao(analysis['company'])
 
 
 def format_job_message(job: dict) -> str:
-    """
-    Formata a mensagem da vaga para o Telegram.
-    
-    Novo formato PT-BR:
-    🌍 Título da Vaga
-    🏢 Empresa: Nome — descrição do que faz
-    📍 Remoto | 🌎 País/Região
-    💰 Salário (se disponível)
-    
-    🔗 Candidatar-se
-    """
-    
-    # Análise (se disponível)
-    analysis = job.get('analysis_result', {})
-    if isinstance(analysis, str):
-        try:
-            analysis = json.loads(analysis)
-        except:
-            analysis = {}
-    
-    # Título em português
-    title = analysis.get('titulo_pt', job.get('title', 'Vaga Remota'))
-    
-    # Empresa com descrição do cache
-    company = analysis.get('empresa', job.get('company', 'Empresa Internacional'))
-    empresa_desc = get_empresa_descricao(company)
-    if empresa_desc:
-        empresa_linha = f"🏢 *Empresa:* {company} — {empresa_desc}"
-    else:
-        empresa_linha = f"🏢 *Empresa:* {company}"
-    
-    # Localização simplificada
-    location = job.get('location', 'Worldwide')
-    if location and len(location) > 25:
-        location = location[:22] + '...'
-    
-    # Salário
-    salary_str = ""
-    salary_est = analysis.get('salario_estimado_usd_mes')
-    if salary_est:
-        salary_str = f"\n💰 ~USD ${salary_est:,}/mês"
-    elif job.get('salary_min') or job.get('salary_max'):
-        if job.get('salary_min') and job.get('salary_max'):
-            salary_str = f"\n💰 USD ${job['salary_min']:,} - ${job['salary_max']:,}/ano"
-        elif job.get('salary_min'):
-            salary_str = f"\n💰 USD ${job['salary_min']:,}+/ano"
-    
-    # High salary badge
-    is_high = analysis.get('is_high_salary', False)
-    high_badge = " 🔥" if is_high else ""
-    
-    # Link
-    link = job.get('direct_url') or job.get('source_url', '')
-    
-    # Monta mensagem (formato limpo, sem resumo para economizar)
-    message = f"🌍 *{title}*{high_badge}\n"
-    message += f"{empresa_linha}\n"
-    message += f"📍 Remoto | 🌎 {location}"
-    message += salary_str
-    message += f"\n\n🔗 [Candidatar-se]({link})"
-    
-    return message
+    """Mensagem da vaga em Markdown (formato PT-BR de message_render)"""
+    return message_render.render_all(job, _company_desc(job))['free']['markdown']
+
 
+def render_job(job: dict) -> dict:
+    """Render de todas as variantes para gravar na fila (job_queue.rendered)"""
+    return message_render.render_record(job, _company_desc(job))
 
-async def post_job_to_channel(bot: Bot, channel_id: str, job: dict) -> Optional[str]:
+
+def refresh_renders(jobs: List[dict]) -> dict:
     """
-    Posta uma vaga em um canal do Telegram.
-    
+    Garante o render de cada vaga (linhas de get_jobs_for_posting): refaz só os
+    que faltam ou ficaram velhos (template novo ou vaga alterada). A descrição da
+    empresa é a gravada com o render; só é buscada no registro quando falta
+    (render antigo ou registro reimportado, ver company_registry.sync).
+
     Returns:
-        message_id se sucesso, None se falha
+        {job_id: render_record} dos refeitos, para db.save_renders
     """
-    message = format_job_message(job)
+    stale = {}
+    for job in jobs:
+        desc = job.get('company_desc')
+        if desc is not None and message_render.cached(job, desc) is not None:
+            continue
+        if desc is None:
+            desc = _company_desc(job)
+        record = message_render.render_record(job, desc)
+        job.update(record)
+        stale[job['id']] = record
+    return stale
+
+
+async def post_job_to_channel(sender: TelegramSender, token: str, channel_id: str, job: dict,
+                              variant: str = 'free') -> dict:
+    """
+    Posta uma vaga em um canal do Telegram (texto já renderizado na fila).
     
+    Returns:
+        resultado do envio (telegram_sender): 'ok', 'message_id', tentativas e tempos
+    """
     try:
-        result = await bot.send_message(
-            chat_id=channel_id,
-            text=message,
-            parse_mode=ParseMode.MARKDOWN,
-            disable_web_page_preview=True
-        )
-        return str(result.message_id)
-    except TelegramError as e:
-        logger.error(f"Erro ao postar no Telegram: {e}")
-        # Tenta sem markdown se falhar
-        try:
-            message_plain = message.replace('*', '').replace('_', '').replace('[', '').replace(']', '')
-            result = await bot.send_message(
-                chat_id=channel_id,
-                text=message_plain,
-                disable_web_page_preview=True
-            )
-            return str(result.message_id)
-        except:
-            return None
-
-
-async def post_jobs_to_free_channel(jobs: List[dict]) -> List[dict]:
-    """Posta vagas no canal gratuito"""
-    
-    if not TELEGRAM_TOKEN_FREE or not TELEGRAM_CHANNEL_FREE:
-        logger.error("Credenciais do canal FREE não configuradas")
+        messages = json.loads(job['rendered'])[variant]
+    except (KeyError, TypeError, ValueError):
+        messages = message_render.render_all(job, job.get('company_desc') or '')[variant]
+    fmt = _FORMATS.get(TELEGRAM_PARSE_MODE.lower(), 'markdown')
+    parse_mode = None if fmt == 'plain' else TELEGRAM_PARSE_MODE
+    
+    result = await sender.send_message(token, channel_id, messages[fmt], parse_mode=parse_mode)
+    if not result['ok'] and result['status'] == 400 and parse_mode:
+        logger.error(f"Erro ao postar no Telegram: {result['error']}")
+        # Tenta sem formatação se falhar
+        result = await sender.send_message(token, channel_id, messages['plain'])
+    return result
+
+
+async def post_jobs_to_channel(jobs: List[dict], channel_type: str, token: str, channel_id: str,
+                               limit: int, sender: Optional[TelegramSender] = None) -> List[dict]:
+    """
+    Posta vagas em um canal (o ritmo vem do limite por chat do sender).
+
+    Returns:
+        vagas postadas, com 'posted_message_id', 'posted_channel' e 'delivery'
+    """
+    label = channel_type.upper()
+    # canais extras usam o texto do PAGO
+    variant = 'free' if channel_type == 'free' else 'paid'
+    if not token or not channel_id:
+        logger.error(f"Credenciais do canal {label} não configuradas")
         return []
     
-    bot = Bot(token=TELEGRAM_TOKEN_FREE)
+    own_sender = sender is None
+    sender = sender or TelegramSender()
     posted = []
-    
-    for job in jobs[:JOBS_PER_DAY_FREE]:
-        message_id = await post_job_to_channel(bot, TELEGRAM_CHANNEL_FREE, job)
-        if message_id:
-            job['posted_message_id'] = message_id
-            job['posted_channel'] = 'free'
-            posted.append(job)
-            logger.info(f"✅ Postado (FREE): {job.get('title', 'N/A')[:40]}")
-        else:
-            logger.warning(f"❌ Falha ao postar (FREE): {job.get('title', 'N/A')[:40]}")
-        
-        await asyncio.sleep(2)  # Rate limiting
+    try:
+        for job in jobs[:limit]:
+            result = await post_job_to_channel(sender, token, channel_id, job, variant)
+            if result['ok']:
+                job['posted_message_id'] = result['message_id']
+                job['posted_channel'] = channel_type
+                job['delivery'] = result
+                posted.append(job)
+                logger.info(f"✅ Postado ({label}): {job.get('title', 'N/A')[:40]}")
+            else:
+                logger.warning(f"❌ Falha ao postar ({label}): {job.get('title', 'N/A')[:40]} — {result['error']}")
+    finally:
+        if own_sender:
+            await sender.close()
     
     return posted
 
 
-async def post_jobs_to_paid_channel(jobs: List[dict]) -> List[dict]:
-    """Posta vagas no canal pago"""
-    
-    token = TELEGRAM_TOKEN_PAID or TELEGRAM_TOKEN_FREE
-    channel = TELEGRAM_CHANNEL_PAID
-    
-    if not token or not channel:
-        logger.error("Credenciais do canal PAID não configuradas")
-        return []
-    
-    bot = Bot(token=token)
+def posting_channels() -> List[dict]:
+    """
+    Canais de postagem: FREE, PAID e os extras de TELEGRAM_EXTRA_CHANNELS.
+
+    Returns:
+        [{'type', 'token', 'chat_id', 'limit'}, ...]
+    """
+    channels = [
+        {'type': 'free', 'token': TELEGRAM_TOKEN_FREE, 'chat_id': TELEGRAM_CHANNEL_FREE,
+         'limit': JOBS_PER_DAY_FREE},
+        {'type': 'paid', 'token': TELEGRAM_TOKEN_PAID or TELEGRAM_TOKEN_FREE, 'chat_id': TELEGRAM_CHANNEL_PAID,
+         'limit': JOBS_PER_DAY_PAID},
+    ]
+    for entry in TELEGRAM_EXTRA_CHANNELS.split(','):
+        if '=' not in entry:
+            continue
+        channel_type, spec = (x.strip() for x in entry.split('=', 1))
+        parts = spec.split(':')
+        try:
+            limit = int(parts[1]) if len(parts) > 1 else JOBS_PER_DAY_FREE
+        except ValueError:
+            logger.warning(f"TELEGRAM_EXTRA_CHANNELS: limite inválido em '{entry}'")
+            continue
+        token = os.environ.get(parts[2]) if len(parts) > 2 else None
+        if len(parts) > 2 and not token:
+            logger.warning(f"TELEGRAM_EXTRA_CHANNELS: {parts[2]} não definido, '{channel_type}' usa o token do PAID")
+        token = token or TELEGRAM_TOKEN_PAID or TELEGRAM_TOKEN_FREE
+        channels.append({'type': channel_type, 'token': token, 'chat_id': parts[0], 'limit': limit})
+    return channels
+
+
+async def post_jobs_to_channels(jobs_by_channel: List[tuple],
+                                sender: Optional[TelegramSender] = None) -> List[tuple]:
+    """
+    Posta em todos os canais ao mesmo tempo; cada canal segue o próprio limite
+    por chat do sender, então o tempo total é o do canal mais cheio.
+
+    Args:
+        jobs_by_channel: [(canal de posting_channels(), vagas), ...]
+
+    Returns:
+        [(canal, vagas postadas), ...] na mesma ordem
+    """
+    own_sender = sender is None
+    sender = sender or TelegramSender()
+    try:
+        results = await asyncio.gather(*(
+            post_jobs_to_channel(jobs, ch['type'], ch['token'], ch['chat_id'], ch['limit'], sender)
+            for ch, jobs in jobs_by_channel
+        ), return_exceptions=True)
+    finally:
+        if own_sender:
+            await sender.close()
     posted = []
-    
-    for job in jobs[:JOBS_PER_DAY_PAID]:
-        message_id = await post_job_to_channel(bot, channel, job)
-        if message_id:
-            job['posted_message_id'] = message_id
-            job['posted_channel'] = 'paid'
-            posted.append(job)
-            logger.info(f"✅ Postado (PAID): {job.get('title', 'N/A')[:40]}")
-        else:
-            logger.warning(f"❌ Falha ao postar (PAID): {job.get('title', 'N/A')[:40]}")
-        
-        await asyncio.sleep(1)  # Rate limiting (mais rápido no pago)
-    
+    for (ch, _), result in zip(jobs_by_channel, results):
+        if isinstance(result, BaseException):
+            logger.error(f"Erro ao postar no canal {ch['type'].upper()}: {result}")
+            result = []
+        posted.append((ch, result))
     return posted
 
 
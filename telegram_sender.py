@@ -0,0 +1,215 @@
+"""
+Job Curator Bot - Telegram Sender
+Envio único para a Bot API, usado por todos os caminhos de postagem
+(telegram_poster / pipeline, posting_daemon, post_next.py, post_next_paid.py)
+e chamadas do paid_access_bot (convites, remoções, DMs).
+
+- Um cliente httpx assíncrono com pool de conexões (keep-alive) por sender.
+- Token bucket por chat nos limites da Bot API: grupos/canais 20 msgs/min,
+  chats privados 1 msg/s; e um bucket global por bot (30 msgs/s).
+- 429: espera o `retry_after` informado pelo Telegram (e bloqueia o chat
+  inteiro nesse intervalo); 5xx/rede: nova tentativa com backoff exponencial;
+  outros 4xx falham na hora (o chamador pode reenviar sem formatação).
+- Cada envio devolve um resultado com tentativas e tempos, gravado em posted_jobs.
+
+Uso:
+    async with TelegramSender() as sender:
+        result = await sender.send_message(token, chat_id, text, parse_mode="Markdown")
+        result = await sender.call(token, "createChatInviteLink", {"chat_id": chat_id})
+    send_message_sync(token, chat_id, text)   # scripts síncronos (post_next.py)
+
+TELEGRAM_API_URL aponta para outro servidor (ex: scripts/fake_bot_api.py nos testes).
+"""
+import asyncio
+import logging
+import os
+import time
+from typing import Dict, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_API_URL = "https://api.telegram.org"
+
+# Limites da Bot API (https://core.telegram.org/bots/faq#my-bot-is-hitting-limits-how-do-i-avoid-this)
+CHANNEL_MSGS_PER_MIN = 20
+PRIVATE_MSGS_PER_SEC = 1
+GLOBAL_MSGS_PER_SEC = 30
+
+MAX_ATTEMPTS = 5
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 30.0
+
+
+class TokenBucket:
+    """Token bucket assíncrono: `rate` envios por segundo, rajada de até `capacity`"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self) -> float:
+        """Espera um token; retorna os segundos esperados"""
+        waited = 0.0
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.blocked_until:
+                    delay = self.blocked_until - now
+                else:
+                    self._refill(now)
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return waited
+                    delay = (1 - self.tokens) / self.rate
+                await asyncio.sleep(delay)
+                waited += delay
+
+    def block(self, seconds: float) -> None:
+        """Bloqueia o bucket por `seconds` (retry_after do Telegram) e zera a rajada"""
+        now = time.monotonic()
+        self.blocked_until = max(self.blocked_until, now + seconds)
+        self.tokens = 0
+        self.updated = max(self.updated, self.blocked_until)
+
+
+def _is_private(chat_id) -> bool:
+    """Ids positivos são chats privados; negativos (-100...) e @usuario são grupos/canais"""
+    return str(chat_id).isdigit()
+
+
+class TelegramSender:
+    """Envio para a Bot API com limite por chat, retry_after e conexão reaproveitada"""
+
+    def __init__(self, api_url: Optional[str] = None,
+                 channel_per_min: Optional[float] = None,
+                 private_per_sec: Optional[float] = None,
+                 global_per_sec: Optional[float] = None,
+                 max_attempts: int = MAX_ATTEMPTS,
+                 timeout: float = 15.0):
+        self.api_url = (api_url or os.environ.get("TELEGRAM_API_URL") or DEFAULT_API_URL).rstrip("/")
+        self.channel_per_min = channel_per_min or float(
+            os.environ.get("TELEGRAM_CHANNEL_MSGS_PER_MIN", CHANNEL_MSGS_PER_MIN))
+        self.private_per_sec = private_per_sec or PRIVATE_MSGS_PER_SEC
+        self.global_per_sec = global_per_sec or GLOBAL_MSGS_PER_SEC
+        self.max_attempts = max_attempts
+        self.client = httpx.AsyncClient(
+            timeout=httpx.Timeout(timeout),
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=3600),
+        )
+        self._chat_buckets: Dict[tuple, TokenBucket] = {}
+        self._bot_buckets: Dict[str, TokenBucket] = {}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+    def chat_bucket(self, token: str, chat_id) -> TokenBucket:
+        key = (token, str(chat_id))
+        if key not in self._chat_buckets:
+            if _is_private(chat_id):
+                self._chat_buckets[key] = TokenBucket(self.private_per_sec, 1)
+            else:
+                # sem rajada: com capacidade > 1 uma janela de 1 minuto passaria de 20 envios
+                self._chat_buckets[key] = TokenBucket(self.channel_per_min / 60.0, 1)
+        return self._chat_buckets[key]
+
+    def bot_bucket(self, token: str) -> TokenBucket:
+        if token not in self._bot_buckets:
+            self._bot_buckets[token] = TokenBucket(self.global_per_sec, self.global_per_sec)
+        return self._bot_buckets[token]
+
+    async def send_message(self, token: str, chat_id, text: str,
+                           parse_mode: Optional[str] = None,
+                           disable_web_page_preview: bool = True) -> dict:
+        """
+        Envia uma mensagem respeitando os limites.
+
+        Returns:
+            {'ok', 'message_id', 'error', 'status', 'attempts', 'latency_ms',
+             'throttled_ms', 'parse_mode'}
+        """
+        payload = {"chat_id": chat_id, "text": text, "disable_web_page_preview": disable_web_page_preview}
+        if parse_mode:
+            payload["parse_mode"] = parse_mode
+        result = await self.call(token, "sendMessage", payload, chat_id=chat_id)
+        result["message_id"] = str((result.pop("result") or {}).get("message_id") or "") or None
+        result["parse_mode"] = parse_mode
+        return result
+
+    async def call(self, token: str, method: str, params: Optional[dict] = None, chat_id=None) -> dict:
+        """
+        Qualquer método da Bot API (createChatInviteLink, banChatMember...) com
+        retry_after, backoff e o limite global do bot; com `chat_id`, também o
+        limite de mensagens daquele chat.
+
+        Returns:
+            {'ok', 'result', 'error', 'status', 'attempts', 'latency_ms', 'throttled_ms'}
+        """
+        url = f"{self.api_url}/bot{token}/{method}"
+        chat_bucket = self.chat_bucket(token, chat_id) if chat_id is not None else None
+        bot_bucket = self.bot_bucket(token)
+        result = {
+            "ok": False, "result": None, "error": None, "status": None,
+            "attempts": 0, "latency_ms": 0, "throttled_ms": 0,
+        }
+        start = time.monotonic()
+        throttled = 0.0
+        for attempt in range(1, self.max_attempts + 1):
+            if chat_bucket:
+                throttled += await chat_bucket.acquire()
+            throttled += await bot_bucket.acquire()
+            result["attempts"] = attempt
+            retry_in = None
+            try:
+                response = await self.client.post(url, json=params or {})
+                result["status"] = response.status_code
+                try:
+                    body = response.json()
+                except ValueError:
+                    body = {}
+                if response.status_code == 200 and body.get("ok", True):
+                    result["ok"] = True
+                    result["result"] = body.get("result")
+                    result["error"] = None
+                    break
+                result["error"] = f"{response.status_code}: {body.get('description') or response.text[:200]}"
+                if response.status_code == 429:
+                    retry_after = float((body.get("parameters") or {}).get("retry_after") or 1)
+                    (chat_bucket or bot_bucket).block(retry_after)
+                    logger.warning(f"Telegram 429 em {method} {chat_id or ''}: aguardando {retry_after:g}s")
+                elif response.status_code >= 500:
+                    retry_in = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (attempt - 1))
+                else:
+                    break
+            except httpx.HTTPError as e:
+                result["error"] = f"{type(e).__name__}: {e}"
+                retry_in = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (attempt - 1))
+            if retry_in and attempt < self.max_attempts:
+                await asyncio.sleep(retry_in)
+                throttled += retry_in
+        result["latency_ms"] = int((time.monotonic() - start) * 1000)
+        result["throttled_ms"] = int(throttled * 1000)
+        return result
+
+
+def send_message_sync(token: str, chat_id, text: str, **kwargs) -> dict:
+    """send_message para scripts síncronos (um sender por chamada)"""
+    async def _send():
+        async with TelegramSender() as sender:
+            return await sender.send_message(token, chat_id, text, **kwargs)
+    return asyncio.run(_send())
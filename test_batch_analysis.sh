@@ -2,7 +2,7 @@
 set -euo pipefail
 
 # test_batch_analysis.sh - Teste completo do bot Vagas Remotas
-# Executa: scrapers → pré-filtro → batch Claude → posting
+# Executa: fontes do lote diário → pré-filtro → batch Claude → posting
 
 cd "$(dirname "$0")"
 source .env
@@ -16,21 +16,21 @@ log() {
 
 log "=== TESTE VAGAS REMOTAS ==="
 
-# 1. Descoberta (scrapers - TEMP: usar arquivo mock)
+# 1. Descoberta (fontes do lote diário - TEMP: usar arquivo mock)
 log "FASE 1: Descoberta..."
 python3 -c "
 import json
-from scrapers import get_all_scrapers
+import prepare_daily_batch as pdb
 
-scrapers = get_all_scrapers()
 all_jobs = []
-for scraper in scrapers:
+for name, fetch in (('remoteok', pdb.fetch_remoteok), ('weworkremotely', pdb.fetch_weworkremotely),
+                    ('himalayas', pdb.fetch_himalayas)):
     try:
-        jobs = scraper.run(limit=10)
+        jobs = fetch(10)
         all_jobs.extend(jobs)
-        print(f'{scraper.name}: {len(jobs)} vagas')
+        print(f'{name}: {len(jobs)} vagas')
     except Exception as e:
-        print(f'{scraper.name}: ERRO - {e}')
+        print(f'{name}: ERRO - {e}')
 
 print(f'Total: {len(all_jobs)} vagas descobertas')
 with open('_temp_raw_jobs.json', 'w') as f:
@@ -19,10 +19,14 @@ export TELEGRAM_POSTS_PATH="/home/ubuntu/projects/job-curator-bot/data/telegram_
 python3 /home/ubuntu/projects/job-curator-bot/prepare_daily_batch.py
 
 # Append new batch to pool (append-only) + append posts to master
+# (dedupe pelo índice em jobs.db: dedupe_index.py, sem reler pool/posts)
 python3 - <<'PY'
 import json
 from pathlib import Path
 
+import dedupe_index
+import post_log
+
 base = Path('/home/ubuntu/projects/job-curator-bot/data')
 ready = base / 'batch_ready.json'
 pool = base / 'batch_pool.json'
@@ -35,53 +39,45 @@ def load_json(p):
     with open(p) as f:
         return json.load(f)
 
+# importa pool/posts antigos na primeira vez (ou se mudaram fora deste script)
+dedupe_index.migrate_legacy()
+# abre o log de posts antes de mexer no telegram_posts.txt (1ª vez: importa o arquivo atual)
+posts_log = post_log.PostLog(base, posts_master)
+
 data = load_json(ready)
 items = data.get('items', [])
+# 'queued': só evita repetir no pool; postado de fato é registrado na postagem
+new_urls = set(dedupe_index.add('queued', [it.get('direct_url') for it in items if it.get('direct_url')],
+                                source='batch_pool'))
+new_items = [it for it in items if it.get('direct_url') in new_urls]
 
-pool_data = load_json(pool) or {"items": []}
-existing = {i.get('direct_url') for i in pool_data.get('items', []) if i.get('direct_url')}
-added = 0
-for it in items:
-    url = it.get('direct_url')
-    if not url or url in existing:
-        continue
-    pool_data['items'].append(it)
-    existing.add(url)
-    added += 1
+if new_items:
+    pool_data = load_json(pool) or {"items": []}
+    pool_data['items'].extend(new_items)
+    with open(pool, 'w') as f:
+        json.dump(pool_data, f, ensure_ascii=False, indent=2)
 
-with open(pool, 'w') as f:
-    json.dump(pool_data, f, ensure_ascii=False, indent=2)
-
-# append posts (avoid duplicates by link)
+# append posts (only the new links)
 if posts_new.exists():
-    master_links = set()
-    if posts_master.exists():
-        text = posts_master.read_text()
-        for block in text.split('\\n\\n---\\n\\n'):
-            for line in block.splitlines():
-                if line.startswith('APLICAR:'):
-                    master_links.add(line.replace('APLICAR:','').strip())
-    new_blocks = posts_new.read_text().split('\\n\\n---\\n\\n')
     append_blocks = []
-    for block in new_blocks:
-        if not block.strip():
-            continue
-        link = ''
-        for line in block.splitlines():
-            if line.startswith('APLICAR:'):
-                link = line.replace('APLICAR:','').strip()
-                break
-        if link and link not in master_links:
+    for block in posts_new.read_text().split(dedupe_index.POST_SEPARATOR):
+        links = dedupe_index.post_links(block)
+        if block.strip() and links and links[0] in new_urls:
             append_blocks.append(block.strip())
-            master_links.add(link)
+            new_urls.discard(links[0])
     if append_blocks:
         mode = 'a' if posts_master.exists() else 'w'
         with open(posts_master, mode) as f:
             if mode == 'a':
-                f.write('\\n\\n---\\n\\n')
-            f.write('\\n\\n---\\n\\n'.join(append_blocks))
+                f.write(dedupe_index.POST_SEPARATOR)
+            f.write(dedupe_index.POST_SEPARATOR.join(append_blocks))
+        # fila do post_next.py / post_next_paid.py
+        posts_log.append(append_blocks)
+
+# arquivos atualizados por este script: marca como já importados
+dedupe_index.mark_imported([pool, posts_master])
 
-print('pool added', added, 'total', len(pool_data.get('items', [])))
+print('pool added', len(new_items), 'index', dedupe_index.stats())
 PY
 
 # init queue pointer if missing